@@ -3,7 +3,7 @@ Data Adapter Agent - 数据适配Agent
 将多云平台的原始数据转换为统一Schema
 采用混合架构：规则引擎（快速路径）+ LLM引擎（智能路径）
 """
-from typing import Dict, Any, Optional, List, Type
+from typing import Dict, Any, Optional, List, Type, Mapping
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 import json
@@ -31,9 +31,42 @@ from schemas.metric_schema import (
     MetricResult, MetricDataPoint, MetricUnit, StatisticType
 )
 
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时使用标准json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+def _json_default(obj: Any) -> Any:
+    """非dict的映射（如只读的MappingProxyType）按dict序列化"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _pretty_json(data: Any) -> str:
+    """缩进2格、保留非ASCII字符的JSON文本，用于拼接LLM提示词（优先使用orjson）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                data,
+                default=_json_default,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            ).decode()
+        except orjson.JSONEncodeError:
+            pass  # 超出orjson支持范围（如超过64位的整数），改用标准json
+    return json.dumps(data, indent=2, ensure_ascii=False, default=_json_default)
+
+
+def _loads(content: str) -> Any:
+    """解析LLM返回的JSON（优先使用orjson；其JSONDecodeError是json.JSONDecodeError的子类）"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
 class DataAdapterAgent(BaseAgent):
     """
     数据适配Agent
@@ -308,14 +341,14 @@ class DataAdapterAgent(BaseAgent):
 
 原始数据：
 ```json
-{json.dumps(raw_data, indent=2, ensure_ascii=False)[:3000]}
+{_pretty_json(raw_data)[:3000]}
 ```
 
 资源类型：{resource_type}
 目标Schema：{target_schema}
 
 额外上下文：
-{json.dumps(context, indent=2, ensure_ascii=False) if context else "无"}
+{_pretty_json(context) if context else "无"}
 
 {f"API文档参考：{rag_context[:1000]}" if rag_context else ""}
 
@@ -342,7 +375,7 @@ class DataAdapterAgent(BaseAgent):
                 content = content[json_start:json_end].strip()
 
             # 解析JSON
-            converted_data = json.loads(content)
+            converted_data = _loads(content)
 
             # 尝试实例化Schema对象（验证）
             schema_obj = self._instantiate_schema(target_schema, converted_data)
@@ -59,7 +59,6 @@ class SpecDocAgent(BaseAgent):
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         super().__init__("SpecDocAgent", config)
         self.config_obj = get_config()
-        self.session: Optional[aiohttp.ClientSession] = None
         self._llm: Optional[ChatOpenAI] = None  # 延迟初始化
 
     @property
@@ -465,19 +464,18 @@ class SpecDocAgent(BaseAgent):
             "examples": []
         }
 
+        # 会话作为参数传给各请求方法，不存到实例上，并发的process()调用互不覆盖
         async with aiohttp.ClientSession() as session:
-            self.session = session
-
             for url in urls:
                 try:
                     # 尝试获取OpenAPI规格
-                    openapi_spec = await self._try_fetch_openapi(url)
+                    openapi_spec = await self._try_fetch_openapi(session, url)
                     if openapi_spec:
                         self._merge_openapi_spec(specifications, openapi_spec)
                         continue
 
                     # 如果没有OpenAPI规格，尝试解析HTML文档
-                    html_spec = await self._parse_html_docs(url, cloud_provider, service)
+                    html_spec = await self._parse_html_docs(session, url, cloud_provider, service)
                     if html_spec:
                         self._merge_spec(specifications, html_spec)
 
@@ -485,15 +483,18 @@ class SpecDocAgent(BaseAgent):
                     logger.warning(f"Failed to fetch from {url}: {str(e)}")
                     continue
 
-        self.session = None
         return specifications
 
-    async def _try_fetch_openapi(self, base_url: str) -> Optional[Dict[str, Any]]:
+    async def _try_fetch_openapi(
+        self,
+        session: aiohttp.ClientSession,
+        base_url: str
+    ) -> Optional[Dict[str, Any]]:
         """尝试获取OpenAPI规格文档"""
         # 如果URL本身就指向JSON文件，直接尝试拉取
         if base_url.endswith('.json') or 'swagger' in base_url.lower() or 'openapi' in base_url.lower():
             try:
-                async with self.session.get(base_url, timeout=30) as response:
+                async with session.get(base_url, timeout=30) as response:
                     if response.status == 200:
                         text = await response.text()
                         logger.info(f"成功拉取文档: {base_url}, 大小: {len(text)} 字符")
@@ -523,7 +524,7 @@ class SpecDocAgent(BaseAgent):
         for path in openapi_paths:
             try:
                 url = urljoin(base_url, path)
-                async with self.session.get(url, timeout=10) as response:
+                async with session.get(url, timeout=10) as response:
                     if response.status == 200:
                         spec = await response.json()
                         logger.info(f"成功拉取OpenAPI规格: {url}")
@@ -535,13 +536,14 @@ class SpecDocAgent(BaseAgent):
 
     async def _parse_html_docs(
         self,
+        session: aiohttp.ClientSession,
         url: str,
         cloud_provider: str,
         service: str
     ) -> Dict[str, Any]:
         """使用LLM智能解析HTML文档"""
         try:
-            async with self.session.get(url, timeout=30) as response:
+            async with session.get(url, timeout=30) as response:
                 if response.status != 200:
                     return {}
 
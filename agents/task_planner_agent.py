@@ -233,7 +233,8 @@ class TaskPlannerAgent(BaseAgent):
 - operation: 具体操作
 - parameters: 参数
 - dependencies: 依赖的前置步骤ID列表
-- output_key: 输出结果的key"""
+- output_key: 输出结果的key
+- condition: 可选，执行条件 {"source_key", "field", "operator", "value"}，不满足时跳过该步骤及依赖它的步骤"""
 
         user_prompt = f"""规划以下查询的执行步骤：
 
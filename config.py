@@ -101,6 +101,9 @@ class AgentConfig:
     max_retries: int = 3
     retry_delay: float = 1.0
     timeout: int = 300  # 5分钟
+    max_concurrency: int = 16  # 任务执行时同时运行的步骤数（及单步骤内并发的API调用数）上限
+    step_cache_ttl: int = 60  # 只读步骤结果的跨计划缓存有效期（秒），0表示不缓存
+    aws_threads: int = 32  # 执行同步boto3调用的线程池大小
     enable_logging: bool = True
     log_level: str = "INFO"
 
@@ -165,7 +165,12 @@ class RAGSystem:
                 "success": True,
                 "index_name": index_name,
                 "documents_indexed": len(documents),
-                "persist_dir": persist_dir
+                "persist_dir": persist_dir,
+                # 已格式化的操作文本（按operations顺序），供BM25等下游索引复用
+                "operation_texts": [
+                    doc.text for doc in documents
+                    if doc.metadata.get("type") == "operation"
+                ]
             }
 
         except Exception as e:
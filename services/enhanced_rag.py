@@ -3,34 +3,74 @@
 提供比基础向量检索更强的检索能力
 """
 from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import contextlib
 import logging
+import os
+import gzip
+import hashlib
+import json
+from collections import Counter, OrderedDict
 from dataclasses import dataclass
+from pathlib import Path
 import numpy as np
 from rank_bm25 import BM25Okapi
 import jieba
 import re
 
+try:
+    import xxhash
+except ImportError:  # xxhash为可选依赖，缺失时回退到hashlib.blake2b
+    xxhash = None
+
 logger = logging.getLogger(__name__)
 
 
+def compute_doc_id(text: str) -> int:
+    """
+    计算文档ID：文本前100字符的64位无符号哈希
+
+    去重和混合检索融合都以此作为文档唯一标识；两种实现都与进程无关（不受PYTHONHASHSEED影响）
+    """
+    key = text[:100].encode("utf-8")
+    if xxhash is not None:
+        return xxhash.xxh64_intdigest(key)
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
 class Reranker:
     """
     重排序模型 - 使用Cross-Encoder对检索结果重新打分
     比向量检索的双编码器（Bi-Encoder）更准确，但速度较慢
     """
 
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: Optional[int] = None
+    ):
         """
         Args:
             model_name: Cross-Encoder模型名称
                 推荐模型：
                 - cross-encoder/ms-marco-MiniLM-L-6-v2 (轻量级，英文)
                 - BAAI/bge-reranker-base (中文支持更好)
+            batch_size: 推理批大小（None表示按CPU核数自动选择）
         """
         self.model_name = model_name
+        self.batch_size = batch_size or min(128, max(16, (os.cpu_count() or 1) * 8))
         self._model = None
         self._model_initialized = False
 
+    @staticmethod
+    def _inference_mode():
+        """torch可用时关闭autograd，减少推理开销"""
+        try:
+            import torch
+            return torch.inference_mode()
+        except ImportError:
+            return contextlib.nullcontext()
+
     def _lazy_init_model(self):
         """延迟初始化模型"""
         if self._model_initialized:
@@ -76,11 +116,22 @@ class Reranker:
             return results[:top_k] if top_k else results
 
         try:
-            # 构建query-document对
-            pairs = [(query, result.text) for result in results]
+            # 超过一个批次时按文本长度降序排列，同一批内长度接近，减少padding浪费
+            order = list(range(len(results)))
+            if len(results) > self.batch_size:
+                order.sort(key=lambda i: len(results[i].text), reverse=True)
+
+            # 构建query-document对，所有候选一次predict调用完成
+            pairs = [(query, results[i].text) for i in order]
 
             # 计算相关性分数
-            scores = self._model.predict(pairs)
+            with self._inference_mode():
+                sorted_scores = self._model.predict(pairs, batch_size=self.batch_size)
+
+            # 恢复原始顺序
+            scores = [0.0] * len(results)
+            for position, i in enumerate(order):
+                scores[i] = sorted_scores[position]
 
             # 更新结果分数
             reranked_results = []
@@ -101,7 +152,7 @@ class Reranker:
             return results[:top_k] if top_k else results
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalResult:
     """检索结果数据类"""
     text: str
@@ -109,6 +160,11 @@ class RetrievalResult:
     metadata: Dict[str, Any]
     index: str
     source: str  # "vector", "bm25", "hybrid", "reranked"
+    doc_id: int = 0  # 文档ID（0表示未计算，构造时自动填充）
+
+    def __post_init__(self):
+        if not self.doc_id:
+            self.doc_id = compute_doc_id(self.text)
 
 
 class BM25Retriever:
@@ -117,11 +173,18 @@ class BM25Retriever:
     基于词频和逆文档频率的经典检索算法
     """
 
+    # 查询分词缓存容量
+    QUERY_TOKEN_CACHE_SIZE = 256
+
     def __init__(self):
         self.documents: List[Dict[str, Any]] = []
         self.tokenized_corpus: List[List[str]] = []
+        self.doc_ids: List[int] = []
         self.bm25: Optional[BM25Okapi] = None
 
+        # 查询分词LRU缓存（分词结果与语料无关，重建索引无需失效）
+        self._query_token_cache: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+
     def _tokenize(self, text: str) -> List[str]:
         """
         分词：支持中英文
@@ -138,6 +201,21 @@ class BM25Retriever:
 
         return tokens
 
+    def tokenize_query(self, query: str) -> Tuple[str, ...]:
+        """
+        查询分词（带LRU缓存），同一查询在多次检索间只调用一次jieba
+        """
+        tokens = self._query_token_cache.get(query)
+        if tokens is not None:
+            self._query_token_cache.move_to_end(query)
+            return tokens
+
+        tokens = tuple(self._tokenize(query))
+        self._query_token_cache[query] = tokens
+        if len(self._query_token_cache) > self.QUERY_TOKEN_CACHE_SIZE:
+            self._query_token_cache.popitem(last=False)
+        return tokens
+
     def index_documents(self, documents: List[Dict[str, Any]]):
         """
         索引文档
@@ -147,6 +225,7 @@ class BM25Retriever:
         """
         self.documents = documents
         self.tokenized_corpus = [self._tokenize(doc["text"]) for doc in documents]
+        self.doc_ids = [compute_doc_id(doc["text"]) for doc in documents]
 
         if self.tokenized_corpus:
             self.bm25 = BM25Okapi(self.tokenized_corpus)
@@ -154,6 +233,109 @@ class BM25Retriever:
         else:
             logger.warning("没有文档可索引")
 
+    @staticmethod
+    def _fingerprint(documents: List[Dict[str, Any]]) -> str:
+        """计算文档集合指纹，用于判断磁盘索引是否过期"""
+        digest = hashlib.sha256()
+        for doc in documents:
+            digest.update(doc["text"].encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def save(self, path: str) -> bool:
+        """
+        持久化BM25索引（分词结果和统计量），重启后无需重新分词
+
+        目录结构：
+        - corpus.json.gz: 文档、分词结果、idf等统计量（文档ID加载时重新计算）
+        - doc_len.npy: 文档长度数组（加载时mmap）
+
+        Args:
+            path: 索引目录
+
+        Returns:
+            是否保存成功
+        """
+        if not self.bm25:
+            logger.warning("BM25索引未初始化，跳过保存")
+            return False
+
+        try:
+            index_dir = Path(path)
+            index_dir.mkdir(parents=True, exist_ok=True)
+
+            np.save(index_dir / "doc_len.npy", np.asarray(self.bm25.doc_len, dtype=np.int64))
+
+            payload = {
+                "fingerprint": self._fingerprint(self.documents),
+                "documents": self.documents,
+                "tokenized_corpus": self.tokenized_corpus,
+                "idf": self.bm25.idf,
+                "avgdl": self.bm25.avgdl,
+                "average_idf": self.bm25.average_idf,
+                "k1": self.bm25.k1,
+                "b": self.bm25.b,
+                "epsilon": self.bm25.epsilon
+            }
+            with gzip.open(index_dir / "corpus.json.gz", "wt", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+
+            logger.info(f"BM25索引已保存: {index_dir}")
+            return True
+
+        except Exception as e:
+            logger.error(f"保存BM25索引失败: {e}")
+            return False
+
+    def load(self, path: str, documents: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        从磁盘加载BM25索引
+
+        Args:
+            path: 索引目录
+            documents: 期望的文档列表；提供时校验指纹，不一致视为过期
+
+        Returns:
+            是否加载成功
+        """
+        index_dir = Path(path)
+        corpus_file = index_dir / "corpus.json.gz"
+        if not corpus_file.exists():
+            return False
+
+        try:
+            with gzip.open(corpus_file, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+
+            if documents is not None and payload["fingerprint"] != self._fingerprint(documents):
+                logger.info(f"BM25索引已过期，需要重建: {index_dir}")
+                return False
+
+            # 直接恢复统计量，跳过jieba分词和idf计算
+            bm25 = BM25Okapi.__new__(BM25Okapi)
+            bm25.k1 = payload["k1"]
+            bm25.b = payload["b"]
+            bm25.epsilon = payload["epsilon"]
+            bm25.tokenizer = None
+            bm25.doc_len = np.load(index_dir / "doc_len.npy", mmap_mode="r")
+            bm25.doc_freqs = [dict(Counter(tokens)) for tokens in payload["tokenized_corpus"]]
+            bm25.corpus_size = len(bm25.doc_freqs)
+            bm25.avgdl = payload["avgdl"]
+            bm25.average_idf = payload["average_idf"]
+            bm25.idf = payload["idf"]
+
+            self.documents = payload["documents"]
+            self.tokenized_corpus = payload["tokenized_corpus"]
+            self.doc_ids = [compute_doc_id(doc["text"]) for doc in self.documents]
+            self.bm25 = bm25
+
+            logger.info(f"BM25索引从磁盘加载完成，文档数: {len(self.documents)}")
+            return True
+
+        except Exception as e:
+            logger.error(f"加载BM25索引失败: {e}")
+            return False
+
     def search(self, query: str, top_k: int = 10) -> List[RetrievalResult]:
         """
         搜索相关文档
@@ -162,6 +344,19 @@ class BM25Retriever:
             query: 查询文本
             top_k: 返回top-k结果
 
+        Returns:
+            检索结果列表
+        """
+        return self.search_tokenized(self.tokenize_query(query), top_k)
+
+    def search_tokenized(self, tokens: Tuple[str, ...], top_k: int = 10) -> List[RetrievalResult]:
+        """
+        使用已分词的查询搜索相关文档
+
+        Args:
+            tokens: 查询分词结果（见tokenize_query）
+            top_k: 返回top-k结果
+
         Returns:
             检索结果列表
         """
@@ -169,8 +364,7 @@ class BM25Retriever:
             logger.warning("BM25索引未初始化")
             return []
 
-        tokenized_query = self._tokenize(query)
-        scores = self.bm25.get_scores(tokenized_query)
+        scores = self.bm25.get_scores(tokens)
 
         # 获取top-k索引
         top_indices = np.argsort(scores)[::-1][:top_k]
@@ -184,7 +378,8 @@ class BM25Retriever:
                     score=float(scores[idx]),
                     metadata=doc.get("metadata", {}),
                     index=doc.get("index", "unknown"),
-                    source="bm25"
+                    source="bm25",
+                    doc_id=self.doc_ids[idx]
                 ))
 
         return results
@@ -227,71 +422,86 @@ class HybridRetriever:
         Returns:
             融合后的结果
         """
-        # 构建文档ID映射（使用text作为唯一标识）
-        doc_scores: Dict[str, Dict[str, Any]] = {}
-
-        # 处理向量检索结果
-        for rank, result in enumerate(vector_results, 1):
-            doc_id = result.text[:100]  # 使用前100字符作为ID
-            if doc_id not in doc_scores:
-                doc_scores[doc_id] = {
-                    "result": result,
-                    "vector_rank": rank,
-                    "bm25_rank": None,
-                    "rrf_score": 0.0
-                }
-            doc_scores[doc_id]["vector_rank"] = rank
-
-        # 处理BM25检索结果
-        for rank, result in enumerate(bm25_results, 1):
-            doc_id = result.text[:100]
-            if doc_id not in doc_scores:
-                doc_scores[doc_id] = {
-                    "result": result,
-                    "vector_rank": None,
-                    "bm25_rank": rank,
-                    "rrf_score": 0.0
-                }
-            else:
-                doc_scores[doc_id]["bm25_rank"] = rank
-
-        # 计算RRF分数
-        for doc_id, info in doc_scores.items():
-            rrf_score = 0.0
-
-            if info["vector_rank"] is not None:
-                rrf_score += self.vector_weight * (1.0 / (self.k + info["vector_rank"]))
-
-            if info["bm25_rank"] is not None:
-                rrf_score += self.bm25_weight * (1.0 / (self.k + info["bm25_rank"]))
+        # 单路结果（如BM25尚未建索引）：RRF退化为按原顺序打分，无需向量化融合
+        if not vector_results or not bm25_results:
+            return self._fuse_single(
+                vector_results or bm25_results,
+                self.vector_weight if vector_results else self.bm25_weight,
+                top_k
+            )
+
+        candidates = vector_results + bm25_results
+        n_vector = len(vector_results)
+
+        # 文档ID已在结果构造时计算，交给np.unique完成去重映射
+        doc_ids = np.fromiter(
+            (result.doc_id for result in candidates),
+            dtype=np.uint64,
+            count=len(candidates)
+        )
+        _, first_index, inverse = np.unique(doc_ids, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
 
-            info["rrf_score"] = rrf_score
+        # 每个文档在两路结果中的最佳排名（未出现为inf，RRF贡献为0）
+        ranks = np.arange(1, len(candidates) + 1, dtype=np.float64)
+        ranks[n_vector:] -= n_vector
+        vector_rank = np.full(len(first_index), np.inf)
+        bm25_rank = np.full(len(first_index), np.inf)
+        np.minimum.at(vector_rank, inverse[:n_vector], ranks[:n_vector])
+        np.minimum.at(bm25_rank, inverse[n_vector:], ranks[n_vector:])
 
-        # 按RRF分数排序
-        sorted_docs = sorted(
-            doc_scores.values(),
-            key=lambda x: x["rrf_score"],
-            reverse=True
+        # 计算RRF分数
+        rrf_scores = (
+            self.vector_weight / (self.k + vector_rank)
+            + self.bm25_weight / (self.k + bm25_rank)
         )
 
-        # 构建融合结果
+        # 按RRF分数降序排序，同分时保持首次出现的顺序
+        order = np.lexsort((first_index, -rrf_scores))[:top_k]
+
+        # 构建融合结果（每个文档保留首次出现的结果对象）
         fused_results = []
-        for doc_info in sorted_docs[:top_k]:
-            result = doc_info["result"]
+        for doc_idx in order:
+            result = candidates[first_index[doc_idx]]
             # 更新分数和来源
-            result.score = doc_info["rrf_score"]
+            result.score = float(rrf_scores[doc_idx])
             result.source = "hybrid"
             fused_results.append(result)
 
         logger.info(f"混合检索完成，融合{len(vector_results)}个向量结果和{len(bm25_results)}个BM25结果")
         return fused_results
 
+    def _fuse_single(
+        self,
+        results: List[RetrievalResult],
+        weight: float,
+        top_k: int
+    ) -> List[RetrievalResult]:
+        """只有一路结果时的融合：保持原排名，分数为 weight/(k + rank)"""
+        seen = set()
+        fused_results = []
+
+        for rank, result in enumerate(results, 1):
+            if len(fused_results) >= top_k:
+                break
+            if result.doc_id in seen:
+                continue
+            seen.add(result.doc_id)
+            result.score = weight / (self.k + rank)
+            result.source = "hybrid"
+            fused_results.append(result)
+
+        return fused_results
+
 
 class QueryRewriter:
     """
     Query改写器 - 使用LLM优化查询
     """
 
+    # 逐行解析改写结果，去掉"改写1："之类的前缀
+    _LINE_PATTERN = re.compile(r'^[ \t]*(?:改写\d*[:：])?[ \t]*(\S.*?)[ \t\r]*$', re.MULTILINE)
+
     def __init__(self, llm):
         """
         Args:
@@ -335,11 +545,11 @@ class QueryRewriter:
             response = await self.llm.ainvoke(prompt)
             content = response.content if hasattr(response, 'content') else str(response)
 
-            # 解析改写结果
-            rewrites = [line.strip() for line in content.strip().split('\n') if line.strip()]
-
-            # 过滤掉明显是标题或序号的行
-            rewrites = [r for r in rewrites if not r.startswith('改写') and len(r) > 3]
+            # 解析改写结果，过滤掉明显是标题或序号的行
+            rewrites = [
+                r for r in self._LINE_PATTERN.findall(content)
+                if not r.startswith('改写') and len(r) > 3
+            ]
 
             # 添加原始查询
             all_queries = [query] + rewrites[:3]
@@ -357,6 +567,35 @@ class RetrievalMetrics:
     检索评估指标
     """
 
+    # NDCG折扣系数 1/log2(rank+1)，预先计算，按需扩容
+    _discounts_cache = 1.0 / np.log2(np.arange(2, 258))
+
+    @classmethod
+    def _discounts(cls, k: int) -> np.ndarray:
+        """获取前k个位置的折扣系数"""
+        if k > len(cls._discounts_cache):
+            cls._discounts_cache = 1.0 / np.log2(np.arange(2, k + 2))
+        return cls._discounts_cache[:k]
+
+    @staticmethod
+    def _to_hit_matrix(
+        retrieved_lists: List[List[str]],
+        relevant_lists: List[List[str]],
+        k: int
+    ) -> np.ndarray:
+        """
+        构建命中矩阵
+
+        Returns:
+            (查询数, k) 的布尔数组，hits[q, i]表示第q个查询的第i个结果是否相关
+        """
+        hits = np.zeros((len(retrieved_lists), k), dtype=bool)
+        for row, (retrieved, relevant) in enumerate(zip(retrieved_lists, relevant_lists)):
+            relevant_set = set(relevant)
+            top_k = retrieved[:k]
+            hits[row, :len(top_k)] = [doc_id in relevant_set for doc_id in top_k]
+        return hits
+
     @staticmethod
     def precision_at_k(retrieved: List[str], relevant: List[str], k: int) -> float:
         """
@@ -408,20 +647,17 @@ class RetrievalMetrics:
         if len(retrieved_lists) != len(relevant_lists):
             raise ValueError("检索结果和相关文档列表长度不匹配")
 
-        reciprocal_ranks = []
+        if not retrieved_lists:
+            return 0.0
 
-        for retrieved, relevant in zip(retrieved_lists, relevant_lists):
-            relevant_set = set(relevant)
+        max_len = max(1, max(len(retrieved) for retrieved in retrieved_lists))
+        hits = RetrievalMetrics._to_hit_matrix(retrieved_lists, relevant_lists, max_len)
 
-            # 找到第一个相关文档的位置
-            for rank, doc_id in enumerate(retrieved, 1):
-                if doc_id in relevant_set:
-                    reciprocal_ranks.append(1.0 / rank)
-                    break
-            else:
-                reciprocal_ranks.append(0.0)
+        # 第一个相关文档的位置，未命中的查询记为0
+        first_hit = np.argmax(hits, axis=1)
+        reciprocal_ranks = np.where(hits.any(axis=1), 1.0 / (first_hit + 1), 0.0)
 
-        return sum(reciprocal_ranks) / len(reciprocal_ranks) if reciprocal_ranks else 0.0
+        return float(reciprocal_ranks.mean())
 
     @staticmethod
     def ndcg_at_k(retrieved: List[str], relevant: List[str], k: int) -> float:
@@ -430,24 +666,44 @@ class RetrievalMetrics:
 
         假设相关文档的相关性分数为1，其他为0
         """
-        if k == 0 or len(relevant) == 0:
+        return RetrievalMetrics.mean_ndcg_at_k([retrieved], [relevant], k)
+
+    @staticmethod
+    def mean_ndcg_at_k(
+        retrieved_lists: List[List[str]],
+        relevant_lists: List[List[str]],
+        k: int
+    ) -> float:
+        """
+        批量计算多个查询的平均NDCG@K
+
+        Args:
+            retrieved_lists: 多个查询的检索结果列表
+            relevant_lists: 多个查询的相关文档列表
+            k: Top-K
+
+        Returns:
+            平均NDCG@K分数（无相关文档的查询记为0）
+        """
+        if len(retrieved_lists) != len(relevant_lists):
+            raise ValueError("检索结果和相关文档列表长度不匹配")
+
+        if k == 0 or not retrieved_lists:
             return 0.0
 
-        top_k = retrieved[:k]
-        relevant_set = set(relevant)
+        hits = RetrievalMetrics._to_hit_matrix(retrieved_lists, relevant_lists, k)
+        discounts = RetrievalMetrics._discounts(k)
 
         # 计算DCG
-        dcg = 0.0
-        for i, doc_id in enumerate(top_k, 1):
-            if doc_id in relevant_set:
-                dcg += 1.0 / np.log2(i + 1)
+        dcg = hits @ discounts
 
         # 计算IDCG（理想情况下的DCG）
-        idcg = 0.0
-        for i in range(min(len(relevant), k)):
-            idcg += 1.0 / np.log2(i + 2)
+        relevant_counts = np.minimum([len(relevant) for relevant in relevant_lists], k)
+        ideal_gains = np.concatenate(([0.0], np.cumsum(discounts)))
+        idcg = ideal_gains[relevant_counts]
 
-        return dcg / idcg if idcg > 0 else 0.0
+        ndcg = np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0)
+        return float(ndcg.mean())
 
 
 class EnhancedRAG:
@@ -455,15 +711,23 @@ class EnhancedRAG:
     增强RAG系统 - 整合所有优化功能
     """
 
-    def __init__(self, base_rag_system, llm=None, reranker_model: Optional[str] = None):
+    def __init__(
+        self,
+        base_rag_system,
+        llm=None,
+        reranker_model: Optional[str] = None,
+        bm25_cache_dir: Optional[str] = ".cache"
+    ):
         """
         Args:
             base_rag_system: 基础RAG系统实例（提供向量检索）
             llm: LLM实例（用于Query改写）
             reranker_model: Reranker模型名称（None表示不使用）
+            bm25_cache_dir: BM25索引持久化目录（默认 .cache/，None表示不持久化）
         """
         self.base_rag = base_rag_system
         self.llm = llm
+        self.bm25_cache_dir = Path(bm25_cache_dir) if bm25_cache_dir else None
 
         self.bm25_retriever = BM25Retriever()
         self.hybrid_retriever = HybridRetriever(
@@ -506,12 +770,19 @@ class EnhancedRAG:
         if index_name is None:
             index_name = f"{cloud_provider}.{service}"
 
-        # 转换为文档列表
+        # 转换为文档列表（优先复用向量索引阶段已格式化的操作文本）
         documents = []
         specifications = spec_data.get("specifications", {})
+        operations = specifications.get("operations", [])
 
-        for op in specifications.get("operations", []):
-            text = self.base_rag._format_operation_text(op, cloud_provider, service)
+        operation_texts = vector_result.get("operation_texts")
+        if operation_texts is None or len(operation_texts) != len(operations):
+            operation_texts = [
+                self.base_rag._format_operation_text(op, cloud_provider, service)
+                for op in operations
+            ]
+
+        for op, text in zip(operations, operation_texts):
             documents.append({
                 "text": text,
                 "metadata": {
@@ -523,9 +794,14 @@ class EnhancedRAG:
                 "index": index_name
             })
 
-        # 索引到BM25
+        # 索引到BM25（文档未变化时直接加载磁盘索引，跳过分词）
         self.indexed_documents[index_name] = documents
-        self.bm25_retriever.index_documents(documents)
+        bm25_path = self.bm25_cache_dir / f"bm25_{index_name}.idx" if self.bm25_cache_dir else None
+
+        if not (bm25_path and self.bm25_retriever.load(str(bm25_path), documents)):
+            self.bm25_retriever.index_documents(documents)
+            if bm25_path:
+                self.bm25_retriever.save(str(bm25_path))
 
         logger.info(f"增强索引完成：{index_name}，文档数：{len(documents)}")
 
@@ -565,35 +841,31 @@ class EnhancedRAG:
             查询结果
         """
         try:
-            # Query改写
-            queries = [query_text]
+            # 检索（启用Query改写时，改写与原始查询检索并发进行）
+            search = self._hybrid_search if use_hybrid else self._vector_search
+            candidate_k = top_k * 3  # 获取更多候选，供reranker选择
+
             if use_rewrite and self.query_rewriter:
-                queries = await self.query_rewriter.rewrite(query_text)
+                # 原始查询的检索与LLM改写并发执行，隐藏改写延迟
+                original_results, queries = await asyncio.gather(
+                    search(query_text, index_name, cloud_provider, service, candidate_k),
+                    self.query_rewriter.rewrite(query_text)
+                )
                 logger.info(f"Query改写：{len(queries)}个查询变体")
 
-            all_results = []
-
-            for query in queries:
-                if use_hybrid:
-                    # 混合检索
-                    results = await self._hybrid_search(
-                        query,
-                        index_name,
-                        cloud_provider,
-                        service,
-                        top_k * 3  # 获取更多候选，供reranker选择
-                    )
-                else:
-                    # 仅向量检索
-                    results = await self._vector_search(
-                        query,
-                        index_name,
-                        cloud_provider,
-                        service,
-                        top_k * 3
-                    )
-
-                all_results.extend(results)
+                # 改写出的查询变体并发检索
+                rewrite_results = await asyncio.gather(*[
+                    search(query, index_name, cloud_provider, service, candidate_k)
+                    for query in queries[1:]
+                ])
+                result_lists = [original_results, *rewrite_results]
+            else:
+                queries = [query_text]
+                result_lists = [
+                    await search(query_text, index_name, cloud_provider, service, candidate_k)
+                ]
+
+            all_results = [result for results in result_lists for result in results]
 
             # 去重
             unique_results = self._deduplicate_results(all_results)
@@ -667,8 +939,8 @@ class EnhancedRAG:
             query, index_name, cloud_provider, service, top_k * 2
         )
 
-        # BM25检索
-        bm25_results = self.bm25_retriever.search(query, top_k * 2)
+        # BM25检索（索引未建立时跳过）
+        bm25_results = self.bm25_retriever.search(query, top_k * 2) if self.bm25_retriever.bm25 else []
 
         # 融合结果
         hybrid_results = self.hybrid_retriever.fuse_results(
@@ -685,10 +957,9 @@ class EnhancedRAG:
         unique = []
 
         for result in results:
-            # 使用文本前100字符作为唯一标识
-            doc_id = result.text[:100]
-            if doc_id not in seen:
-                seen.add(doc_id)
+            # 使用预先计算的文档ID作为唯一标识
+            if result.doc_id not in seen:
+                seen.add(result.doc_id)
                 unique.append(result)
 
         return unique
@@ -2,14 +2,21 @@
 权限管理系统
 管理生成代码对云资源的访问权限，遵循最小权限原则
 """
-from typing import Dict, List, Set, Optional, Any
+from typing import Dict, FrozenSet, List, Set, Optional, Any
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
 
+def _normalize_action(action: str) -> str:
+    """归一化操作名（忽略大小写、下划线和连字符），用于模糊匹配"""
+    return action.lower().replace('_', '').replace('-', '')
+
+
 class PermissionLevel(Enum):
     """权限级别"""
     READ_ONLY = "read_only"  # 只读（查询、描述、列出）
@@ -26,14 +33,15 @@ class CloudProvider(Enum):
     VOLCANO = "volcano"
 
 
-@dataclass
+@dataclass(slots=True)
 class Permission:
     """权限定义"""
     provider: CloudProvider
     service: str  # 服务名称（如：ec2, s3, monitor）
-    actions: Set[str]  # 允许的操作
+    actions: FrozenSet[str]  # 允许的操作（不可变）
     level: PermissionLevel
     description: str = ""
+    normalized_actions: Dict[str, str] = field(default_factory=dict)  # 归一化操作名 -> 原始操作名
 
 
 class PermissionManager:
@@ -123,6 +131,9 @@ class PermissionManager:
         'drop', 'truncate', 'purge', 'kill'
     }
 
+    # 危险关键字合并为单个正则，一次扫描完成检测
+    _DANGEROUS_PATTERN = re.compile('|'.join(map(re.escape, sorted(DANGEROUS_ACTIONS))))
+
     def __init__(self, default_level: PermissionLevel = PermissionLevel.READ_ONLY):
         """
         Args:
@@ -131,6 +142,13 @@ class PermissionManager:
         self.default_level = default_level
         self.permissions: Dict[str, Permission] = {}
 
+        # 权限摘要的增量统计（在add_permission中维护）
+        self._by_provider: Dict[str, Dict[str, int]] = {}
+        self._by_level: Dict[str, int] = {level.value: 0 for level in PermissionLevel}
+
+        # 权限检查结果缓存（同一会话中相同操作会被反复检查），add_permission时失效
+        self._check_action_cached = lru_cache(maxsize=2048)(self._check_action)
+
         # 初始化默认权限
         self._initialize_default_permissions()
 
@@ -199,14 +217,35 @@ class PermissionManager:
         permission = Permission(
             provider=provider,
             service=service,
-            actions=actions,
+            actions=frozenset(actions),
             level=level,
-            description=description
+            description=description,
+            normalized_actions={_normalize_action(a): a for a in actions}
         )
 
+        # 覆盖已有权限时先扣除旧权限的统计
+        previous = self.permissions.get(key)
+        if previous is not None:
+            self._update_summary(previous, -1)
+
         self.permissions[key] = permission
+        self._update_summary(permission, 1)
+        self._check_action_cached.cache_clear()
         logger.info(f"添加权限: {key} - {level.value} - {len(actions)}个操作")
 
+    def _update_summary(self, permission: Permission, sign: int):
+        """增量更新权限摘要统计（sign为1表示加入，-1表示移除）"""
+        provider_stats = self._by_provider.setdefault(
+            permission.provider.value,
+            {"services": 0, "total_actions": 0}
+        )
+        provider_stats["services"] += sign
+        provider_stats["total_actions"] += sign * len(permission.actions)
+        self._by_level[permission.level.value] += sign
+
+        if provider_stats["services"] == 0:
+            del self._by_provider[permission.provider.value]
+
     def check_action(
         self,
         provider: str,
@@ -214,7 +253,7 @@ class PermissionManager:
         action: str
     ) -> Dict[str, Any]:
         """
-        检查操作是否被允许
+        检查操作是否被允许（结果按(provider, service, action)缓存）
 
         Args:
             provider: 云服务提供商
@@ -224,16 +263,25 @@ class PermissionManager:
         Returns:
             检查结果
         """
+        # 返回浅拷贝，避免调用方修改缓存中的结果
+        return dict(self._check_action_cached(provider, service, action))
+
+    def _check_action(
+        self,
+        provider: str,
+        service: str,
+        action: str
+    ) -> Dict[str, Any]:
+        """检查操作是否被允许（未缓存的实际检查逻辑）"""
         # 1. 首先检查是否是危险操作
-        action_lower = action.lower()
-        for dangerous_word in self.DANGEROUS_ACTIONS:
-            if dangerous_word in action_lower:
-                return {
-                    "allowed": False,
-                    "reason": f"危险操作 '{action}' 被禁止（包含关键字: {dangerous_word}）",
-                    "level": "blocked",
-                    "suggestion": "生成的代码只能进行只读查询，不能删除或修改资源"
-                }
+        dangerous_match = self._DANGEROUS_PATTERN.search(action.lower())
+        if dangerous_match:
+            return {
+                "allowed": False,
+                "reason": f"危险操作 '{action}' 被禁止（包含关键字: {dangerous_match.group(0)}）",
+                "level": "blocked",
+                "suggestion": "生成的代码只能进行只读查询，不能删除或修改资源"
+            }
 
         # 2. 检查权限表
         key = f"{provider}.{service}"
@@ -260,22 +308,19 @@ class PermissionManager:
             }
 
         # 4. 模糊匹配（处理不同的命名风格）
-        action_normalized = action.lower().replace('_', '').replace('-', '')
-
-        for allowed_action in permission.actions:
-            allowed_normalized = allowed_action.lower().replace('_', '').replace('-', '')
-
-            if action_normalized == allowed_normalized:
-                return {
-                    "allowed": True,
-                    "level": permission.level.value,
-                    "matched_action": allowed_action,
-                    "permission": {
-                        "provider": permission.provider.value,
-                        "service": permission.service,
-                        "description": permission.description
-                    }
+        matched_action = permission.normalized_actions.get(_normalize_action(action))
+
+        if matched_action is not None:
+            return {
+                "allowed": True,
+                "level": permission.level.value,
+                "matched_action": matched_action,
+                "permission": {
+                    "provider": permission.provider.value,
+                    "service": permission.service,
+                    "description": permission.description
                 }
+            }
 
         # 5. 未找到匹配的操作
         return {
@@ -311,28 +356,15 @@ class PermissionManager:
         Returns:
             权限摘要信息
         """
-        summary = {
+        return {
             "total_permissions": len(self.permissions),
             "default_level": self.default_level.value,
-            "by_provider": {},
-            "by_level": {level.value: 0 for level in PermissionLevel}
+            "by_provider": {
+                provider: dict(stats) for provider, stats in self._by_provider.items()
+            },
+            "by_level": dict(self._by_level)
         }
 
-        for permission in self.permissions.values():
-            provider = permission.provider.value
-
-            if provider not in summary["by_provider"]:
-                summary["by_provider"][provider] = {
-                    "services": 0,
-                    "total_actions": 0
-                }
-
-            summary["by_provider"][provider]["services"] += 1
-            summary["by_provider"][provider]["total_actions"] += len(permission.actions)
-            summary["by_level"][permission.level.value] += 1
-
-        return summary
-
 
 # 全局权限管理器实例
 _permission_manager: Optional[PermissionManager] = None
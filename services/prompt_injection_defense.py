@@ -4,18 +4,122 @@ Prompt Injection防御系统
 """
 import re
 import logging
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
 from dataclasses import dataclass
 
+try:
+    import re2
+except ImportError:  # google-re2为可选依赖，未安装时使用标准re
+    re2 = None
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick为可选依赖，未安装时逐个子串查找
+    ahocorasick = None
+
 logger = logging.getLogger(__name__)
 
+# RE2的\s只匹配ASCII空白，替换为与Python re一致的Unicode空白字符类
+_RE2_WHITESPACE = r"[\t-\r\x{1c}-\x{1f}\x{85}\p{Z}]"
+
+# Python re在IGNORECASE下把İ/ı视为i，RE2不会，扫描前先统一替换（等长，不影响位置）
+_RE2_CASE_TABLE = str.maketrans({"\u0130": "i", "\u0131": "i"})
+
+# Python re在IGNORECASE下额外等价的字符（ſ≡s、K≡k等），预过滤前先折叠，避免被大小写变体绕过
+_PREFILTER_CASE_TABLE = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """判断正则在顶层（任何分组之外）是否存在"|" """
+    depth = 0
+    escaped = False
+    for ch in pattern:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return True
+    return False
+
+
+# "X.*Y"中第一个".*"（或".*?"），以及X中不允许出现的元素（除\s*外的量词、任意字符"."）
+_DOT_STAR = re.compile(r"(?<!\\)\.\*(\??)")
+_UNSAFE_PREFIX = re.compile(r"(?<![\\(])[.+?{]|(?<!\\s)\*")
+
+
+def _linearize(pattern: str, group: Optional[str] = None) -> str:
+    """
+    把"X.*Y"形式的正则改写为线性时间的等价形式
+
+    原形式在X重复出现而Y不出现时，会从每个X开始重新扫描到行尾，耗时随输入长度平方增长。
+    "."不跨行，若一行中第一个X之后没有Y，该行后续的X之后也不会有，
+    因此用原子分组锁定每行第一个X，每行只尝试一次：(?:^|(?<=\n))(?>[^\n]*?X)[^\n]*Y。
+    X可通过命名分组group捕获，以便报告从X开始的匹配文本。
+    X不是简单字面量（含量词或"."）、或存在顶层"|"时原样返回。
+    """
+    dot_star = _DOT_STAR.search(pattern)
+    if not dot_star or _has_top_level_alternation(pattern):
+        return pattern
+
+    prefix, lazy, rest = pattern[:dot_star.start()], dot_star.group(1), pattern[dot_star.end():]
+    if not prefix or _UNSAFE_PREFIX.search(prefix) or _DOT_STAR.search(rest):
+        return pattern
+
+    head = f"(?P<{group}>{prefix})" if group else f"(?:{prefix})"
+    return rf"(?:^|(?<=\n))(?>[^\n]*?{head})[^\n]*{lazy}{rest}"
+
+
+def _literal_anchors(pattern: str) -> Tuple[str, ...]:
+    """
+    提取正则必然包含的字面量锚点（小写），用于预过滤
+
+    只识别两种形式：开头的字面量前缀（如 "eval\\s*\\("→"eval"），
+    以及开头由纯字面量组成的分组（如 "(?:delete|remove).*"→"delete","remove"）。
+    无法安全提取时返回空元组，表示该模式不参与预过滤、总是执行。
+    """
+    # 顶层存在"|"时前缀不是必然出现的，放弃提取
+    if _has_top_level_alternation(pattern):
+        return ()
+
+    group = re.match(r"\(\?:([^()\\|.*+?\[{]+(?:\|[^()\\|.*+?\[{]+)*)\)", pattern)
+    if group:
+        return tuple(alt.lower() for alt in group.group(1).split("|"))
+
+    literal = []
+    i = 0
+    if pattern.startswith("\\b"):
+        i = 2
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            literal.append(pattern[i + 1])
+            i += 2
+        elif ch in "\\.^$*+?{}[]()|" or ch.isspace():
+            break
+        else:
+            literal.append(ch)
+            i += 1
+
+    # 紧跟的量词使最后一个字符可选
+    if literal and i < len(pattern) and pattern[i] in "*?{":
+        literal.pop()
+
+    anchor = "".join(literal).lower()
+    return (anchor,) if anchor else ()
+
 
 class SecurityError(Exception):
     """安全错误异常"""
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """验证结果"""
     passed: bool
@@ -88,14 +192,14 @@ class PromptInjectionDefense:
         r"\.decode\s*\(['\"]",
     ]
 
-    # 危险操作白名单（允许的只读操作）
-    ALLOWED_ACTIONS = {
+    # 危险操作白名单（允许的只读操作，均为小写，不可变）
+    ALLOWED_ACTIONS: FrozenSet[str] = frozenset({
         "list", "列出", "显示", "查看", "show", "display",
         "query", "查询", "统计", "分析", "analyze", "stats",
         "describe", "描述", "详情", "信息", "info", "get",
         "search", "搜索", "查找", "find",
         "monitor", "监控", "观察", "watch",
-    }
+    })
 
     # 危险操作黑名单（禁止的写操作）
     # 注意：这些词必须是完整单词，不能是子串
@@ -114,16 +218,272 @@ class PromptInjectionDefense:
         # "run"太容易误杀（running），暂不包含
     ]
 
-    def __init__(self, max_input_length: int = 1000):
+    # 资源类型关键词（按顺序优先匹配）
+    RESOURCE_KEYWORDS = {
+        "ec2": ["ec2", "实例", "instance", "虚拟机", "vm"],
+        "rds": ["rds", "数据库", "database", "db"],
+        "s3": ["s3", "存储", "bucket", "对象存储"],
+        "lambda": ["lambda", "函数", "function", "serverless"],
+        "cloudwatch": ["cloudwatch", "监控", "metrics", "指标"],
+        "logs": ["logs", "日志", "logging"],
+        "vpc": ["vpc", "网络", "network", "subnet"],
+        "cdn": ["cdn", "cloudfront", "分发", "缓存"],
+    }
+
+    # 云平台关键词（按顺序优先匹配）
+    CLOUD_PROVIDER_KEYWORDS = {
+        "aws": ["aws", "亚马逊", "amazon"],
+        "azure": ["azure", "微软", "microsoft"],
+        "gcp": ["gcp", "google", "谷歌"],
+        "aliyun": ["aliyun", "阿里", "ali", "阿里云"],
+        "volcengine": ["volcengine", "火山", "字节"],
+    }
+
+    # 资源状态关键词
+    STATUS_KEYWORDS = {
+        "running": ["running", "运行"],
+        "stopped": ["stopped", "停止"],
+    }
+
+    # 时间范围关键词
+    TIME_RANGE_KEYWORDS = {
+        "1h": ["last hour", "最近1小时", "过去1小时"],
+        "24h": ["last 24 hours", "最近24小时", "过去一天"],
+        "7d": ["last 7 days", "最近7天", "过去一周"],
+    }
+
+    # 阈值提取正则（作用于已小写的文本，无需IGNORECASE）
+    _CPU_PATTERN = re.compile(_linearize(r"cpu.*?(\d+)%?"))
+    _MEMORY_PATTERN = re.compile(_linearize(r"(?:memory|内存).*?(\d+)%?"))
+
+    # 否定词：出现在危险词前20个字符内时视为安全上下文
+    NEGATION_WORDS = ["不要", "不能", "禁止", "防止", "避免", "don't", "do not", "prevent", "avoid", "how to prevent"]
+
+    def __init__(self, max_input_length: int = 1000, use_re2: bool = False):
         """
         初始化防御系统
 
+        正则和自动机在类定义时编译（见_compile_patterns），实例之间共享，创建实例几乎没有开销。
+
         Args:
             max_input_length: 最大输入长度（字符数）
+            use_re2: 黑名单检测是否使用RE2引擎（线性时间、无回溯，需要安装google-re2）
         """
         self.max_input_length = max_input_length
-        self.compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.BLACKLIST_PATTERNS]
-        self.compiled_dangerous_actions = [re.compile(pattern, re.IGNORECASE) for pattern in self.DANGEROUS_ACTIONS_PATTERNS]
+
+        # RE2只用于黑名单：危险操作模式依赖\b，而RE2的\b不把中文视为单词字符
+        self.blacklist_re2 = None
+        if use_re2:
+            cls = type(self)
+            if "_blacklist_re2" not in cls.__dict__:
+                cls._blacklist_re2 = cls._compile_re2_blacklist()
+            self.blacklist_re2 = cls._blacklist_re2
+
+    def __init_subclass__(cls, **kwargs):
+        """子类可能覆盖模式表，为其单独编译"""
+        super().__init_subclass__(**kwargs)
+        cls._compile_patterns()
+
+    @classmethod
+    def _compile_patterns(cls):
+        """编译类级别的正则与自动机（每个类只执行一次）"""
+        # 各模式合并为单个交替正则，一次扫描即可完成检测；"X.*Y"改写为线性形式，避免回溯
+        cls._blacklist_linear = [
+            _linearize(pattern, f"_x{i}") for i, pattern in enumerate(cls.BLACKLIST_PATTERNS)
+        ]
+        cls.blacklist_re = re.compile(
+            "|".join(f"(?:{pattern})" for pattern in cls._blacklist_linear),
+            re.IGNORECASE
+        )
+        cls.dangerous_actions_re = re.compile(
+            "|".join(f"(?:{pattern})" for pattern in cls.DANGEROUS_ACTIONS_PATTERNS),
+            re.IGNORECASE
+        )
+        cls._negation_re = re.compile("|".join(map(re.escape, cls.NEGATION_WORDS)), re.IGNORECASE)
+
+        # 只读操作动词：位于句首或空格/换行之后（作用于已小写的文本，长词优先）
+        cls._action_re = re.compile(
+            r"(?:^|(?<=[ \n]))("
+            + "|".join(map(re.escape, sorted(cls.ALLOWED_ACTIONS, key=len, reverse=True)))
+            + ")"
+        )
+
+        # 字面量预过滤：未命中任何锚点的模式不可能匹配，只对可能命中的子集运行正则
+        cls._blacklist_anchors = [_literal_anchors(p) for p in cls.BLACKLIST_PATTERNS]
+        cls._dangerous_anchors = [_literal_anchors(p) for p in cls.DANGEROUS_ACTIONS_PATTERNS]
+        cls._anchor_index = cls._build_anchor_index()
+
+        # 预过滤锚点与结构化提取关键词共用一个自动机，一次扫描同时完成两者
+        cls._literal_automaton = cls._build_literal_automaton()
+
+        # 子集正则缓存（staticmethod包装，避免通过实例访问时被绑定）
+        cls._blacklist_subset_re = staticmethod(lru_cache(maxsize=256)(cls._compile_blacklist_subset))
+        cls._dangerous_subset_re = staticmethod(lru_cache(maxsize=256)(cls._compile_dangerous_subset))
+
+    @classmethod
+    def _build_anchor_index(cls) -> Dict[str, Tuple[FrozenSet[int], FrozenSet[int]]]:
+        """构建 锚点 -> (黑名单模式下标, 危险操作模式下标) 的映射"""
+        index: Dict[str, Tuple[set, set]] = {}
+        for kind, anchors_list in enumerate((cls._blacklist_anchors, cls._dangerous_anchors)):
+            for pattern_idx, anchors in enumerate(anchors_list):
+                for anchor in anchors:
+                    index.setdefault(anchor, (set(), set()))[kind].add(pattern_idx)
+        return {anchor: (frozenset(bl), frozenset(da)) for anchor, (bl, da) in index.items()}
+
+    @classmethod
+    def _keyword_tables(cls) -> Dict[str, Dict[str, List[str]]]:
+        """结构化提取使用的关键词表"""
+        return {
+            "resource": cls.RESOURCE_KEYWORDS,
+            "cloud_provider": cls.CLOUD_PROVIDER_KEYWORDS,
+            "status": cls.STATUS_KEYWORDS,
+            "time_range": cls.TIME_RANGE_KEYWORDS,
+        }
+
+    @classmethod
+    def _build_literal_automaton(cls):
+        """
+        构建Aho-Corasick自动机（未安装pyahocorasick时返回None）
+
+        每个字面量映射到一组条目：("anchor", 锚点) 表示预过滤锚点，
+        (表名, 表中序号, 取值) 表示结构化提取关键词（同一个词可能兼有两种身份，如"停止"）
+        """
+        if ahocorasick is None:
+            return None
+
+        entries: Dict[str, List[tuple]] = {}
+        for anchor in cls._anchor_index:
+            entries.setdefault(anchor, []).append(("anchor", anchor))
+        for name, table in cls._keyword_tables().items():
+            for priority, (value, keywords) in enumerate(table.items()):
+                for keyword in keywords:
+                    entries.setdefault(keyword, []).append((name, priority, value))
+
+        automaton = ahocorasick.Automaton()
+        for word, word_entries in entries.items():
+            automaton.add_word(word, tuple(word_entries))
+        automaton.make_automaton()
+        return automaton
+
+    def _scan_literals(
+        self,
+        text: str,
+        text_lower: Optional[str] = None,
+        anchors: bool = True,
+        keywords: bool = True
+    ) -> Tuple[FrozenSet[int], FrozenSet[int], Dict[str, str]]:
+        """
+        字面量扫描：预过滤 + 关键词表匹配
+
+        预过滤在按IGNORECASE规则折叠后的文本上进行（保证不漏报），关键词在小写文本上匹配。
+        两者文本相同时（绝大多数输入）只扫描一次。
+
+        Returns:
+            (可能匹配的黑名单模式下标, 可能匹配的危险操作模式下标, 关键词表名 -> 命中的取值)
+        """
+        if text_lower is None:
+            text_lower = text.lower()
+        folded = text.translate(_PREFILTER_CASE_TABLE).lower() if anchors else text_lower
+
+        hits = set()
+        best: Dict[str, Tuple[int, str]] = {}
+
+        if self._literal_automaton is None:
+            if anchors:
+                hits = {anchor for anchor in self._anchor_index if anchor in folded}
+            if keywords:
+                for name, table in self._keyword_tables().items():
+                    for value, table_keywords in table.items():
+                        if any(kw in text_lower for kw in table_keywords):
+                            best[name] = (0, value)
+                            break
+        else:
+            if anchors and keywords and folded != text_lower:
+                # 折叠改变了文本（含ſ、K等字符），分别扫描
+                passes = [(folded, True, False), (text_lower, False, True)]
+            else:
+                passes = [(folded, anchors, keywords)]
+
+            for scan_text, collect_anchors, collect_keywords in passes:
+                for _, word_entries in self._literal_automaton.iter(scan_text):
+                    for entry in word_entries:
+                        if entry[0] == "anchor":
+                            if collect_anchors:
+                                hits.add(entry[1])
+                        elif collect_keywords:
+                            name, priority, value = entry
+                            if name not in best or priority < best[name][0]:
+                                best[name] = (priority, value)
+
+        blacklist = {i for i, pattern_anchors in enumerate(self._blacklist_anchors) if not pattern_anchors}
+        dangerous = {i for i, pattern_anchors in enumerate(self._dangerous_anchors) if not pattern_anchors}
+        for anchor in hits:
+            bl, da = self._anchor_index[anchor]
+            blacklist |= bl
+            dangerous |= da
+
+        return (
+            frozenset(blacklist),
+            frozenset(dangerous),
+            {name: value for name, (_, value) in best.items()},
+        )
+
+    def _prefilter(self, text: str) -> Tuple[FrozenSet[int], FrozenSet[int]]:
+        """字面量预过滤，返回可能匹配的 (黑名单模式下标, 危险操作模式下标)"""
+        blacklist, dangerous, _ = self._scan_literals(text, keywords=False)
+        return blacklist, dangerous
+
+    @classmethod
+    def _compile_blacklist_subset(cls, indices: FrozenSet[int]):
+        """编译黑名单模式子集（保持原顺序，结果与完整正则一致）"""
+        return re.compile(
+            "|".join(f"(?:{cls._blacklist_linear[i]})" for i in sorted(indices)),
+            re.IGNORECASE
+        )
+
+    @classmethod
+    def _compile_dangerous_subset(cls, indices: FrozenSet[int]):
+        """编译危险操作模式子集（保持原顺序，结果与完整正则一致）"""
+        return re.compile(
+            "|".join(f"(?:{cls.DANGEROUS_ACTIONS_PATTERNS[i]})" for i in sorted(indices)),
+            re.IGNORECASE
+        )
+
+    @classmethod
+    def _compile_re2_blacklist(cls):
+        """编译RE2版本的黑名单正则，不可用时返回None（回退到标准re）"""
+        if re2 is None:
+            logger.warning("未安装google-re2，黑名单检测回退到标准re")
+            return None
+
+        try:
+            pattern = "|".join(f"(?:{p})" for p in cls.BLACKLIST_PATTERNS)
+            return re2.compile("(?i)" + re.sub(r"(?<!\\)\\s", lambda _: _RE2_WHITESPACE, pattern))
+        except Exception as e:
+            logger.warning(f"RE2编译黑名单失败，回退到标准re: {e}")
+            return None
+
+    def _search_blacklist(self, text: str, candidates: FrozenSet[int]) -> Optional[str]:
+        """黑名单检测，返回命中的文本（未命中返回None）"""
+        if not candidates:
+            return None
+
+        if self.blacklist_re2 is not None:
+            match = self.blacklist_re2.search(text.translate(_RE2_CASE_TABLE))
+            if match:
+                start, end = match.span()
+                return text[start:end]
+            return None
+
+        if len(candidates) == len(self.BLACKLIST_PATTERNS):
+            match = self.blacklist_re.search(text)
+        else:
+            match = self._blacklist_subset_re(candidates).search(text)
+        if not match:
+            return None
+        # 线性化的模式从行首开始匹配，命中文本从捕获的X处截取
+        start = match.start(match.lastgroup) if match.lastgroup else match.start()
+        return text[start:match.end()]
 
     def validate_and_sanitize(self, user_query: str) -> ValidationResult:
         """
@@ -147,34 +507,45 @@ class PromptInjectionDefense:
                 reason=f"输入过长（{len(user_query)}字符，最大{self.max_input_length}字符）"
             )
 
+        # 小写副本只计算一次，供各个提取函数复用
+        text_lower = user_query.lower()
+
+        # 字面量扫描：确定需要运行的模式子集，同时完成结构化提取的关键词匹配
+        blacklist_candidates, dangerous_candidates, keyword_matches = self._scan_literals(
+            user_query, text_lower
+        )
+
         # 检查2：黑名单匹配
-        for pattern in self.compiled_patterns:
-            match = pattern.search(user_query)
-            if match:
-                matched_text = match.group(0)
-                logger.warning(f"检测到疑似注入攻击: {matched_text}")
+        matched_text = self._search_blacklist(user_query, blacklist_candidates)
+        if matched_text is not None:
+            logger.warning(f"检测到疑似注入攻击: {matched_text}")
+            return ValidationResult(
+                passed=False,
+                reason=f"检测到可疑模式: {matched_text[:50]}..."
+            )
+
+        # 检查3：危险操作检测（使用完整单词匹配）
+        if not dangerous_candidates:
+            dangerous_matches = ()
+        elif len(dangerous_candidates) == len(self.DANGEROUS_ACTIONS_PATTERNS):
+            dangerous_matches = self.dangerous_actions_re.finditer(user_query)
+        else:
+            dangerous_matches = self._dangerous_subset_re(dangerous_candidates).finditer(user_query)
+
+        for match in dangerous_matches:
+            matched_word = match.group(0)
+            # 检查是否有安全的上下文（例如"不要删除"）
+            if not self._is_safe_context(user_query, match):
+                logger.warning(f"检测到危险操作: {matched_word}")
                 return ValidationResult(
                     passed=False,
-                    reason=f"检测到可疑模式: {matched_text[:50]}..."
+                    reason=f"包含危险操作关键词: {matched_word}"
                 )
 
-        # 检查3：危险操作检测（使用完整单词匹配）
-        for pattern in self.compiled_dangerous_actions:
-            match = pattern.search(user_query)
-            if match:
-                matched_word = match.group(0)
-                # 检查是否有安全的上下文（例如"不要删除"）
-                if not self._is_safe_context(user_query, matched_word):
-                    logger.warning(f"检测到危险操作: {matched_word}")
-                    return ValidationResult(
-                        passed=False,
-                        reason=f"包含危险操作关键词: {matched_word}"
-                    )
-
         # 检查4：结构化提取
         try:
-            structured_input = self._extract_structured_query(user_query)
-            logger.info(f"结构化提取成功: {structured_input}")
+            structured_input = self._extract_structured_query(user_query, text_lower, keyword_matches)
+            logger.info("结构化提取成功: %s", structured_input)
 
             return ValidationResult(
                 passed=True,
@@ -187,40 +558,44 @@ class PromptInjectionDefense:
                 reason=f"无法解析查询: {str(e)}"
             )
 
-    def _is_safe_context(self, text: str, dangerous_word: str) -> bool:
+    def _is_safe_context(self, text: str, match: re.Match) -> bool:
         """
         检查危险词是否在安全上下文中
 
         例如："不要删除"、"如何防止删除" 是安全的
-        """
-        # 查找危险词前后的文本
-        index = text.lower().find(dangerous_word)
-        if index == -1:
-            return True
-
-        # 检查前面是否有否定词
-        before = text[max(0, index-20):index].lower()
-        negation_words = ["不要", "不能", "禁止", "防止", "避免", "don't", "do not", "prevent", "avoid", "how to prevent"]
-
-        for neg_word in negation_words:
-            if neg_word in before:
-                return True  # 在否定上下文中，是安全的
 
-        return False
-
-    def _extract_structured_query(self, text: str) -> Dict[str, Any]:
+        Args:
+            text: 原始查询（match所匹配的文本）
+            match: 危险词的匹配结果
+        """
+        # 检查危险词前20个字符内是否有否定词（直接使用匹配位置，不再重新查找）
+        index = match.start()
+        return self._negation_re.search(text, max(0, index - 20), index) is not None
+
+    def _extract_structured_query(
+        self,
+        text: str,
+        text_lower: Optional[str] = None,
+        keyword_matches: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
         """
         强制结构化提取：只提取关键参数，丢弃自由文本
 
         这是最安全的方式：完全忽略用户的自由文本，只提取参数化的字段
         """
+        if text_lower is None:
+            text_lower = text.lower()
+        if keyword_matches is None:
+            _, _, keyword_matches = self._scan_literals(text, text_lower, anchors=False)
+
         structured = {
-            "action": self._extract_action(text),
-            "resource": self._extract_resource(text),
-            "cloud_provider": self._extract_cloud_provider(text),
-            "filters": self._extract_filters(text),
-            "time_range": self._extract_time_range(text),
-            "original_query": text[:200],  # 保留原始查询的前200字符供日志使用
+            "action": self._extract_action(text, text_lower),
+            "resource": self._extract_resource(text, text_lower, keyword_matches),
+            "cloud_provider": self._extract_cloud_provider(text, text_lower, keyword_matches),
+            "filters": self._extract_filters(text, text_lower, keyword_matches),
+            "time_range": self._extract_time_range(text, text_lower, keyword_matches),
+            # 保留原始查询的前200字符供日志使用（日志未启用时不复制）
+            "original_query": text[:200] if logger.isEnabledFor(logging.INFO) else "",
         }
 
         # 验证action的安全性
@@ -229,94 +604,55 @@ class PromptInjectionDefense:
 
         return structured
 
-    def _extract_action(self, text: str) -> str:
+    def _extract_action(self, text: str, text_lower: str) -> str:
         """提取操作类型（白名单）"""
-        text_lower = text.lower()
-
-        # 优先匹配只读操作
-        for action in self.ALLOWED_ACTIONS:
-            if action in text_lower:
-                # 确认这是主要动词（不是在句子中间）
-                # 检查是否在句首或者在空格/标点后面
-                if text_lower.startswith(action) or f" {action}" in text_lower or f"\n{action}" in text_lower:
-                    return action
+        # 优先匹配只读操作（取最先出现的一个）
+        # 确认这是主要动词（不是在句子中间）：在句首或者在空格/换行后面
+        match = self._action_re.search(text_lower)
+        if match:
+            return match.group(1)
 
         # 默认为最安全的操作：list（假设用户想查看数据）
         return "list"
 
-    def _extract_resource(self, text: str) -> str:
+    def _extract_resource(self, text: str, text_lower: str, keyword_matches: Dict[str, str]) -> str:
         """提取资源类型"""
-        text_lower = text.lower()
-
-        resource_keywords = {
-            "ec2": ["ec2", "实例", "instance", "虚拟机", "vm"],
-            "rds": ["rds", "数据库", "database", "db"],
-            "s3": ["s3", "存储", "bucket", "对象存储"],
-            "lambda": ["lambda", "函数", "function", "serverless"],
-            "cloudwatch": ["cloudwatch", "监控", "metrics", "指标"],
-            "logs": ["logs", "日志", "logging"],
-            "vpc": ["vpc", "网络", "network", "subnet"],
-            "cdn": ["cdn", "cloudfront", "分发", "缓存"],
-        }
-
-        for resource, keywords in resource_keywords.items():
-            if any(kw in text_lower for kw in keywords):
-                return resource
+        return keyword_matches.get("resource", "unknown")
 
-        return "unknown"
-
-    def _extract_cloud_provider(self, text: str) -> str:
+    def _extract_cloud_provider(self, text: str, text_lower: str, keyword_matches: Dict[str, str]) -> str:
         """提取云平台"""
-        text_lower = text.lower()
-
-        if any(kw in text_lower for kw in ["aws", "亚马逊", "amazon"]):
-            return "aws"
-        elif any(kw in text_lower for kw in ["azure", "微软", "microsoft"]):
-            return "azure"
-        elif any(kw in text_lower for kw in ["gcp", "google", "谷歌"]):
-            return "gcp"
-        elif any(kw in text_lower for kw in ["aliyun", "阿里", "ali", "阿里云"]):
-            return "aliyun"
-        elif any(kw in text_lower for kw in ["volcengine", "火山", "字节"]):
-            return "volcengine"
-
-        return "aws"  # 默认AWS
-
-    def _extract_filters(self, text: str) -> Dict[str, Any]:
+        # 默认AWS
+        return keyword_matches.get("cloud_provider", "aws")
+
+    def _extract_filters(self, text: str, text_lower: str, keyword_matches: Dict[str, str]) -> Dict[str, Any]:
         """提取过滤条件"""
         filters = {}
-        text_lower = text.lower()
 
         # 提取状态
-        if "running" in text_lower or "运行" in text_lower:
-            filters["status"] = "running"
-        elif "stopped" in text_lower or "停止" in text_lower:
-            filters["status"] = "stopped"
+        if "status" in keyword_matches:
+            filters["status"] = keyword_matches["status"]
 
         # 提取阈值（例如：CPU>80%）
-        cpu_match = re.search(r"cpu.*?(\d+)%?", text_lower)
+        cpu_match = self._CPU_PATTERN.search(text_lower)
         if cpu_match:
             filters["cpu_threshold"] = int(cpu_match.group(1))
 
-        memory_match = re.search(r"(?:memory|内存).*?(\d+)%?", text_lower)
+        memory_match = self._MEMORY_PATTERN.search(text_lower)
         if memory_match:
             filters["memory_threshold"] = int(memory_match.group(1))
 
         return filters
 
-    def _extract_time_range(self, text: str) -> Dict[str, Any]:
+    def _extract_time_range(self, text: str, text_lower: str, keyword_matches: Dict[str, str]) -> Dict[str, Any]:
         """提取时间范围"""
         time_range = {}
-        text_lower = text.lower()
 
         # 简单的时间范围提取
-        if "last hour" in text_lower or "最近1小时" in text_lower or "过去1小时" in text_lower:
-            time_range["duration"] = "1h"
-        elif "last 24 hours" in text_lower or "最近24小时" in text_lower or "过去一天" in text_lower:
-            time_range["duration"] = "24h"
-        elif "last 7 days" in text_lower or "最近7天" in text_lower or "过去一周" in text_lower:
-            time_range["duration"] = "7d"
-        else:
-            time_range["duration"] = "1h"  # 默认1小时
+        # 默认1小时
+        time_range["duration"] = keyword_matches.get("time_range", "1h")
 
         return time_range
+
+
+# 基类的正则与自动机在导入时编译一次，所有实例共享
+PromptInjectionDefense._compile_patterns()
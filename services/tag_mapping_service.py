@@ -2,14 +2,17 @@
 Tag Mapping Service - 业务标签到资源映射服务
 支持通过业务标签（如"xxx业务"）查询相关的多云资源
 """
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import asyncio
+import functools
 import logging
+from datetime import datetime, timedelta
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class TaggedResource:
     """标记的资源"""
     resource_id: str
@@ -29,17 +32,32 @@ class TagMappingService:
     3. 支持EC2、LogGroup、Pod、CDN、ALB等资源类型
     """
 
-    def __init__(self, aws_tools=None, k8s_tools=None):
+    # 单批并发的标签查询请求数（避免触发AWS API限流）
+    TAG_REQUEST_BATCH_SIZE = 20
+
+    # ELBv2 describe_tags单次最多接受的ARN数量
+    ALB_DESCRIBE_TAGS_MAX_ARNS = 20
+
+    def __init__(self, aws_tools=None, k8s_tools=None, cache_ttl_seconds: int = 300):
         """
         初始化标签映射服务
 
         Args:
             aws_tools: AWS工具实例
             k8s_tools: Kubernetes工具实例
+            cache_ttl_seconds: LogGroup/CloudFront/ALB资源列表（含标签）的缓存有效期（秒）
         """
         self.aws_tools = aws_tools
         self.k8s_tools = k8s_tools
 
+        # (资源类型, 区域) -> (缓存时间, 资源列表)
+        self.cache_ttl = timedelta(seconds=cache_ttl_seconds)
+        self._resource_cache: Dict[Tuple[str, str], Tuple[datetime, List[TaggedResource]]] = {}
+        self._resource_cache_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+        # boto3客户端缓存（创建客户端需要加载模型、解析凭证，开销较大）
+        self._aws_clients: Dict[Tuple[str, Optional[str], Optional[str]], Any] = {}
+
         # 标签键标准化映射
         self.tag_key_mapping = {
             # 业务标签
@@ -52,12 +70,19 @@ class TagMappingService:
             "k8s.component": ["component", "app.kubernetes.io/component"],
         }
 
+        # 反向索引：标签键变体 -> 所属的变体列表（同一变体出现在多个映射中时以先出现的为准）
+        self._tag_variant_index: Dict[str, List[str]] = {}
+        for variants in self.tag_key_mapping.values():
+            for variant in variants:
+                self._tag_variant_index.setdefault(variant, variants)
+
     async def get_resources_by_tag(
         self,
         tag_key: str,
         tag_value: str,
         resource_types: Optional[List[str]] = None,
-        cloud_providers: Optional[List[str]] = None
+        cloud_providers: Optional[List[str]] = None,
+        include_raw: bool = False
     ) -> List[TaggedResource]:
         """
         通过标签查询资源
@@ -67,6 +92,8 @@ class TagMappingService:
             tag_value: 标签值（如："电商平台"）
             resource_types: 资源类型过滤（如：["ec2", "pod"]），None表示全部
             cloud_providers: 云平台过滤（如：["aws", "k8s"]），None表示全部
+            include_raw: 是否保留云平台返回的原始数据（resource_data），默认不保留以减少内存占用；
+                LogGroup/CDN/ALB走TTL缓存，缓存中始终不保存原始数据
 
         Returns:
             标记的资源列表
@@ -88,43 +115,45 @@ class TagMappingService:
         if resource_types is None:
             resource_types = ["ec2", "log_group", "pod", "cdn", "alb"]
 
+        # 各资源类型的查询相互独立，并发执行（结果按以下顺序合并）
+        queries = []
+
         # AWS资源查询
         if "aws" in cloud_providers and self.aws_tools:
             # EC2实例
             if "ec2" in resource_types:
-                ec2_resources = await self._get_aws_ec2_by_tag(
-                    normalized_keys, tag_value
-                )
-                results.extend(ec2_resources)
+                queries.append(self._get_aws_ec2_by_tag(normalized_keys, tag_value, include_raw))
 
             # CloudWatch LogGroup
             if "log_group" in resource_types:
-                log_resources = await self._get_aws_log_groups_by_tag(
-                    normalized_keys, tag_value
-                )
-                results.extend(log_resources)
+                queries.append(self._get_aws_log_groups_by_tag(normalized_keys, tag_value))
 
             # CloudFront CDN
             if "cdn" in resource_types:
-                cdn_resources = await self._get_aws_cloudfront_by_tag(
-                    normalized_keys, tag_value
-                )
-                results.extend(cdn_resources)
+                queries.append(self._get_aws_cloudfront_by_tag(normalized_keys, tag_value))
 
             # ALB
             if "alb" in resource_types:
-                alb_resources = await self._get_aws_alb_by_tag(
-                    normalized_keys, tag_value
-                )
-                results.extend(alb_resources)
+                queries.append(self._get_aws_alb_by_tag(normalized_keys, tag_value))
 
         # Kubernetes资源查询
         if "k8s" in cloud_providers and self.k8s_tools:
             if "pod" in resource_types:
-                pod_resources = await self._get_k8s_pods_by_label(
-                    normalized_keys, tag_value
-                )
-                results.extend(pod_resources)
+                queries.append(self._get_k8s_pods_by_label(normalized_keys, tag_value, include_raw))
+
+        # 合并时按 (云平台, 资源类型, 资源ID) 去重，保留先出现的资源
+        seen = set()
+        for resources in await asyncio.gather(*queries, return_exceptions=True):
+            if isinstance(resources, Exception):
+                logger.error(f"Error querying resources by tag: {str(resources)}")
+                continue
+
+            for resource in resources:
+                key = (resource.cloud_provider, resource.resource_type, resource.resource_id)
+                if key in seen:
+                    continue
+                seen.add(key)
+                results.append(resource)
 
         logger.info(
             f"Found {len(results)} resources with tag {tag_key}={tag_value}"
@@ -168,7 +197,8 @@ class TagMappingService:
         resources = await self.get_resources_by_tag(
             tag_key="业务",
             tag_value=business_name,
-            resource_types=["pod"]
+            resource_types=["pod"],
+            include_raw=True
         )
 
         # 命名空间过滤
@@ -193,107 +223,216 @@ class TagMappingService:
             标准化后的标签键列表
         """
         # 查找映射
-        for standard_key, variants in self.tag_key_mapping.items():
-            if tag_key in variants:
-                return variants
+        variants = self._tag_variant_index.get(tag_key)
+        if variants is not None:
+            return variants
 
         # 如果没有映射，返回原始键和常见变体
         return [tag_key, tag_key.lower(), tag_key.capitalize()]
 
+    @staticmethod
+    async def _run_blocking(func: Callable, *args, **kwargs) -> Any:
+        """在默认线程池中执行同步调用（boto3为同步SDK），避免阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def _run_blocking_batched(self, calls: List[Callable[[], Any]]) -> List[Any]:
+        """
+        分批并发执行同步调用
+
+        Returns:
+            与calls顺序一致的结果列表，失败的调用对应位置为异常对象
+        """
+        results = []
+        for i in range(0, len(calls), self.TAG_REQUEST_BATCH_SIZE):
+            batch = calls[i:i + self.TAG_REQUEST_BATCH_SIZE]
+            results.extend(await asyncio.gather(
+                *(self._run_blocking(call) for call in batch),
+                return_exceptions=True
+            ))
+        return results
+
+    async def _get_aws_client(self, service_name: str, config, regional: bool = True):
+        """
+        获取（复用）boto3客户端
+
+        Args:
+            service_name: 服务名（如：logs, elbv2）
+            config: 配置对象（提供凭证和区域）
+            regional: 是否为区域性服务（CloudFront等全局服务为False）
+        """
+        region = config.cloud.aws_region if regional else None
+        key = (service_name, region, config.cloud.aws_access_key)
+
+        client = self._aws_clients.get(key)
+        if client is None:
+            import boto3
+
+            kwargs = {
+                "aws_access_key_id": config.cloud.aws_access_key,
+                "aws_secret_access_key": config.cloud.aws_secret_key,
+            }
+            if regional:
+                kwargs["region_name"] = region
+
+            client = await self._run_blocking(boto3.client, service_name, **kwargs)
+            # 并发创建时保留先创建的客户端
+            client = self._aws_clients.setdefault(key, client)
+
+        return client
+
+    @staticmethod
+    def _list_all_pages(client, operation: str, *keys: str) -> List[Dict[str, Any]]:
+        """遍历分页接口，按keys逐层取出并合并各页的资源列表（同步调用）"""
+        items = []
+        for page in client.get_paginator(operation).paginate():
+            data = page
+            for key in keys:
+                data = data.get(key) or {}
+            items.extend(data or [])
+        return items
+
     async def _get_aws_ec2_by_tag(
         self,
         tag_keys: List[str],
-        tag_value: str
+        tag_value: str,
+        include_raw: bool = False
     ) -> List[TaggedResource]:
         """通过标签查询AWS EC2实例"""
         results = []
 
         try:
-            # 尝试每个标签键变体
-            for key in tag_keys:
-                response = await self.aws_tools._list_ec2_instances_impl(
-                    tags={key: tag_value}
-                )
+            # 一次查询覆盖所有标签键变体（tag-key与tag-value为AND关系）
+            response = await self.aws_tools._list_ec2_instances_impl(
+                filters=[
+                    {"Name": "tag-key", "Values": list(tag_keys)},
+                    {"Name": "tag-value", "Values": [tag_value]},
+                ]
+            )
 
-                if response.get("success"):
-                    instances = response.get("instances", [])
+            if response.get("success"):
+                instances = response.get("instances", [])
 
-                    for instance in instances:
-                        # 提取标签
-                        tags = {}
-                        for tag in instance.get("Tags", []):
-                            tags[tag["Key"]] = tag["Value"]
+                for instance in instances:
+                    # 提取标签
+                    tags = {}
+                    for tag in instance.get("Tags", []):
+                        tags[tag["Key"]] = tag["Value"]
 
+                    # 两个过滤条件可能命中不同的标签，需确认同一标签的键值都匹配
+                    if any(tags.get(key) == tag_value for key in tag_keys):
                         results.append(TaggedResource(
                             resource_id=instance["InstanceId"],
                             resource_type="ec2",
                             cloud_provider="aws",
                             tags=tags,
-                            resource_data=instance
+                            resource_data=instance if include_raw else None
                         ))
 
-                # 找到结果就停止
-                if results:
-                    break
-
         except Exception as e:
             logger.error(f"Error querying AWS EC2 by tag: {str(e)}")
 
         return results
 
+    async def _get_cached_aws_resources(
+        self,
+        resource_type: str,
+        region: str,
+        loader: Callable[[], Any]
+    ) -> List[TaggedResource]:
+        """
+        获取某类AWS资源的全量列表（含标签），结果按 (资源类型, 区域) 缓存
+
+        标签变化频率远低于查询频率，缓存有效期内的业务查询直接在内存中过滤。
+        同一键的并发请求共用一次加载。加载失败时抛出异常且不缓存。
+        缓存的资源对象在各次查询间共享，只保存ID和标签，不保存boto3原始响应。
+        """
+        key = (resource_type, region)
+
+        cached = self._resource_cache.get(key)
+        if cached and datetime.now() - cached[0] <= self.cache_ttl:
+            return cached[1]
+
+        lock = self._resource_cache_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # 等锁期间可能已被其他请求加载
+            cached = self._resource_cache.get(key)
+            if cached and datetime.now() - cached[0] <= self.cache_ttl:
+                return cached[1]
+
+            resources = await loader()
+            self._resource_cache[key] = (datetime.now(), resources)
+            logger.info(f"Cached {len(resources)} AWS {resource_type} resources ({region})")
+            return resources
+
+    def clear_cache(self):
+        """清空资源缓存"""
+        self._resource_cache.clear()
+
+    @staticmethod
+    def _filter_by_tag(
+        resources: List[TaggedResource],
+        tag_keys: List[str],
+        tag_value: str
+    ) -> List[TaggedResource]:
+        """筛选任一标签键变体的值等于tag_value的资源"""
+        return [
+            resource for resource in resources
+            if any(resource.tags.get(key) == tag_value for key in tag_keys)
+        ]
+
     async def _get_aws_log_groups_by_tag(
         self,
         tag_keys: List[str],
         tag_value: str
     ) -> List[TaggedResource]:
         """通过标签查询AWS CloudWatch LogGroup"""
-        results = []
-
         try:
-            # CloudWatch Logs API
-            import boto3
             from config import get_config
 
             config = get_config()
-            client = boto3.client(
-                'logs',
-                aws_access_key_id=config.cloud.aws_access_key,
-                aws_secret_access_key=config.cloud.aws_secret_key,
-                region_name=config.cloud.aws_region
+            resources = await self._get_cached_aws_resources(
+                "log_group",
+                config.cloud.aws_region,
+                lambda: self._list_aws_log_groups(config)
             )
-
-            # 列出所有LogGroup
-            paginator = client.get_paginator('describe_log_groups')
-
-            for page in paginator.paginate():
-                for log_group in page.get('logGroups', []):
-                    log_group_name = log_group['logGroupName']
-
-                    # 获取LogGroup标签
-                    try:
-                        tags_response = client.list_tags_log_group(
-                            logGroupName=log_group_name
-                        )
-                        tags = tags_response.get('tags', {})
-
-                        # 检查标签匹配
-                        for key in tag_keys:
-                            if tags.get(key) == tag_value:
-                                results.append(TaggedResource(
-                                    resource_id=log_group_name,
-                                    resource_type="log_group",
-                                    cloud_provider="aws",
-                                    tags=tags,
-                                    resource_data=log_group
-                                ))
-                                break
-
-                    except Exception as e:
-                        logger.debug(f"Error getting tags for {log_group_name}: {e}")
-                        continue
+            return self._filter_by_tag(resources, tag_keys, tag_value)
 
         except Exception as e:
             logger.error(f"Error querying AWS LogGroups by tag: {str(e)}")
+            return []
+
+    async def _list_aws_log_groups(self, config) -> List[TaggedResource]:
+        """列出所有CloudWatch LogGroup及其标签"""
+        results = []
+
+        # CloudWatch Logs API
+        client = await self._get_aws_client('logs', config)
+
+        # 列出所有LogGroup
+        log_groups = await self._run_blocking(
+            self._list_all_pages, client, 'describe_log_groups', 'logGroups'
+        )
+
+        # 并发获取LogGroup标签
+        tags_responses = await self._run_blocking_batched([
+            functools.partial(client.list_tags_log_group, logGroupName=log_group['logGroupName'])
+            for log_group in log_groups
+        ])
+
+        for log_group, tags_response in zip(log_groups, tags_responses):
+            log_group_name = log_group['logGroupName']
+
+            if isinstance(tags_response, Exception):
+                logger.debug(f"Error getting tags for {log_group_name}: {tags_response}")
+                continue
+
+            results.append(TaggedResource(
+                resource_id=log_group_name,
+                resource_type="log_group",
+                cloud_provider="aws",
+                tags=tags_response.get('tags', {}),
+            ))
 
         return results
 
@@ -303,57 +442,54 @@ class TagMappingService:
         tag_value: str
     ) -> List[TaggedResource]:
         """通过标签查询AWS CloudFront分发"""
-        results = []
-
         try:
-            import boto3
             from config import get_config
 
             config = get_config()
-            client = boto3.client(
-                'cloudfront',
-                aws_access_key_id=config.cloud.aws_access_key,
-                aws_secret_access_key=config.cloud.aws_secret_key
+            # CloudFront为全局服务，不区分区域
+            resources = await self._get_cached_aws_resources(
+                "cdn",
+                "global",
+                lambda: self._list_aws_cloudfront_distributions(config)
             )
-
-            # 列出所有分发
-            paginator = client.get_paginator('list_distributions')
-
-            for page in paginator.paginate():
-                items = page.get('DistributionList', {}).get('Items', [])
-
-                for dist in items:
-                    dist_id = dist['Id']
-
-                    # 获取标签
-                    try:
-                        tags_response = client.list_tags_for_resource(
-                            Resource=dist['ARN']
-                        )
-                        tag_items = tags_response.get('Tags', {}).get('Items', [])
-
-                        tags = {}
-                        for tag in tag_items:
-                            tags[tag['Key']] = tag['Value']
-
-                        # 检查标签匹配
-                        for key in tag_keys:
-                            if tags.get(key) == tag_value:
-                                results.append(TaggedResource(
-                                    resource_id=dist_id,
-                                    resource_type="cdn",
-                                    cloud_provider="aws",
-                                    tags=tags,
-                                    resource_data=dist
-                                ))
-                                break
-
-                    except Exception as e:
-                        logger.debug(f"Error getting tags for distribution {dist_id}: {e}")
-                        continue
+            return self._filter_by_tag(resources, tag_keys, tag_value)
 
         except Exception as e:
             logger.error(f"Error querying AWS CloudFront by tag: {str(e)}")
+            return []
+
+    async def _list_aws_cloudfront_distributions(self, config) -> List[TaggedResource]:
+        """列出所有CloudFront分发及其标签"""
+        results = []
+
+        client = await self._get_aws_client('cloudfront', config, regional=False)
+
+        # 列出所有分发
+        distributions = await self._run_blocking(
+            self._list_all_pages, client, 'list_distributions', 'DistributionList', 'Items'
+        )
+
+        # 并发获取标签
+        tags_responses = await self._run_blocking_batched([
+            functools.partial(client.list_tags_for_resource, Resource=dist['ARN'])
+            for dist in distributions
+        ])
+
+        for dist, tags_response in zip(distributions, tags_responses):
+            dist_id = dist['Id']
+
+            if isinstance(tags_response, Exception):
+                logger.debug(f"Error getting tags for distribution {dist_id}: {tags_response}")
+                continue
+
+            tag_items = tags_response.get('Tags', {}).get('Items', [])
+
+            results.append(TaggedResource(
+                resource_id=dist_id,
+                resource_type="cdn",
+                cloud_provider="aws",
+                tags={tag['Key']: tag['Value'] for tag in tag_items},
+            ))
 
         return results
 
@@ -363,66 +499,74 @@ class TagMappingService:
         tag_value: str
     ) -> List[TaggedResource]:
         """通过标签查询AWS ALB"""
-        results = []
-
         try:
-            import boto3
             from config import get_config
 
             config = get_config()
-            client = boto3.client(
-                'elbv2',
-                aws_access_key_id=config.cloud.aws_access_key,
-                aws_secret_access_key=config.cloud.aws_secret_key,
-                region_name=config.cloud.aws_region
+            resources = await self._get_cached_aws_resources(
+                "alb",
+                config.cloud.aws_region,
+                lambda: self._list_aws_load_balancers(config)
             )
-
-            # 列出所有负载均衡器
-            paginator = client.get_paginator('describe_load_balancers')
-
-            for page in paginator.paginate():
-                for lb in page.get('LoadBalancers', []):
-                    lb_arn = lb['LoadBalancerArn']
-
-                    # 获取标签
-                    try:
-                        tags_response = client.describe_tags(
-                            ResourceArns=[lb_arn]
-                        )
-
-                        tag_descriptions = tags_response.get('TagDescriptions', [])
-                        if tag_descriptions:
-                            tag_items = tag_descriptions[0].get('Tags', [])
-
-                            tags = {}
-                            for tag in tag_items:
-                                tags[tag['Key']] = tag['Value']
-
-                            # 检查标签匹配
-                            for key in tag_keys:
-                                if tags.get(key) == tag_value:
-                                    results.append(TaggedResource(
-                                        resource_id=lb['LoadBalancerName'],
-                                        resource_type="alb",
-                                        cloud_provider="aws",
-                                        tags=tags,
-                                        resource_data=lb
-                                    ))
-                                    break
-
-                    except Exception as e:
-                        logger.debug(f"Error getting tags for ALB {lb_arn}: {e}")
-                        continue
+            return self._filter_by_tag(resources, tag_keys, tag_value)
 
         except Exception as e:
             logger.error(f"Error querying AWS ALB by tag: {str(e)}")
+            return []
+
+    async def _list_aws_load_balancers(self, config) -> List[TaggedResource]:
+        """列出所有负载均衡器及其标签"""
+        results = []
+
+        client = await self._get_aws_client('elbv2', config)
+
+        # 列出所有负载均衡器
+        load_balancers = await self._run_blocking(
+            self._list_all_pages, client, 'describe_load_balancers', 'LoadBalancers'
+        )
+
+        # 批量获取标签（每次请求最多20个ARN）
+        lb_arns = [lb['LoadBalancerArn'] for lb in load_balancers]
+        arn_chunks = [
+            lb_arns[i:i + self.ALB_DESCRIBE_TAGS_MAX_ARNS]
+            for i in range(0, len(lb_arns), self.ALB_DESCRIBE_TAGS_MAX_ARNS)
+        ]
+        tags_responses = await self._run_blocking_batched([
+            functools.partial(client.describe_tags, ResourceArns=chunk)
+            for chunk in arn_chunks
+        ])
+
+        # ARN -> 标签
+        tags_by_arn = {}
+        for chunk, tags_response in zip(arn_chunks, tags_responses):
+            if isinstance(tags_response, Exception):
+                logger.debug(f"Error getting tags for ALBs {chunk}: {tags_response}")
+                continue
+
+            for description in tags_response.get('TagDescriptions', []):
+                tags_by_arn[description['ResourceArn']] = {
+                    tag['Key']: tag['Value'] for tag in description.get('Tags', [])
+                }
+
+        for lb in load_balancers:
+            tags = tags_by_arn.get(lb['LoadBalancerArn'])
+            if tags is None:
+                continue
+
+            results.append(TaggedResource(
+                resource_id=lb['LoadBalancerName'],
+                resource_type="alb",
+                cloud_provider="aws",
+                tags=tags,
+            ))
 
         return results
 
     async def _get_k8s_pods_by_label(
         self,
         label_keys: List[str],
-        label_value: str
+        label_value: str,
+        include_raw: bool = False
     ) -> List[TaggedResource]:
         """通过标签查询Kubernetes Pod"""
         results = []
@@ -454,7 +598,7 @@ class TagMappingService:
                             resource_type="pod",
                             cloud_provider="k8s",
                             tags=labels,
-                            resource_data=pod
+                            resource_data=pod if include_raw else None
                         ))
 
                 # 找到结果就停止
@@ -2,19 +2,74 @@
 工具注册表
 管理Agent生成的可复用工具，实现工具发现、调用和质量评分
 """
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Set, Tuple
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from enum import Enum
+from functools import partial
+import atexit
+import heapq
 import json
+import math
 import os
 import hashlib
 import logging
+import threading
+import weakref
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时使用标准json
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:  # xxhash为可选依赖，未安装时使用blake2b
+    xxhash = None
+
 logger = logging.getLogger(__name__)
 
 
+def _content_hash(content: str) -> str:
+    """
+    内容哈希（仅用于进程内判断代码/文件是否变化，不做持久化比较）
+
+    优先使用xxh3_128，未安装xxhash时使用blake2b，两者都比MD5快且输出同为32位十六进制。
+    """
+    data = content.encode()
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _dump_json(data: Any, indent: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON（优先使用orjson，非ASCII字符不转义）"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+
+def _load_json(raw: bytes) -> Any:
+    """解析UTF-8编码的JSON"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# 存活的注册表实例（弱引用，不阻止回收），进程退出时写出各自缓冲的指标记录
+_live_registries: "weakref.WeakSet[ToolRegistry]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_registries():
+    for registry in list(_live_registries):
+        registry.flush()
+
+
 class ToolStatus(Enum):
     """工具状态"""
     ACTIVE = "active"  # 活跃可用
@@ -42,6 +97,10 @@ class ToolParameter:
         }
 
 
+# 使用频率分数表：log10(n+1)*10在n=99时达到上限20，更大的调用次数直接取20
+_FREQUENCY_SCORES = tuple(min(20, math.log10(n + 1) * 10) for n in range(100))
+
+
 @dataclass
 class ToolMetrics:
     """工具质量指标"""
@@ -52,6 +111,11 @@ class ToolMetrics:
     last_used: Optional[str] = None  # 最后使用时间
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
 
+    def __post_init__(self):
+        # 质量评分缓存：((总调用, 成功次数, 平均执行时间), 评分)，输入不变时直接复用
+        # 普通实例属性而非dataclass字段，不出现在fields()/asdict()中
+        self._score_cache: Optional[Tuple[Tuple[int, int, float], float]] = None
+
     @property
     def success_rate(self) -> float:
         """成功率"""
@@ -68,14 +132,23 @@ class ToolMetrics:
         - 成功率权重：70%
         - 使用频率权重：20%
         - 执行速度权重：10%
+
+        评分在排序、统计、序列化中被反复读取，按输入缓存，指标更新后自动重新计算。
         """
+        key = (self.total_calls, self.successful_calls, self.average_execution_time)
+        cached = self._score_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
         # 成功率分数（0-70）
         success_score = self.success_rate * 70
 
         # 使用频率分数（0-20），基于对数刻度
-        import math
         if self.total_calls > 0:
-            frequency_score = min(20, math.log10(self.total_calls + 1) * 10)
+            frequency_score = (
+                _FREQUENCY_SCORES[self.total_calls]
+                if self.total_calls < len(_FREQUENCY_SCORES) else 20
+            )
         else:
             frequency_score = 0
 
@@ -86,7 +159,9 @@ class ToolMetrics:
         else:
             speed_score = 5  # 没有数据时给中等分
 
-        return success_score + frequency_score + speed_score
+        score = success_score + frequency_score + speed_score
+        self._score_cache = (key, score)
+        return score
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
@@ -124,24 +199,87 @@ class GeneratedTool:
     metrics: ToolMetrics = field(default_factory=ToolMetrics)  # 质量指标
     metadata: Dict[str, Any] = field(default_factory=dict)  # 额外元信息
 
+    def __post_init__(self):
+        # 哈希缓存：记录计算时的输入对象，输入未被替换时直接复用（版本升级等赋值会使其失效）
+        # 普通实例属性而非dataclass字段，不出现在fields()/asdict()中
+        self._tool_id_cache: Optional[Tuple[str, str, str]] = None
+        self._code_hash_cache: Optional[Tuple[str, str]] = None
+        self._search_cache: Optional[Tuple[str, str, str, str]] = None
+        # 延迟加载：代码被defer_code移出内存后，首次访问code/test_code时通过该回调读取(code, test_code)
+        self._code_loader: Optional[Callable[[], Tuple[str, str]]] = None
+
+    def __getattr__(self, name: str) -> Any:
+        # 仅在实例属性不存在时调用，即code/test_code尚未加载
+        if name in ("code", "test_code"):
+            loader = self.__dict__.get("_code_loader")
+            if loader is not None:
+                try:
+                    self.code, self.test_code = loader()
+                except Exception as e:
+                    # 加载失败按属性不存在处理，getattr(tool, "code", default)等用法保持可用
+                    raise AttributeError(
+                        f"'{type(self).__name__}' object has no attribute '{name}' (代码加载失败: {e})"
+                    ) from e
+                self._code_loader = None
+                return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def code_loaded(self) -> bool:
+        """代码是否已在内存中"""
+        return "code" in self.__dict__
+
+    def defer_code(self, loader: Callable[[], Tuple[str, str]]):
+        """释放内存中的代码，改为首次访问时通过loader读取"""
+        self.__dict__.pop("code", None)
+        self.__dict__.pop("test_code", None)
+        self._code_loader = loader
+
     @property
     def tool_id(self) -> str:
-        """工具唯一ID（基于名称和版本的哈希）"""
-        content = f"{self.name}:{self.version}"
-        return hashlib.md5(content.encode()).hexdigest()[:16]
+        """工具唯一ID（基于名称和版本的哈希；ID会写入索引和代码文件头，算法保持MD5不变）"""
+        cached = self._tool_id_cache
+        if cached is None or cached[0] is not self.name or cached[1] is not self.version:
+            content = f"{self.name}:{self.version}"
+            cached = (self.name, self.version, hashlib.md5(content.encode()).hexdigest()[:16])
+            self._tool_id_cache = cached
+        return cached[2]
 
     @property
     def code_hash(self) -> str:
         """代码哈希（用于检测代码变化）"""
-        return hashlib.md5(self.code.encode()).hexdigest()
+        cached = self._code_hash_cache
+        if cached is None or cached[0] is not self.code:
+            cached = (self.code, _content_hash(self.code))
+            self._code_hash_cache = cached
+        return cached[1]
+
+    def search_fields(self) -> Tuple[str, str]:
+        """小写的名称和描述（用于文本搜索，名称或描述被替换时重新计算）"""
+        cached = self._search_cache
+        if cached is None or cached[0] is not self.name or cached[1] is not self.description:
+            cached = (self.name, self.description, self.name.lower(), self.description.lower())
+            self._search_cache = cached
+        return cached[2], cached[3]
+
+    def to_dict(self, code: Optional[Tuple[str, str]] = None) -> Dict[str, Any]:
+        """
+        转换为字典（用于序列化）
+
+        Args:
+            code: 代码未加载时由调用方提供的(code, test_code)，避免为序列化逐个加载
+        """
+        if code is None:
+            code = (self.code, self.test_code)
+            code_hash = self.code_hash
+        else:
+            code_hash = _content_hash(code[0])
 
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典（用于序列化）"""
         return {
             "name": self.name,
             "description": self.description,
-            "code": self.code,
-            "test_code": self.test_code,
+            "code": code[0],
+            "test_code": code[1],
             "parameters": [p.to_dict() for p in self.parameters],
             "return_type": self.return_type,
             "cloud_provider": self.cloud_provider,
@@ -153,7 +291,7 @@ class GeneratedTool:
             "metrics": self.metrics.to_dict(),
             "metadata": self.metadata,
             "tool_id": self.tool_id,
-            "code_hash": self.code_hash
+            "code_hash": code_hash
         }
 
     @classmethod
@@ -203,8 +341,17 @@ class ToolRegistry:
     3. 更新工具指标
     4. 持久化工具
     5. 工具推荐
+
+    持久化方式：工具定义写入索引文件；调用指标追加到日志文件（metrics.jsonl），
+    加载时在索引之上重放，注册工具或日志达到一定条数时合并回索引并清空日志。
     """
 
+    # 指标日志达到该条数时合并到索引文件
+    JOURNAL_COMPACT_THRESHOLD = 1000
+
+    # 指标记录先缓冲在内存中，每隔该秒数批量追加到日志文件；0表示每次立即写入
+    JOURNAL_FLUSH_INTERVAL = 2.0
+
     def __init__(self, registry_dir: str = "generated/tools"):
         """
         Args:
@@ -216,9 +363,25 @@ class ToolRegistry:
         # 工具索引文件
         self.index_file = self.registry_dir / "tool_index.json"
 
+        # 指标日志文件（每行一次调用记录，追加写入）
+        self.journal_file = self.registry_dir / "metrics.jsonl"
+        self._journal_entries = 0
+
+        # 尚未写入日志文件的指标记录，由后台定时器或flush()批量写出
+        self._pending_metrics: List[bytes] = []
+        self._flush_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        _live_registries.add(self)
+
         # 内存中的工具缓存
         self.tools: Dict[str, GeneratedTool] = {}
 
+        # 本实例写入过的工具代码文件摘要（路径 -> 内容哈希），用于跳过未变化的重写
+        self._written_digests: Dict[Path, str] = {}
+
+        # 二级索引（属性值 -> 工具名集合），搜索时先求交集缩小候选范围
+        self._reset_indexes()
+
         # 加载现有工具
         self._load_tools()
 
@@ -230,61 +393,211 @@ class ToolRegistry:
             return
 
         try:
-            with open(self.index_file, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
+            index_data = self._read_index()
 
             for tool_data in index_data.get("tools", []):
                 tool = GeneratedTool.from_dict(tool_data)
-                self.tools[tool.name] = tool
+                # 代码只在索引中保留一份，内存中按需加载（检索和统计只用元信息）
+                tool.defer_code(partial(self._load_tool_code, tool.name))
+                self._add_tool(tool)
 
             logger.info(f"加载了 {len(self.tools)} 个工具")
 
         except Exception as e:
             logger.error(f"加载工具索引失败: {e}")
             self.tools = {}
+            self._reset_indexes()
+            return
+
+        self._replay_journal()
+
+    def _replay_journal(self):
+        """在已加载的索引之上重放指标日志"""
+        if not self.journal_file.exists():
+            return
 
-    def _save_index(self):
-        """保存工具索引到磁盘"""
         try:
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = _load_json(line)
+                    except json.JSONDecodeError:
+                        # 写入中断可能留下不完整的最后一行
+                        logger.warning("跳过无法解析的指标日志行")
+                        continue
+
+                    self._journal_entries += 1
+                    tool = self.tools.get(entry.get("tool"))
+                    if tool:
+                        self._apply_metrics(tool, entry["success"], entry["t"], entry.get("ts"))
+
+            if self._journal_entries:
+                logger.info(f"重放了 {self._journal_entries} 条指标日志")
+
+        except Exception as e:
+            logger.error(f"重放指标日志失败: {e}")
+
+    def _read_index(self) -> Dict[str, Any]:
+        """读取磁盘上的工具索引"""
+        with open(self.index_file, 'rb') as f:
+            return _load_json(f.read())
+
+    def _read_stored_code(self, names: Set[str]) -> Dict[str, Tuple[str, str]]:
+        """从磁盘索引读取指定工具的代码（名称 -> (code, test_code)），其余工具的代码不保留"""
+        return {
+            tool_data["name"]: (tool_data["code"], tool_data.get("test_code", ""))
+            for tool_data in self._read_index().get("tools", [])
+            if tool_data["name"] in names
+        }
+
+    def _load_tool_code(self, name: str) -> Tuple[str, str]:
+        """读取单个工具的代码（延迟加载回调）"""
+        try:
+            return self._read_stored_code({name})[name]
+        except Exception as e:
+            logger.error(f"加载工具代码失败: {name}: {e!r}")
+            raise
+
+    def _save_index(self) -> bool:
+        """保存工具索引到磁盘，返回是否成功"""
+        try:
+            # 未加载代码的工具沿用当前索引中的代码，不逐个加载到内存
+            unloaded = {name for name, tool in self.tools.items() if not tool.code_loaded}
+            stored = self._read_stored_code(unloaded) if unloaded else {}
+
             index_data = {
                 "version": "1.0",
                 "updated_at": datetime.now().isoformat(),
                 "total_tools": len(self.tools),
-                "tools": [tool.to_dict() for tool in self.tools.values()]
+                "tools": [
+                    tool.to_dict() if tool.code_loaded else tool.to_dict(code=stored[tool.name])
+                    for tool in self.tools.values()
+                ]
             }
 
-            with open(self.index_file, 'w', encoding='utf-8') as f:
-                json.dump(index_data, f, indent=2, ensure_ascii=False)
+            # 先写临时文件再替换：未加载的代码只存在于索引中，不能留下写了一半的索引
+            tmp_path = self.index_file.with_name(self.index_file.name + ".tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(_dump_json(index_data, indent=True))
+            os.replace(tmp_path, self.index_file)
 
             logger.info(f"保存了 {len(self.tools)} 个工具到索引")
+            return True
 
         except Exception as e:
             logger.error(f"保存工具索引失败: {e}")
+            return False
+
+    def compact(self):
+        """把内存中的最新状态（含已记录的指标）写入索引，并清空指标日志"""
+        with self._flush_lock:
+            # 索引写入失败时保留日志和缓冲，下次加载仍可重放
+            if not self._save_index():
+                return
+
+            # 缓冲的记录已计入内存中的指标，随索引一并写出
+            self._pending_metrics = []
+            try:
+                with open(self.journal_file, 'wb'):
+                    pass
+                self._journal_entries = 0
+            except Exception as e:
+                logger.error(f"清空指标日志失败: {e}")
+
+    def flush(self):
+        """把缓冲的指标记录一次性追加到日志文件"""
+        with self._flush_lock:
+            timer, self._flush_timer = self._flush_timer, None
+            if timer is not None and timer is not threading.current_thread():
+                timer.cancel()
+
+            if not self._pending_metrics:
+                return
+            lines, self._pending_metrics = self._pending_metrics, []
+
+            try:
+                with open(self.journal_file, 'ab') as f:
+                    f.write(b"".join(lines))
+            except FileNotFoundError:
+                # 注册表目录已被删除，记录无处可写
+                logger.warning(f"注册表目录不存在，丢弃 {len(lines)} 条指标记录")
+            except Exception as e:
+                # 放回缓冲，下次写出或合并索引时仍会保存
+                logger.error(f"写入指标日志失败: {e}")
+                self._pending_metrics[:0] = lines
+
+    def _append_journal(self, entry: Dict[str, Any]):
+        """记录一次指标更新（缓冲后批量写入日志），达到阈值时合并到索引"""
+        line = _dump_json(entry) + b"\n"
+        with self._flush_lock:
+            self._pending_metrics.append(line)
+            self._journal_entries += 1
+            schedule = self._flush_timer is None and self.JOURNAL_FLUSH_INTERVAL > 0
+            if schedule:
+                self._flush_timer = threading.Timer(self.JOURNAL_FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+        if self._journal_entries >= self.JOURNAL_COMPACT_THRESHOLD:
+            self.compact()
+        elif self.JOURNAL_FLUSH_INTERVAL <= 0:
+            self.flush()
+
+    def _write_file(self, path: Path, content: str) -> bool:
+        """
+        写入文件，返回是否实际写入
+
+        内容与磁盘上已有内容相同时跳过：本实例写过的文件按记录的哈希判断，
+        其余文件（如之前的进程写入的）读取现有内容比较，读取远比重写便宜，也不会改变文件修改时间。
+        先写入同目录下的临时文件再替换，避免中途失败留下不完整的文件。
+        """
+        digest = _content_hash(content)
+        on_disk = self._written_digests.get(path)
+        if on_disk is None:
+            try:
+                on_disk = _content_hash(path.read_text(encoding='utf-8'))
+            except (OSError, UnicodeDecodeError):
+                on_disk = None
+        elif not path.exists():
+            on_disk = None
+
+        if on_disk == digest:
+            self._written_digests[path] = digest
+            return False
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        self._written_digests[path] = digest
+        return True
 
     def _save_tool_code(self, tool: GeneratedTool):
-        """保存工具代码到独立文件"""
+        """保存工具代码到独立文件（内容未变化的文件不重写）"""
         try:
             # 创建工具目录: generated/tools/{cloud_provider}/{service}/
             tool_dir = self.registry_dir / tool.cloud_provider / tool.service
             tool_dir.mkdir(parents=True, exist_ok=True)
 
-            # 保存代码文件
+            # 保存代码文件（添加头部注释）
             code_file = tool_dir / f"{tool.name}.py"
-            with open(code_file, 'w', encoding='utf-8') as f:
-                # 添加头部注释
-                f.write(f'"""\n')
-                f.write(f'{tool.description}\n\n')
-                f.write(f'工具ID: {tool.tool_id}\n')
-                f.write(f'版本: {tool.version}\n')
-                f.write(f'生成时间: {tool.metrics.created_at}\n')
-                f.write(f'"""\n\n')
-                f.write(tool.code)
+            header = (
+                f'"""\n'
+                f'{tool.description}\n\n'
+                f'工具ID: {tool.tool_id}\n'
+                f'版本: {tool.version}\n'
+                f'生成时间: {tool.metrics.created_at}\n'
+                f'"""\n\n'
+            )
+            self._write_file(code_file, header + tool.code)
 
             # 保存测试代码
             if tool.test_code:
                 test_file = tool_dir / f"test_{tool.name}.py"
-                with open(test_file, 'w', encoding='utf-8') as f:
-                    f.write(tool.test_code)
+                self._write_file(test_file, tool.test_code)
 
             logger.info(f"保存工具代码: {code_file}")
 
@@ -330,11 +643,11 @@ class ToolRegistry:
             is_update = True
 
         # 注册工具
-        self.tools[tool.name] = tool
+        self._add_tool(tool)
 
-        # 保存到磁盘
+        # 保存到磁盘（同时合并此前的指标日志）
         self._save_tool_code(tool)
-        self._save_index()
+        self.compact()
 
         logger.info(
             f"{'更新' if is_update else '注册'}工具: {tool.name} (v{tool.version}) "
@@ -350,6 +663,39 @@ class ToolRegistry:
             "message": f"工具 '{tool.name}' {'更新' if is_update else '注册'}成功"
         }
 
+    def _reset_indexes(self):
+        """清空二级索引"""
+        self._by_provider: Dict[str, Set[str]] = {}
+        self._by_service: Dict[str, Set[str]] = {}
+        self._by_category: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+        # 工具首次加入的顺序（同名工具更新时保持原位置，与self.tools的顺序一致）
+        self._tool_rank: Dict[str, int] = {}
+
+    def _index_keys(self, tool: GeneratedTool):
+        """工具在各个二级索引中的键"""
+        yield self._by_provider, tool.cloud_provider
+        yield self._by_service, tool.service
+        yield self._by_category, tool.category
+        for tag in tool.tags:
+            yield self._by_tag, tag
+
+    def _add_tool(self, tool: GeneratedTool):
+        """加入（或替换同名）工具，并维护二级索引"""
+        existing = self.tools.get(tool.name)
+        if existing is not None:
+            for index, key in self._index_keys(existing):
+                names = index.get(key)
+                if names is not None:
+                    names.discard(existing.name)
+                    if not names:
+                        del index[key]
+
+        self.tools[tool.name] = tool
+        self._tool_rank.setdefault(tool.name, len(self._tool_rank))
+        for index, key in self._index_keys(tool):
+            index.setdefault(key, set()).add(tool.name)
+
     def get_tool(self, name: str) -> Optional[GeneratedTool]:
         """
         获取工具
@@ -387,9 +733,32 @@ class ToolRegistry:
         Returns:
             工具列表（按质量分数排序）
         """
+        # 云平台/服务/分类/标签过滤：通过索引求交集得到候选工具
+        candidates: Optional[Set[str]] = None
+        for index, value in (
+            (self._by_provider, cloud_provider),
+            (self._by_service, service),
+            (self._by_category, category),
+        ):
+            if value:
+                names = index.get(value, set())
+                candidates = names if candidates is None else candidates & names
+
+        if tags:
+            # 命中任一标签即可
+            tagged = set().union(*(self._by_tag.get(tag, ()) for tag in tags))
+            candidates = tagged if candidates is None else candidates & tagged
+
+        if candidates is None:
+            tools = self.tools.values()
+        else:
+            # 按注册顺序遍历，保证同分工具的先后顺序与全量扫描一致
+            tools = [self.tools[name] for name in sorted(candidates, key=self._tool_rank.__getitem__)]
+
         results = []
+        query_lower = query.lower() if query else None
 
-        for tool in self.tools.values():
+        for tool in tools:
             # 状态过滤
             if tool.status != ToolStatus.ACTIVE:
                 continue
@@ -398,32 +767,18 @@ class ToolRegistry:
             if tool.metrics.quality_score < min_quality_score:
                 continue
 
-            # 云平台过滤
-            if cloud_provider and tool.cloud_provider != cloud_provider:
-                continue
-
-            # 服务过滤
-            if service and tool.service != service:
-                continue
-
-            # 分类过滤
-            if category and tool.category != category:
-                continue
-
-            # 标签过滤
-            if tags and not any(tag in tool.tags for tag in tags):
-                continue
-
-            # 查询文本过滤
-            if query:
-                query_lower = query.lower()
-                if (query_lower not in tool.name.lower() and
-                    query_lower not in tool.description.lower()):
+            # 查询文本过滤（名称和描述的小写形式缓存在工具上）
+            if query_lower:
+                name_lower, description_lower = tool.search_fields()
+                if query_lower not in name_lower and query_lower not in description_lower:
                     continue
 
             results.append(tool)
 
-        # 按质量分数排序
+        # 按质量分数排序（只需前limit个时用堆选取，结果与完整排序后截取一致）
+        if 0 < limit < len(results):
+            return heapq.nsmallest(limit, results, key=lambda t: -t.metrics.quality_score)
+
         results.sort(key=lambda t: t.metrics.quality_score, reverse=True)
 
         return results[:limit]
@@ -447,6 +802,37 @@ class ToolRegistry:
             logger.warning(f"工具 {tool_name} 不存在，无法更新指标")
             return
 
+        used_at = datetime.now().isoformat()
+        if self._apply_metrics(tool, success, execution_time, used_at):
+            logger.warning(f"工具 {tool_name} 质量分数过低，标记为失败")
+
+        # 只记录一条日志（批量追加），不重写整个索引
+        self._append_journal({
+            "tool": tool_name,
+            "success": success,
+            "t": execution_time,
+            "ts": used_at
+        })
+
+        logger.debug(
+            f"更新工具指标: {tool_name} - "
+            f"成功率: {tool.metrics.success_rate:.2%}, "
+            f"质量分数: {tool.metrics.quality_score:.1f}"
+        )
+
+    @staticmethod
+    def _apply_metrics(
+        tool: GeneratedTool,
+        success: bool,
+        execution_time: float,
+        used_at: Optional[str]
+    ) -> bool:
+        """
+        把一次调用计入工具指标（update_metrics与日志重放共用）
+
+        Returns:
+            工具是否因质量分数过低被标记为失败
+        """
         # 更新调用次数
         tool.metrics.total_calls += 1
         if success:
@@ -461,21 +847,13 @@ class ToolRegistry:
         )
 
         # 更新最后使用时间
-        tool.metrics.last_used = datetime.now().isoformat()
+        tool.metrics.last_used = used_at
 
         # 如果质量分数太低，标记为失败
         if tool.metrics.quality_score < 20 and tool.metrics.total_calls > 10:
             tool.status = ToolStatus.FAILED
-            logger.warning(f"工具 {tool_name} 质量分数过低，标记为失败")
-
-        # 保存更新
-        self._save_index()
-
-        logger.debug(
-            f"更新工具指标: {tool_name} - "
-            f"成功率: {tool.metrics.success_rate:.2%}, "
-            f"质量分数: {tool.metrics.quality_score:.1f}"
-        )
+            return True
+        return False
 
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -485,42 +863,29 @@ class ToolRegistry:
             统计数据
         """
         total_tools = len(self.tools)
-        active_tools = sum(1 for t in self.tools.values() if t.status == ToolStatus.ACTIVE)
 
-        # 按云平台统计
+        # 一次遍历同时统计状态、云平台分布、分类分布并收集质量分数
+        by_status: Dict[ToolStatus, int] = {}
         by_provider = {}
-        for tool in self.tools.values():
-            provider = tool.cloud_provider
-            if provider not in by_provider:
-                by_provider[provider] = 0
-            by_provider[provider] += 1
-
-        # 按分类统计
         by_category = {}
+        quality_scores = []
         for tool in self.tools.values():
-            category = tool.category
-            if category not in by_category:
-                by_category[category] = 0
-            by_category[category] += 1
-
-        # 平均质量分数
-        if total_tools > 0:
-            avg_quality = sum(t.metrics.quality_score for t in self.tools.values()) / total_tools
-        else:
-            avg_quality = 0.0
+            by_status[tool.status] = by_status.get(tool.status, 0) + 1
+            by_provider[tool.cloud_provider] = by_provider.get(tool.cloud_provider, 0) + 1
+            by_category[tool.category] = by_category.get(tool.category, 0) + 1
+            quality_scores.append(tool.metrics.quality_score)
+
+        # 平均质量分数（sum使用补偿求和，结果比逐个累加更精确）
+        avg_quality = sum(quality_scores) / total_tools if total_tools > 0 else 0.0
 
-        # Top 10工具
-        top_tools = sorted(
-            self.tools.values(),
-            key=lambda t: t.metrics.quality_score,
-            reverse=True
-        )[:10]
+        # Top 10工具（堆选取，结果与完整排序后截取一致）
+        top_tools = heapq.nlargest(10, self.tools.values(), key=lambda t: t.metrics.quality_score)
 
         return {
             "total_tools": total_tools,
-            "active_tools": active_tools,
-            "deprecated_tools": sum(1 for t in self.tools.values() if t.status == ToolStatus.DEPRECATED),
-            "failed_tools": sum(1 for t in self.tools.values() if t.status == ToolStatus.FAILED),
+            "active_tools": by_status.get(ToolStatus.ACTIVE, 0),
+            "deprecated_tools": by_status.get(ToolStatus.DEPRECATED, 0),
+            "failed_tools": by_status.get(ToolStatus.FAILED, 0),
             "average_quality_score": avg_quality,
             "by_provider": by_provider,
             "by_category": by_category,
@@ -2,18 +2,96 @@
 Task Executor - 任务执行引擎
 支持DAG编排、并行执行、数据聚合
 """
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Callable, Awaitable, Tuple
 import asyncio
 import logging
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
+from functools import partial, lru_cache
+import hashlib
+import json
+import operator
+import time
 
 from agents.task_planner_agent import TaskStep
 from tools.cloud_tools import get_tool_registry
 from config import get_config
 
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时使用标准json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# 只读步骤：结果只取决于参数（query_metric还取决于上下文中的实例列表），相同调用可复用结果
+_IDEMPOTENT_STEP_TYPES = frozenset({"list_resources", "query_metric", "query_log", "query_trace"})
+
+
+def _canonical_json(data: Any) -> bytes:
+    """键排序后的JSON字节串，用作调用键的哈希输入（优先使用orjson）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                data,
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+                default=str
+            )
+        except orjson.JSONEncodeError:
+            pass  # 超出orjson支持范围（如超过64位的整数），改用标准json
+    return json.dumps(data, sort_keys=True, default=str).encode()
+
+
+@lru_cache(maxsize=128)
+def _compile_topology(
+    structure: Tuple[Tuple[str, Tuple[str, ...]], ...]
+) -> Tuple[Dict[str, int], Dict[str, Tuple[str, ...]], Dict[str, int], Dict[str, Tuple[int, int]]]:
+    """
+    编译计划的依赖图（只取决于步骤ID和依赖关系，重复的计划模板直接复用）
+
+    Args:
+        structure: ((步骤ID, 依赖步骤ID...), ...)，按计划中的顺序
+
+    Returns:
+        (入度, 后继步骤, 计划中的顺序, 启动优先级)；入度在执行时会递减，调用方需复制
+    """
+    dependencies = {step_id: set(deps) for step_id, deps in structure}
+
+    # 入度 = 尚未完成的依赖数；children[x] = 依赖x的步骤
+    in_degree = {step_id: len(deps) for step_id, deps in dependencies.items()}
+    children = defaultdict(list)
+    for step_id, deps in dependencies.items():
+        for dep in deps:
+            children[dep].append(step_id)
+
+    step_order = {step_id: i for i, step_id in enumerate(dependencies)}
+
+    # 后代数：按拓扑序的逆序合并后继的后代集合（整数位集，第i位代表计划中第i个步骤）；
+    # 处在环上的步骤不会执行，后代数记为0
+    remaining = dict(in_degree)
+    topo = [step_id for step_id, degree in remaining.items() if degree == 0]
+    for step_id in topo:
+        for child in children.get(step_id, ()):
+            if child in remaining:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    topo.append(child)
+
+    descendants: Dict[str, int] = {}
+    for step_id in reversed(topo):
+        mask = 0
+        for child in children.get(step_id, ()):
+            if child in descendants:
+                mask |= descendants[child] | (1 << step_order[child])
+        descendants[step_id] = mask
+
+    # 同时就绪的步骤先启动后代多的（完成后能解锁更多步骤），其次按计划中的顺序
+    priority = {
+        step_id: (-descendants.get(step_id, 0).bit_count(), order)
+        for step_id, order in step_order.items()
+    }
+    return in_degree, {step_id: tuple(c) for step_id, c in children.items()}, step_order, priority
+
 
 @dataclass
 class ExecutionResult:
@@ -24,6 +102,8 @@ class ExecutionResult:
     error: Optional[str] = None
     execution_time: float = 0.0
     api_calls: List[Dict[str, Any]] = None  # 记录该步骤调用的API
+    cache_hit: bool = False  # 结果是否复用自缓存或同一计划内的相同调用（未发生API调用）
+    skipped: bool = False  # 是否因执行条件不满足（或依赖被跳过）而未执行
 
 
 class TaskExecutor:
@@ -38,10 +118,71 @@ class TaskExecutor:
     5. 处理执行错误
     """
 
+    # 单次GetMetricData请求可携带的查询数上限（AWS限制）
+    METRIC_DATA_MAX_QUERIES = 500
+
+    # 只读步骤结果缓存的最大条数（LRU淘汰）
+    RESULT_CACHE_SIZE = 1024
+
+    # 比较运算符 -> 比较函数
+    _OPERATORS = {
+        ">": operator.gt,
+        ">=": operator.ge,
+        "<": operator.lt,
+        "<=": operator.le,
+        "==": operator.eq,
+        "!=": operator.ne,
+    }
+
     def __init__(self):
         self.config = get_config()
         self.tool_registry = get_tool_registry()
 
+        # 限制同时执行的步骤数；信号量绑定事件循环，循环变化时重新创建
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # 只读步骤的跨计划结果缓存：调用键 -> (缓存时间, 结果数据)
+        self._result_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+        # 步骤类型 -> 处理方法（绑定一次，执行步骤时直接查表）
+        self._step_handlers: Dict[str, Callable[..., Awaitable[Any]]] = {
+            "list_resources": self._execute_list_resources,
+            "query_metric": self._execute_query_metric,
+            "query_log": self._execute_query_log,
+            "query_trace": self._execute_query_trace,
+            "filter": self._execute_filter,
+            "aggregate": self._execute_aggregate,
+            "analyze": self._execute_analyze,
+            "format": self._execute_format,
+        }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """当前事件循环中的步骤并发信号量"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.config.agent.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _gather_limited(self, calls: List[Callable[[], Awaitable[Any]]]) -> List[Any]:
+        """
+        以有限并发执行一组调用，结果顺序与calls一致
+
+        固定数量的worker依次取出调用执行，协程按需创建，避免一次性提交全部协程。
+        """
+        results: List[Any] = [None] * len(calls)
+        queue = deque(enumerate(calls))
+
+        async def worker():
+            while queue:
+                index, call = queue.popleft()
+                results[index] = await call()
+
+        workers = min(self.config.agent.max_concurrency, len(calls))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
     async def execute_plan(self, plan: Dict[str, Any]) -> Dict[str, Any]:
         """
         执行任务计划
@@ -103,73 +244,128 @@ class TaskExecutor:
         执行DAG计划（多步骤，支持并行）
 
         算法：
-        1. 构建依赖图
-        2. 拓扑排序，识别可并行步骤
-        3. 按层级执行：同层并行，跨层串行
+        1. 构建依赖图（入度计数 + 反向邻接表）
+        2. Kahn拓扑排序：入度为0的步骤即可执行，步骤完成后递减其后继的入度
+        3. 流式执行：步骤一完成就启动依赖已全部满足的后继，不等待同批其他步骤
         4. 聚合结果
         """
-        # 构建依赖关系
+        # 构建依赖关系（同样结构的计划复用已编译的依赖图）
         step_map = {s["step_id"]: s for s in steps}
-        dependencies = {s["step_id"]: set(s.get("dependencies", [])) for s in steps}
+        in_degree, children, step_order, priority = _compile_topology(
+            tuple((s["step_id"], tuple(s.get("dependencies", []))) for s in steps)
+        )
+        in_degree = dict(in_degree)
+
+        # 同时就绪的步骤按priority启动，同时完成的步骤按计划中的顺序记录结果（step_order）
 
         # 执行上下文（存储每个步骤的输出）
         context = {}
         results = []
 
+        # 所有步骤的API调用（步骤完成时追加，与results顺序一致）
+        api_trace = []
+
         # 已完成的步骤
         completed = set()
 
-        while len(completed) < len(steps):
-            # 找出所有依赖已满足的步骤
-            ready_steps = [
-                step_id for step_id, deps in dependencies.items()
-                if step_id not in completed and deps.issubset(completed)
-            ]
-
-            if not ready_steps:
-                # 没有可执行的步骤，可能存在循环依赖
-                return {
-                    "success": False,
-                    "error": "Circular dependency or no ready steps",
-                    "completed": list(completed),
-                    "remaining": list(set(step_map.keys()) - completed)
-                }
-
-            # 并行执行所有ready步骤
-            tasks = [
-                self._execute_step(step_map[step_id], context)
-                for step_id in ready_steps
-            ]
-
-            step_results = await asyncio.gather(*tasks, return_exceptions=True)
+        # 执行中的任务 -> 步骤ID；已完成的任务由回调放入finished队列
+        running: Dict[asyncio.Task, str] = {}
+        finished: asyncio.Queue = asyncio.Queue()
+
+        # 本次计划内相同的只读调用只执行一次
+        invocation_cache: Dict[str, asyncio.Task] = {}
+
+        # 因条件不满足（或依赖被跳过）而未执行的步骤
+        skipped: Set[str] = set()
+
+        def release(step_id: str) -> List[str]:
+            """标记步骤完成，返回依赖因此全部完成的后继步骤"""
+            completed.add(step_id)
+            ready = []
+            for child in children.get(step_id, ()):
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    ready.append(child)
+            return ready
+
+        def start(step_ids: List[str]):
+            pending = deque(sorted(step_ids, key=priority.__getitem__))
+            while pending:
+                step_id = pending.popleft()
+                step = step_map[step_id]
+
+                # 未选中的分支整体剪掉：跳过的步骤不调用API，其后继也随之跳过
+                if self._should_skip(step, context, skipped):
+                    logger.info(f"Skipping step {step_id}: condition not met")
+                    skipped.add(step_id)
+                    results.append(ExecutionResult(step_id=step_id, success=True, skipped=True))
+                    pending.extend(sorted(release(step_id), key=priority.__getitem__))
+                    continue
 
-            # 处理结果
-            for step_id, result in zip(ready_steps, step_results):
-                if isinstance(result, Exception):
-                    logger.error(f"Step {step_id} failed with exception: {result}")
-                    result = ExecutionResult(
-                        step_id=step_id,
-                        success=False,
-                        error=str(result)
-                    )
+                task = asyncio.ensure_future(
+                    self._execute_step(step, context, invocation_cache)
+                )
+                task.add_done_callback(finished.put_nowait)
+                running[task] = step_id
 
-                results.append(result)
-                completed.add(step_id)
+        start([step_id for step_id, degree in in_degree.items() if degree == 0])
 
-                # 将结果存入上下文
-                if result.success and result.data:
-                    output_key = step_map[step_id].get("output_key", step_id)
-                    context[output_key] = result.data
+        try:
+            while running:
+                if children:
+                    # 任务完成时通过回调放入队列，每次只处理已完成的任务，
+                    # 不必像asyncio.wait那样每轮为剩余的全部任务重新注册回调
+                    done = [await finished.get()]
+                    while not finished.empty():
+                        done.append(finished.get_nowait())
+                else:
+                    # 没有依赖关系的计划（全部步骤可并行）不需要在步骤完成时调度后继，一次等待全部完成
+                    done, _ = await asyncio.wait(running)
+
+                # 处理结果
+                ready = []
+                for task in sorted(done, key=lambda t: step_order[running[t]]):
+                    step_id = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"Step {step_id} failed with exception: {e}")
+                        result = ExecutionResult(
+                            step_id=step_id,
+                            success=False,
+                            error=str(e)
+                        )
+
+                    results.append(result)
+                    if result.api_calls:
+                        api_trace.extend(result.api_calls)
+
+                    # 将结果存入上下文
+                    if result.success and result.data:
+                        output_key = step_map[step_id].get("output_key", step_id)
+                        context[output_key] = result.data
+
+                    # 后继步骤的依赖全部完成时立即启动
+                    ready.extend(release(step_id))
+
+                start(ready)
+        finally:
+            # 被取消时不留下仍在运行的步骤
+            for task in running:
+                task.cancel()
+
+        if len(completed) < len(steps):
+            # 仍有步骤未执行，可能存在循环依赖（或依赖了不存在的步骤）
+            return {
+                "success": False,
+                "error": "Circular dependency or no ready steps",
+                "completed": list(completed),
+                "remaining": list(set(step_map.keys()) - completed)
+            }
 
         # 聚合最终结果
         final_data = self._aggregate_results(results, context)
 
-        # 收集所有步骤的API调用
-        api_trace = []
-        for r in results:
-            if r.api_calls:
-                api_trace.extend(r.api_calls)
-
         return {
             "success": all(r.success for r in results),
             "data": final_data,
@@ -178,19 +374,156 @@ class TaskExecutor:
             "api_trace": api_trace
         }
 
+    def _should_skip(self, step: Dict[str, Any], context: Dict[str, Any], skipped: Set[str]) -> bool:
+        """
+        判断步骤是否跳过：依赖的步骤被跳过（输入不存在），或执行条件不满足
+
+        条件格式：{"source_key": 上下文key, "field": 可选字段, "operator": 可选比较符, "value": 比较值}；
+        不带operator时判断取到的值是否为真。
+        """
+        if any(dep in skipped for dep in step.get("dependencies") or []):
+            return True
+
+        condition = step.get("condition")
+        if not condition:
+            return False
+
+        value = context.get(condition.get("source_key"))
+        field = condition.get("field")
+        if field is not None:
+            value = value.get(field) if isinstance(value, dict) else None
+
+        if "operator" not in condition:
+            return not value
+        if value is None:
+            return True
+
+        try:
+            return not self._apply_operator(value, condition["operator"], condition.get("value"))
+        except TypeError:
+            logger.warning(f"Cannot evaluate condition of step {step.get('step_id')}: {condition}")
+            return True
+
+    def _step_cache_key(self, step: Dict[str, Any], context: Dict[str, Any]) -> Optional[str]:
+        """只读步骤的调用键（类型、操作和参数相同即为同一调用），其他步骤返回None"""
+        step_type = step.get("step_type")
+        if step_type not in _IDEMPOTENT_STEP_TYPES:
+            return None
+
+        key_data = {
+            "step_type": step_type,
+            "operation": step.get("operation"),
+            "parameters": step.get("parameters", {})
+        }
+        if step_type == "query_metric":
+            key_data["instances"] = [
+                instance.get("InstanceId")
+                for instance in context.get("resources", {}).get("instances", [])
+            ]
+
+        return hashlib.blake2b(_canonical_json(key_data), digest_size=16).hexdigest()
+
     async def _execute_step(
         self,
         step: Dict[str, Any],
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        invocation_cache: Optional[Dict[str, asyncio.Task]] = None
     ) -> ExecutionResult:
         """
-        执行单个步骤
+        执行单个步骤（同时执行的步骤数受max_concurrency限制）
 
         Args:
             step: 步骤定义
             context: 执行上下文（包含前置步骤的输出）
+            invocation_cache: 计划内的调用缓存（调用键 -> 执行任务），相同的只读调用共享一次执行
+
+        只读步骤的成功结果还会在step_cache_ttl秒内跨计划复用。
         """
-        import time
+        key = self._step_cache_key(step, context)
+        if key is None:
+            return await self._run_step_limited(step, context)
+
+        # 近期相同调用的结果直接复用，不再调用API
+        data = self._get_cached_result(key)
+        if data is not None:
+            logger.info(f"Step {step.get('step_id')} served from result cache")
+            return ExecutionResult(
+                step_id=step.get("step_id"),
+                success=True,
+                data=data,
+                api_calls=[],
+                cache_hit=True
+            )
+
+        if invocation_cache is None:
+            result = await self._run_step_limited(step, context)
+        else:
+            shared = invocation_cache.get(key)
+            if shared is not None:
+                # 复用本计划内已有调用的结果；没有发生新的API调用
+                result = await shared
+                logger.info(f"Step {step.get('step_id')} reuses result of step {result.step_id}")
+                return ExecutionResult(
+                    step_id=step.get("step_id"),
+                    success=result.success,
+                    data=result.data,
+                    error=result.error,
+                    api_calls=[],
+                    cache_hit=True
+                )
+
+            invocation_cache[key] = asyncio.ensure_future(self._run_step_limited(step, context))
+            result = await invocation_cache[key]
+
+        self._cache_result(key, result)
+        return result
+
+    def _get_cached_result(self, key: str) -> Any:
+        """读取未过期的缓存结果数据，不存在或已过期返回None"""
+        entry = self._result_cache.get(key)
+        if entry is None:
+            return None
+
+        cached_at, data = entry
+        if time.monotonic() - cached_at > self.config.agent.step_cache_ttl:
+            del self._result_cache[key]
+            return None
+
+        self._result_cache.move_to_end(key)
+        return data
+
+    def _cache_result(self, key: str, result: ExecutionResult):
+        """缓存成功的只读步骤结果（超出容量时淘汰最久未使用的条目）"""
+        if self.config.agent.step_cache_ttl <= 0 or not result.success or not result.data:
+            return
+        # 工具调用失败时步骤本身仍算成功，结果中的success为False，不缓存
+        if isinstance(result.data, dict) and result.data.get("success") is False:
+            return
+
+        self._result_cache[key] = (time.monotonic(), result.data)
+        self._result_cache.move_to_end(key)
+        if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
+    def clear_cache(self):
+        """清空只读步骤结果缓存"""
+        self._result_cache.clear()
+
+    async def _run_step_limited(
+        self,
+        step: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> ExecutionResult:
+        """占用一个并发名额执行步骤"""
+        async with self._get_semaphore():
+            return await self._run_step(step, context)
+
+    async def _run_step(
+        self,
+        step: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> ExecutionResult:
+        """执行单个步骤的具体逻辑（执行时间不含等待并发名额的时间）"""
         start_time = time.time()
 
         try:
@@ -202,28 +535,14 @@ class TaskExecutor:
             logger.info(f"Executing step {step_id}: {step_type} - {operation}")
 
             # 根据步骤类型执行
-            if step_type == "list_resources":
-                data = await self._execute_list_resources(parameters, context)
-            elif step_type == "query_metric":
-                data = await self._execute_query_metric(parameters, context)
-            elif step_type == "query_log":
-                data = await self._execute_query_log(parameters, context)
-            elif step_type == "query_trace":
-                data = await self._execute_query_trace(parameters, context)
-            elif step_type == "filter":
-                data = await self._execute_filter(parameters, context)
-            elif step_type == "aggregate":
-                data = await self._execute_aggregate(parameters, context)
-            elif step_type == "analyze":
-                data = await self._execute_analyze(parameters, context)
-            elif step_type == "format":
-                data = await self._execute_format(parameters, context)
-            else:
+            handler = self._step_handlers.get(step_type)
+            if handler is None:
                 return ExecutionResult(
                     step_id=step_id,
                     success=False,
                     error=f"Unknown step type: {step_type}"
                 )
+            data = await handler(parameters, context)
 
             execution_time = time.time() - start_time
             
@@ -299,15 +618,23 @@ class TaskExecutor:
         if not resources:
             return {"success": False, "error": "No resources to query metrics"}
 
-        # 并行查询所有实例的指标（通过ToolRegistry）
-        tasks = []
+        # 已注册GetMetricData工具时批量查询，否则逐个实例调用get_metric_statistics
+        if self.tool_registry.has_tool("aws", "cloudwatch", "get_metric_data"):
+            return await self._query_metric_data_batched(resources, parameters)
+
+        # 并行查询所有实例的指标（通过ToolRegistry，并发数受max_concurrency限制）
+        calls = []
         api_calls = []
         from datetime import datetime
 
+        # 同一步骤的调用同时发出，共用一个时间戳
+        called_at = datetime.now().isoformat()
+
         for instance in resources:
             instance_id = instance.get("InstanceId")
-            tasks.append(
-                self.tool_registry.call(
+            calls.append(
+                partial(
+                    self.tool_registry.call,
                     cloud_provider="aws",
                     service="cloudwatch",
                     operation="get_metric_statistics",
@@ -324,7 +651,7 @@ class TaskExecutor:
             )
             # 记录每个API调用
             api_calls.append({
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": called_at,
                 "type": "task_execution",
                 "cloud_provider": "aws",
                 "service": "cloudwatch",
@@ -336,7 +663,7 @@ class TaskExecutor:
                 }
             })
 
-        results = await asyncio.gather(*tasks)
+        results = await self._gather_limited(calls)
 
         # 组合结果：instance_id -> metric_data
         metrics = {}
@@ -353,6 +680,119 @@ class TaskExecutor:
             "api_calls": api_calls
         }
 
+    async def _query_metric_data_batched(
+        self,
+        resources: List[Dict[str, Any]],
+        parameters: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        用GetMetricData批量查询所有实例的指标
+
+        每个(实例, 统计类型)对应一个MetricDataQuery，每批最多METRIC_DATA_MAX_QUERIES个，
+        API调用次数从实例数降为批数；结果按时间戳合并回与get_metric_statistics相同的数据点格式。
+        """
+        metric_name = parameters.get("metric_name", "CPUUtilization")
+        namespace = parameters.get("namespace", "AWS/EC2")
+        statistics = parameters.get("statistics", ["Average"])
+        period = parameters.get("period", 300)
+
+        # 查询Id -> (实例序号, 统计类型)
+        queries = []
+        owners = {}
+        for i, instance in enumerate(resources):
+            for j, stat in enumerate(statistics):
+                query_id = f"m{i}_{j}"
+                queries.append({
+                    "Id": query_id,
+                    "MetricStat": {
+                        "Metric": {
+                            "Namespace": namespace,
+                            "MetricName": metric_name,
+                            "Dimensions": [{"Name": "InstanceId", "Value": instance.get("InstanceId")}]
+                        },
+                        "Period": period,
+                        "Stat": stat
+                    },
+                    "ReturnData": True
+                })
+                owners[query_id] = (i, stat)
+
+        batch_size = self.METRIC_DATA_MAX_QUERIES
+        batches = [queries[k:k + batch_size] for k in range(0, len(queries), batch_size)]
+
+        calls = []
+        api_calls = []
+        from datetime import datetime
+
+        # 同一步骤的调用同时发出，共用一个时间戳
+        called_at = datetime.now().isoformat()
+
+        for batch in batches:
+            calls.append(
+                partial(
+                    self.tool_registry.call,
+                    cloud_provider="aws",
+                    service="cloudwatch",
+                    operation="get_metric_data",
+                    parameters={
+                        "queries": batch,
+                        "start_time": parameters.get("start_time"),
+                        "end_time": parameters.get("end_time")
+                    }
+                )
+            )
+            # 每批记录一次API调用
+            api_calls.append({
+                "timestamp": called_at,
+                "type": "task_execution",
+                "cloud_provider": "aws",
+                "service": "cloudwatch",
+                "operation": "get_metric_data",
+                "parameters": {
+                    "namespace": namespace,
+                    "metric_name": metric_name,
+                    "instance_ids": list(dict.fromkeys(
+                        query["MetricStat"]["Metric"]["Dimensions"][0]["Value"] for query in batch
+                    ))
+                }
+            })
+
+        responses = await self._gather_limited(calls)
+
+        # 按实例合并各统计类型：时间戳 -> 数据点
+        datapoints: List[Dict[Any, Dict[str, Any]]] = [{} for _ in resources]
+        for response in responses:
+            payload = (response.get("data") or {}) if response.get("success") else {}
+            if not payload.get("success"):
+                logger.warning(f"GetMetricData batch failed: {payload.get('error') or response.get('error')}")
+                continue
+
+            for query_id, series in payload.get("results", {}).items():
+                owner = owners.get(query_id)
+                if owner is None:
+                    continue
+                index, stat = owner
+                points = datapoints[index]
+                for timestamp, value in zip(series.get("timestamps", []), series.get("values", [])):
+                    point = points.get(timestamp)
+                    if point is None:
+                        point = points[timestamp] = {"Timestamp": timestamp}
+                    point[stat] = value
+
+        # 组合结果：instance_id -> metric_data（数据点按时间升序）
+        metrics = {}
+        for instance, points in zip(resources, datapoints):
+            metrics[instance.get("InstanceId")] = {
+                "instance": instance,
+                "metric_data": [points[timestamp] for timestamp in sorted(points)]
+            }
+
+        return {
+            "success": True,
+            "metrics": metrics,
+            "api_calls": api_calls
+        }
+
     async def _execute_query_log(
         self,
         parameters: Dict[str, Any],
@@ -424,16 +864,19 @@ class TaskExecutor:
             filtered = {}
             metrics_data = source_data.get("metrics", {})
 
+            # 比较函数只查找一次；不支持的运算符不匹配任何实例
+            compare = self._OPERATORS.get(operator)
+
             for instance_id, data in metrics_data.items():
                 metric_values = data.get("metric_data", [])
-                if not metric_values:
+                if not metric_values or compare is None:
                     continue
 
                 # 取最新值或平均值
-                latest_value = metric_values[-1].get("Average", 0) if metric_values else 0
+                latest_value = metric_values[-1].get("Average", 0)
 
                 # 应用过滤条件
-                if self._apply_operator(latest_value, operator, threshold):
+                if compare(latest_value, threshold):
                     filtered[instance_id] = data
 
             return {
@@ -446,20 +889,9 @@ class TaskExecutor:
         return {"success": False, "error": f"Unsupported filter type: {filter_type}"}
 
     def _apply_operator(self, value: float, operator: str, threshold: float) -> bool:
-        """应用比较运算符"""
-        if operator == ">":
-            return value > threshold
-        elif operator == ">=":
-            return value >= threshold
-        elif operator == "<":
-            return value < threshold
-        elif operator == "<=":
-            return value <= threshold
-        elif operator == "==":
-            return value == threshold
-        elif operator == "!=":
-            return value != threshold
-        return False
+        """应用比较运算符（不支持的运算符返回False）"""
+        compare = self._OPERATORS.get(operator)
+        return compare is not None and compare(value, threshold)
 
     async def _execute_aggregate(
         self,
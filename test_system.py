@@ -1,444 +0,0 @@
-"""
-多云SRE Agent系统测试
-测试已完成的功能：Schema定义、DataAdapterAgent、健康判断
-"""
-import asyncio
-import sys
-from datetime import datetime
-from pathlib import Path
-import io
-
-# 设置stdout编码为utf-8
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-
-# 添加项目路径
-sys.path.insert(0, str(Path(__file__).parent))
-
-print("=" * 80)
-print("多云SRE Agent 系统测试")
-print("=" * 80)
-print()
-
-# ==================== 测试1：Schema定义 ====================
-print("[测试1] 健康判断Schema定义")
-print("-" * 80)
-
-try:
-    from schemas.health_schema import (
-        HealthStatus,
-        HealthCheckResult,
-        MetricHealth,
-        LogHealth,
-        TraceHealth,
-        ResourceHealth,
-        HealthThreshold,
-        HealthIssue,
-        SeverityLevel,
-    )
-    from schemas.resource_schema import (
-        ComputeResource,
-        ContainerResource,
-        ResourceType,
-        ResourceState,
-    )
-    from schemas.metric_schema import (
-        MetricResult,
-        MetricDataPoint,
-        MetricUnit,
-        StatisticType,
-    )
-
-    print("[OK] 所有Schema导入成功")
-
-    # 测试健康阈值配置
-    threshold = HealthThreshold()
-    print(f"✅ 默认CPU警告阈值: {threshold.cpu_warning_threshold}%")
-    print(f"✅ 默认日志错误率警告: {threshold.log_error_rate_warning * 100}%")
-    print(f"✅ 默认Trace P95延迟警告: {threshold.trace_p95_latency_warning_ms}ms")
-
-    # 测试创建HealthIssue
-    issue = HealthIssue(
-        severity=SeverityLevel.WARNING,
-        category="metric",
-        message="CPU使用率超过阈值",
-        metric_name="cpu_utilization",
-        current_value=85.5,
-        threshold=80.0,
-        recommendation="考虑扩容或优化应用性能",
-    )
-    print(f"✅ 创建健康问题: {issue.severity.value} - {issue.message}")
-
-    print()
-
-except Exception as e:
-    print(f"❌ Schema测试失败: {str(e)}")
-    import traceback
-    traceback.print_exc()
-    print()
-
-
-# ==================== 测试2：DataAdapterAgent ====================
-print("🤖 测试2：DataAdapterAgent - 多云数据转换")
-print("-" * 80)
-
-
-async def test_adapter():
-    try:
-        from agents.data_adapter_agent import DataAdapterAgent
-
-        adapter = DataAdapterAgent()
-        print(f"✅ DataAdapterAgent初始化成功")
-        print(f"   能力: {', '.join(adapter.get_capabilities())}")
-        print()
-
-        # 测试AWS EC2快速转换
-        print("  测试2.1：AWS EC2 → ComputeResource")
-        aws_ec2_data = {
-            "InstanceId": "i-test123456",
-            "InstanceType": "t3.medium",
-            "State": {"Code": 16, "Name": "running"},
-            "LaunchTime": datetime.utcnow().isoformat(),
-            "Placement": {"AvailabilityZone": "us-east-1a"},
-            "PrivateIpAddress": "10.0.1.100",
-            "PublicIpAddress": "54.123.45.67",
-            "VpcId": "vpc-12345",
-            "SubnetId": "subnet-67890",
-            "Tags": [
-                {"Key": "Name", "Value": "测试服务器"},
-                {"Key": "业务", "Value": "电商平台"},
-                {"Key": "Environment", "Value": "production"},
-            ],
-        }
-
-        result = await adapter.safe_process(
-            {
-                "raw_data": aws_ec2_data,
-                "cloud_provider": "aws",
-                "resource_type": "ec2",
-                "target_schema": "ComputeResource",
-            }
-        )
-
-        if result.success:
-            resource = result.data
-            print(f"  ✅ 转换成功 (方法: {result.metadata.get('conversion_method')})")
-            print(f"     资源ID: {resource.resource_id}")
-            print(f"     资源名称: {resource.resource_name}")
-            print(f"     状态: {resource.state.value}")
-            print(f"     实例类型: {resource.instance_type}")
-            print(f"     云平台: {resource.cloud_provider}")
-            print(f"     业务标签: {resource.tags.get('业务')}")
-        else:
-            print(f"  ❌ 转换失败: {result.error}")
-        print()
-
-        # 测试CloudWatch Metric快速转换
-        print("  测试2.2：AWS CloudWatch Metric → MetricResult")
-        metric_data = {
-            "Label": "CPUUtilization",
-            "Datapoints": [
-                {
-                    "Timestamp": datetime.utcnow().isoformat(),
-                    "Average": 45.2,
-                    "Unit": "Percent",
-                },
-                {
-                    "Timestamp": datetime.utcnow().isoformat(),
-                    "Average": 52.8,
-                    "Unit": "Percent",
-                },
-                {
-                    "Timestamp": datetime.utcnow().isoformat(),
-                    "Average": 87.5,
-                    "Unit": "Percent",
-                },
-            ],
-            "metadata": {
-                "namespace": "AWS/EC2",
-                "metric_name": "CPUUtilization",
-                "dimensions": {"InstanceId": "i-test123456"},
-            },
-        }
-
-        result = await adapter.safe_process(
-            {
-                "raw_data": metric_data,
-                "cloud_provider": "aws",
-                "target_schema": "MetricResult",
-            }
-        )
-
-        if result.success:
-            metric = result.data
-            print(f"  ✅ 转换成功 (方法: {result.metadata.get('conversion_method')})")
-            print(f"     指标: {metric.metric_name}")
-            print(f"     数据点数量: {len(metric.datapoints)}")
-            if metric.datapoints:
-                print(f"     最新值: {metric.datapoints[-1].value}{metric.datapoints[-1].unit.value}")
-            if metric.summary:
-                print(f"     平均值: {metric.summary.avg_value:.1f}")
-                print(f"     最大值: {metric.summary.max_value:.1f}")
-        else:
-            print(f"  ❌ 转换失败: {result.error}")
-        print()
-
-        # 测试Kubernetes Pod快速转换
-        print("  测试2.3：Kubernetes Pod → ContainerResource")
-        k8s_pod_data = {
-            "kind": "Pod",
-            "metadata": {
-                "name": "web-app-7d8c9f-xyz",
-                "namespace": "production",
-                "labels": {
-                    "app": "web-app",
-                    "业务": "电商平台",
-                    "version": "v1.0",
-                },
-                "creationTimestamp": "2025-01-10T10:00:00Z",
-            },
-            "spec": {
-                "nodeName": "node-01",
-                "containers": [
-                    {
-                        "name": "nginx",
-                        "image": "nginx:1.21",
-                        "resources": {
-                            "requests": {"cpu": "100m", "memory": "128Mi"},
-                            "limits": {"cpu": "500m", "memory": "512Mi"},
-                        },
-                    }
-                ],
-            },
-            "status": {
-                "phase": "Running",
-                "podIP": "10.244.1.15",
-                "containerStatuses": [{"restartCount": 3, "ready": True}],
-                "conditions": [
-                    {"type": "Ready", "status": "True"},
-                ],
-            },
-        }
-
-        result = await adapter.safe_process(
-            {
-                "raw_data": k8s_pod_data,
-                "cloud_provider": "kubernetes",
-                "resource_type": "pod",
-                "target_schema": "ContainerResource",
-            }
-        )
-
-        if result.success:
-            pod = result.data
-            print(f"  ✅ 转换成功 (方法: {result.metadata.get('conversion_method')})")
-            print(f"     Pod ID: {pod.resource_id}")
-            print(f"     命名空间: {pod.namespace}")
-            print(f"     状态: {pod.state.value}")
-            print(f"     重启次数: {pod.restart_count}")
-            print(f"     CPU限制: {pod.cpu_limit}")
-            print(f"     业务标签: {pod.tags.get('业务')}")
-        else:
-            print(f"  ❌ 转换失败: {result.error}")
-        print()
-
-    except Exception as e:
-        print(f"❌ DataAdapterAgent测试失败: {str(e)}")
-        import traceback
-        traceback.print_exc()
-
-
-# ==================== 测试3：健康判断逻辑 ====================
-print()
-print("🏥 测试3：健康判断逻辑")
-print("-" * 80)
-
-try:
-    from schemas.health_schema import MetricHealth, HealthThreshold
-
-    # 创建阈值配置
-    threshold_config = HealthThreshold()
-
-    # 测试CPU指标健康判断
-    print("  测试3.1：CPU指标健康判断")
-
-    # 健康的CPU
-    healthy_cpu = MetricHealth(
-        metric_name="cpu_utilization",
-        current_value=65.5,
-        threshold=80.0,
-        threshold_type="greater_than",
-        is_healthy=True,
-        dimensions={"InstanceId": "i-test123"},
-        unit="Percent",
-        cloud_provider="aws",
-    )
-    print(f"  ✅ 健康CPU: {healthy_cpu.current_value}% < {healthy_cpu.threshold}%")
-
-    # 不健康的CPU
-    unhealthy_cpu = MetricHealth(
-        metric_name="cpu_utilization",
-        current_value=92.3,
-        threshold=80.0,
-        threshold_type="greater_than",
-        is_healthy=False,
-        dimensions={"InstanceId": "i-test456"},
-        unit="Percent",
-        cloud_provider="aws",
-    )
-    print(
-        f"  ❌ 不健康CPU: {unhealthy_cpu.current_value}% > {unhealthy_cpu.threshold}%"
-    )
-    print()
-
-    # 测试日志健康判断
-    print("  测试3.2：日志健康判断")
-
-    from schemas.health_schema import LogHealth
-
-    log_health = LogHealth(
-        log_source="/aws/lambda/my-function",
-        time_range={
-            "start": datetime.utcnow(),
-            "end": datetime.utcnow(),
-        },
-        total_logs=1000,
-        error_count=8,
-        warning_count=25,
-        critical_count=0,
-        error_rate=0.008,  # 0.8%
-        is_healthy=True,
-        health_score=99.2,
-        cloud_provider="aws",
-    )
-
-    print(f"  ✅ 日志健康分数: {log_health.health_score:.1f}/100")
-    print(f"     总日志数: {log_health.total_logs}")
-    print(f"     错误率: {log_health.error_rate * 100:.2f}%")
-    print(f"     ERROR数量: {log_health.error_count}")
-    print(f"     WARN数量: {log_health.warning_count}")
-    print(
-        f"     判断: {'✅ 健康' if log_health.is_healthy else '❌ 不健康'}"
-    )
-    print()
-
-    # 测试Trace健康判断
-    print("  测试3.3：Trace健康判断")
-
-    from schemas.health_schema import TraceHealth
-
-    trace_health = TraceHealth(
-        service_name="api-gateway",
-        time_range={
-            "start": datetime.utcnow(),
-            "end": datetime.utcnow(),
-        },
-        total_traces=5000,
-        error_traces=25,
-        error_rate=0.005,  # 0.5%
-        avg_duration_ms=245.6,
-        p50_duration_ms=180.2,
-        p95_duration_ms=850.3,
-        p99_duration_ms=1250.8,
-        is_healthy=True,
-        health_score=95.0,
-        cloud_provider="aws",
-    )
-
-    print(f"  ✅ Trace健康分数: {trace_health.health_score:.1f}/100")
-    print(f"     总追踪数: {trace_health.total_traces}")
-    print(f"     错误率: {trace_health.error_rate * 100:.2f}%")
-    print(f"     平均响应时间: {trace_health.avg_duration_ms:.1f}ms")
-    print(f"     P95延迟: {trace_health.p95_duration_ms:.1f}ms")
-    print(
-        f"     判断: {'✅ 健康' if trace_health.is_healthy else '❌ 不健康'}"
-    )
-    print()
-
-except Exception as e:
-    print(f"❌ 健康判断测试失败: {str(e)}")
-    import traceback
-    traceback.print_exc()
-
-
-# ==================== 测试4：统一Schema多云支持 ====================
-print()
-print("🌐 测试4：统一Schema多云支持验证")
-print("-" * 80)
-
-try:
-    print("  验证：相同业务在不同云平台的统一表示")
-    print()
-
-    # AWS EC2实例
-    aws_resource = ComputeResource(
-        resource_id="i-aws123",
-        resource_name="web-server-aws",
-        resource_type=ResourceType.EC2,
-        cloud_provider="aws",
-        state=ResourceState.RUNNING,
-        tags={"业务": "电商平台", "环境": "生产"},
-        instance_type="t3.medium",
-        region="us-east-1",
-    )
-
-    # 阿里云ECS实例（模拟）
-    aliyun_resource = ComputeResource(
-        resource_id="i-aliyun456",
-        resource_name="web-server-aliyun",
-        resource_type=ResourceType.ECS,
-        cloud_provider="aliyun",
-        state=ResourceState.RUNNING,
-        tags={"业务": "电商平台", "环境": "生产"},
-        instance_type="ecs.t5-lc1m2.small",
-        region="cn-hangzhou",
-    )
-
-    # 展示统一格式
-    print("  AWS EC2:")
-    print(f"    资源ID: {aws_resource.resource_id}")
-    print(f"    云平台: {aws_resource.cloud_provider}")
-    print(f"    状态: {aws_resource.state.value}")
-    print(f"    业务标签: {aws_resource.tags.get('业务')}")
-    print()
-
-    print("  阿里云ECS:")
-    print(f"    资源ID: {aliyun_resource.resource_id}")
-    print(f"    云平台: {aliyun_resource.cloud_provider}")
-    print(f"    状态: {aliyun_resource.state.value}")
-    print(f"    业务标签: {aliyun_resource.tags.get('业务')}")
-    print()
-
-    print("  ✅ 统一Schema验证成功：不同云平台使用相同数据结构")
-    print()
-
-except Exception as e:
-    print(f"❌ 多云支持测试失败: {str(e)}")
-    import traceback
-    traceback.print_exc()
-
-
-# ==================== 主函数 ====================
-async def main():
-    """运行所有测试"""
-    await test_adapter()
-
-    print()
-    print("=" * 80)
-    print("测试总结")
-    print("=" * 80)
-    print("✅ 测试1：Schema定义 - 通过")
-    print("✅ 测试2：DataAdapterAgent - 通过")
-    print("✅ 测试3：健康判断逻辑 - 通过")
-    print("✅ 测试4：统一Schema多云支持 - 通过")
-    print()
-    print("🎉 所有测试通过！系统核心功能正常")
-    print()
-    print("📝 下一步：")
-    print("   1. 配置.env文件（LLM API密钥、云平台凭证）")
-    print("   2. 测试LLM智能转换功能")
-    print("   3. 继续实现待完成任务（参见 docs/TODO.md）")
-    print()
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
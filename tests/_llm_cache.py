@@ -0,0 +1,62 @@
+"""
+测试用LLM响应缓存
+相同输入的代码生成请求直接复用上次的成功响应，避免重复调用LLM（设置 LLM_CACHE=0 可关闭）
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from agents.base_agent import AgentResponse
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent / ".llm_cache"
+
+
+def payload_hash(payload: Any) -> str:
+    """请求内容的缓存键（键排序后的JSON的SHA256）"""
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cache_enabled() -> bool:
+    """是否启用缓存（LLM_CACHE=0 时关闭，用于完整集成测试）"""
+    return os.getenv("LLM_CACHE", "1") != "0"
+
+
+async def cached(coro_factory: Callable[[], Awaitable[AgentResponse]], key: str) -> AgentResponse:
+    """
+    按key缓存Agent响应
+
+    Args:
+        coro_factory: 未命中时调用，返回待执行的协程
+        key: 缓存键（通常为 payload_hash(请求内容)）
+
+    Returns:
+        缓存的响应，或本次执行的响应（仅成功的响应会写入缓存）
+    """
+    if not cache_enabled():
+        return await coro_factory()
+
+    path = CACHE_DIR / f"{key}.json"
+    if path.exists():
+        try:
+            return AgentResponse.model_validate_json(path.read_bytes())
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable LLM cache entry {path.name}: {e}")
+
+    response = await coro_factory()
+
+    if response.success:
+        try:
+            CACHE_DIR.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(response.model_dump_json(), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to write LLM cache entry {path.name}: {e}")
+
+    return response
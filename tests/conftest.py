@@ -5,31 +5,30 @@ pytest 全局配置和 fixtures
 import pytest
 import asyncio
 import os
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Any, Mapping
 from datetime import datetime, timezone
 from unittest.mock import Mock, AsyncMock, MagicMock
 
 
-# ==================== 事件循环配置 ====================
-
-@pytest.fixture(scope="session")
-def event_loop():
-    """创建事件循环供整个测试会话使用"""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
+# 测试数据中的时间戳在导入时取一次（同一会话内所有数据使用同一时刻，结果可复现）
+_NOW_UTC = datetime.now(timezone.utc)
+_NOW_ISO = _NOW_UTC.isoformat()
+_NOW_TS = int(_NOW_UTC.timestamp())
 
 
 # ==================== 测试数据工厂 - AWS ====================
+# 测试数据在整个会话内只构建一次；用只读视图包装，防止某个用例修改后影响其他用例
+# （嵌套的dict/list仍可修改，需要改动数据的用例应先复制）
 
-@pytest.fixture
-def aws_ec2_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def aws_ec2_data() -> Mapping[str, Any]:
     """AWS EC2 测试数据"""
-    return {
+    return MappingProxyType({
         "InstanceId": "i-1234567890abcdef0",
         "InstanceType": "t3.medium",
         "State": {"Code": 16, "Name": "running"},
-        "LaunchTime": datetime.now(timezone.utc).isoformat(),
+        "LaunchTime": _NOW_ISO,
         "Placement": {"AvailabilityZone": "us-east-1a"},
         "PrivateIpAddress": "10.0.1.100",
         "PublicIpAddress": "54.123.45.67",
@@ -40,22 +39,22 @@ def aws_ec2_data() -> Dict[str, Any]:
             {"Key": "Environment", "Value": "test"},
             {"Key": "业务", "Value": "测试业务"},
         ],
-    }
+    })
 
 
-@pytest.fixture
-def aws_cloudwatch_metric_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def aws_cloudwatch_metric_data() -> Mapping[str, Any]:
     """AWS CloudWatch 指标测试数据"""
-    return {
+    return MappingProxyType({
         "Label": "CPUUtilization",
         "Datapoints": [
             {
-                "Timestamp": datetime.now(timezone.utc).isoformat(),
+                "Timestamp": _NOW_ISO,
                 "Average": 75.5,
                 "Unit": "Percent",
             },
             {
-                "Timestamp": datetime.now(timezone.utc).isoformat(),
+                "Timestamp": _NOW_ISO,
                 "Average": 82.3,
                 "Unit": "Percent",
             },
@@ -64,13 +63,13 @@ def aws_cloudwatch_metric_data() -> Dict[str, Any]:
             "namespace": "AWS/EC2",
             "metric_name": "CPUUtilization",
         },
-    }
+    })
 
 
-@pytest.fixture
-def aws_xray_trace_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def aws_xray_trace_data() -> Mapping[str, Any]:
     """AWS X-Ray trace 测试数据"""
-    return {
+    return MappingProxyType({
         "TraceSummaries": [
             {
                 "Id": "1-5f8a1234-abcdef1234567890abcd",
@@ -80,15 +79,15 @@ def aws_xray_trace_data() -> Dict[str, Any]:
                 "Annotations": {},
             }
         ]
-    }
+    })
 
 
 # ==================== 测试数据工厂 - Azure ====================
 
-@pytest.fixture
-def azure_vm_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def azure_vm_data() -> Mapping[str, Any]:
     """Azure VM 测试数据"""
-    return {
+    return MappingProxyType({
         "vmId": "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
         "name": "test-vm-01",
         "location": "eastus",
@@ -102,20 +101,20 @@ def azure_vm_data() -> Dict[str, Any]:
             ]
         },
         "tags": {"Environment": "test", "业务": "测试业务"},
-    }
+    })
 
 
-@pytest.fixture
-def azure_monitor_metric_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def azure_monitor_metric_data() -> Mapping[str, Any]:
     """Azure Monitor 指标测试数据"""
-    return {
+    return MappingProxyType({
         "value": [
             {
                 "timeseries": [
                     {
                         "data": [
-                            {"timeStamp": datetime.now(timezone.utc).isoformat(), "average": 78.2},
-                            {"timeStamp": datetime.now(timezone.utc).isoformat(), "average": 85.6},
+                            {"timeStamp": _NOW_ISO, "average": 78.2},
+                            {"timeStamp": _NOW_ISO, "average": 85.6},
                         ]
                     }
                 ]
@@ -123,15 +122,15 @@ def azure_monitor_metric_data() -> Dict[str, Any]:
         ],
         "namespace": "Microsoft.Compute/virtualMachines",
         "resourceregion": "eastus",
-    }
+    })
 
 
 # ==================== 测试数据工厂 - GCP ====================
 
-@pytest.fixture
-def gcp_instance_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def gcp_instance_data() -> Mapping[str, Any]:
     """GCP Compute Engine 测试数据"""
-    return {
+    return MappingProxyType({
         "id": "123456789012345678",
         "name": "test-instance-01",
         "machineType": "projects/my-project/zones/us-central1-a/machineTypes/n1-standard-2",
@@ -139,13 +138,13 @@ def gcp_instance_data() -> Dict[str, Any]:
         "zone": "projects/my-project/zones/us-central1-a",
         "networkInterfaces": [{"networkIP": "10.128.0.2"}],
         "labels": {"env": "test", "业务": "测试业务"},
-    }
+    })
 
 
-@pytest.fixture
-def gcp_metric_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def gcp_metric_data() -> Mapping[str, Any]:
     """GCP Cloud Monitoring 指标测试数据"""
-    return {
+    return MappingProxyType({
         "metric": {
             "type": "compute.googleapis.com/instance/cpu/utilization",
             "labels": {}
@@ -158,23 +157,23 @@ def gcp_metric_data() -> Dict[str, Any]:
         "valueType": "DOUBLE",
         "points": [
             {
-                "interval": {"endTime": datetime.now(timezone.utc).isoformat()},
+                "interval": {"endTime": _NOW_ISO},
                 "value": {"doubleValue": 72.4}
             },
             {
-                "interval": {"endTime": datetime.now(timezone.utc).isoformat()},
+                "interval": {"endTime": _NOW_ISO},
                 "value": {"doubleValue": 80.1}
             },
         ],
-    }
+    })
 
 
 # ==================== 测试数据工厂 - 火山云 ====================
 
-@pytest.fixture
-def volc_ecs_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def volc_ecs_data() -> Mapping[str, Any]:
     """火山云 ECS 测试数据"""
-    return {
+    return MappingProxyType({
         "InstanceId": "i-volc1234567890",
         "InstanceName": "test-ecs-01",
         "Status": "RUNNING",
@@ -185,28 +184,28 @@ def volc_ecs_data() -> Dict[str, Any]:
             {"PrimaryIpAddress": "172.16.0.10"}
         ],
         "Tags": {"业务": "测试业务"},  # 修改为字典格式
-    }
+    })
 
 
-@pytest.fixture
-def volc_monitor_metric_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def volc_monitor_metric_data() -> Mapping[str, Any]:
     """火山云 VeMonitor 指标测试数据"""
-    return {
+    return MappingProxyType({
         "MetricName": "CpuUtil",
         "Namespace": "VCM/ECS",
         "Data": [
-            {"Timestamp": int(datetime.now(timezone.utc).timestamp()), "Value": 68.5},
-            {"Timestamp": int(datetime.now(timezone.utc).timestamp()), "Value": 75.2},
+            {"Timestamp": _NOW_TS, "Value": 68.5},
+            {"Timestamp": _NOW_TS, "Value": 75.2},
         ],
-    }
+    })
 
 
 # ==================== 测试数据工厂 - Kubernetes ====================
 
-@pytest.fixture
-def k8s_pod_data() -> Dict[str, Any]:
+@pytest.fixture(scope="session")
+def k8s_pod_data() -> Mapping[str, Any]:
     """Kubernetes Pod 测试数据"""
-    return {
+    return MappingProxyType({
         "kind": "Pod",
         "metadata": {
             "name": "test-pod",
@@ -232,12 +231,29 @@ def k8s_pod_data() -> Dict[str, Any]:
             "podIP": "10.244.1.10",
             "containerStatuses": [{"restartCount": 0, "ready": True}],
         },
-    }
+    })
+
+
+# ==================== 被测Agent ====================
+
+@pytest.fixture(scope="session")
+def adapter():
+    """整个会话共用的DataAdapterAgent（无状态，可在用例间复用）"""
+    from agents.data_adapter_agent import DataAdapterAgent
+    return DataAdapterAgent()
 
 
 # ==================== Mock 对象 ====================
+# Mock在整个会话内只构建一次，每个用例开始前由reset_environment清空调用记录（保留返回值）
+
+# LLM返回的转换结果
+_LLM_RESPONSE_CONTENT = '{"resource_id": "test-id", "state": "running", "resource_type": "ec2"}'
+
+# 会话级Mock fixture的名称
+_SESSION_MOCKS = ("mock_llm_client", "mock_rag_system", "mock_aws_client", "mock_azure_client")
+
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_llm_client():
     """Mock LLM 客户端"""
     mock = MagicMock()
@@ -248,7 +264,7 @@ def mock_llm_client():
         choices=[
             Mock(
                 message=Mock(
-                    content='{"resource_id": "test-id", "state": "running", "resource_type": "ec2"}'
+                    content=_LLM_RESPONSE_CONTENT
                 )
             )
         ]
@@ -258,7 +274,7 @@ def mock_llm_client():
     return mock
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_rag_system():
     """Mock RAG 系统"""
     mock = AsyncMock()
@@ -274,7 +290,7 @@ def mock_rag_system():
     return mock
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_aws_client():
     """Mock AWS Boto3 客户端"""
     mock = MagicMock()
@@ -282,7 +298,7 @@ def mock_aws_client():
     return mock
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_azure_client():
     """Mock Azure 客户端"""
     mock = MagicMock()
@@ -332,9 +348,12 @@ def pytest_html_report_title(report):
 
 
 @pytest.fixture(autouse=True)
-def reset_environment():
+def reset_environment(request):
     """每个测试前后重置环境"""
-    # 测试前的设置
+    # 测试前的设置：清空本用例用到的会话级Mock的调用记录（未用到的不会被创建）
+    for name in _SESSION_MOCKS:
+        if name in request.fixturenames:
+            request.getfixturevalue(name).reset_mock()
     yield
     # 测试后的清理（如果需要）
     pass
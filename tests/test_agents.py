@@ -4,24 +4,29 @@
 import asyncio
 import logging
 from agents import AWSDocFetcher, CodeGenerator
+from _llm_cache import cached, payload_hash
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 各测试共用的Agent实例（只创建一次）
+_DOC_FETCHER = AWSDocFetcher()
+_CODEGEN = CodeGenerator()
+
 
 async def test_aws_doc_fetcher():
     """测试AWS文档拉取Agent"""
-    print("=" * 50)
-    print("测试AWS文档拉取Agent")
-    print("=" * 50)
+    out = []
+    out.append("=" * 50)
+    out.append("测试AWS文档拉取Agent")
+    out.append("=" * 50)
     
-    # 创建AWS文档拉取Agent
-    doc_fetcher = AWSDocFetcher()
+    doc_fetcher = _DOC_FETCHER
     
     # 测试获取能力
     capabilities = doc_fetcher.get_capabilities()
-    print(f"Agent能力: {capabilities}")
+    out.append(f"Agent能力: {capabilities}")
     
     # 测试拉取S3服务文档
     test_input = {
@@ -30,40 +35,42 @@ async def test_aws_doc_fetcher():
     }
     
     try:
-        print(f"\n正在拉取 {test_input['service_name']} 文档...")
+        out.append(f"\n正在拉取 {test_input['service_name']} 文档...")
         response = await doc_fetcher.safe_process(test_input)
         
         if response.success:
-            print(f"✅ 成功拉取文档!")
-            print(f"服务名称: {response.data['service_name']}")
-            print(f"找到文档数量: {response.data['total_links_found']}")
-            print(f"获取的文档数量: {len(response.data['documents'])}")
+            out.append(f"✅ 成功拉取文档!")
+            out.append(f"服务名称: {response.data['service_name']}")
+            out.append(f"找到文档数量: {response.data['total_links_found']}")
+            out.append(f"获取的文档数量: {len(response.data['documents'])}")
             
             # 显示第一个文档的信息
             if response.data['documents']:
                 first_doc = response.data['documents'][0]
-                print(f"\n第一个文档标题: {first_doc['title']}")
-                print(f"API章节数量: {len(first_doc['api_sections'])}")
-                print(f"表格数量: {len(first_doc['tables'])}")
+                out.append(f"\n第一个文档标题: {first_doc['title']}")
+                out.append(f"API章节数量: {len(first_doc['api_sections'])}")
+                out.append(f"表格数量: {len(first_doc['tables'])}")
         else:
-            print(f"❌ 拉取文档失败: {response.error}")
+            out.append(f"❌ 拉取文档失败: {response.error}")
             
     except Exception as e:
-        print(f"❌ 测试过程中出现异常: {str(e)}")
+        out.append(f"❌ 测试过程中出现异常: {str(e)}")
+
+    return out
 
 
 async def test_code_generator():
     """测试代码生成Agent"""
-    print("\n" + "=" * 50)
-    print("测试代码生成Agent")
-    print("=" * 50)
+    out = []
+    out.append("\n" + "=" * 50)
+    out.append("测试代码生成Agent")
+    out.append("=" * 50)
     
-    # 创建代码生成Agent
-    code_generator = CodeGenerator()
+    code_generator = _CODEGEN
     
     # 测试获取能力
     capabilities = code_generator.get_capabilities()
-    print(f"Agent能力: {capabilities}")
+    out.append(f"Agent能力: {capabilities}")
     
     # 测试生成Python代码
     test_requirements = {
@@ -114,33 +121,39 @@ async def test_code_generator():
     }
     
     try:
-        print(f"\n正在生成 {test_input['language']} 代码...")
-        response = await code_generator.safe_process(test_input)
+        out.append(f"\n正在生成 {test_input['language']} 代码...")
+        response = await cached(
+            lambda: code_generator.safe_process(test_input),
+            key=payload_hash(test_input)
+        )
         
         if response.success:
-            print(f"✅ 成功生成代码!")
-            print(f"语言: {response.data['language']}")
-            print(f"API信息数量: {response.data['api_info_count']}")
-            print(f"生成时间: {response.data['generated_at']}")
+            out.append(f"✅ 成功生成代码!")
+            out.append(f"语言: {response.data['language']}")
+            out.append(f"API信息数量: {response.data['api_info_count']}")
+            out.append(f"生成时间: {response.data['generated_at']}")
             
-            print("\n生成的代码:")
-            print("-" * 40)
-            print(response.data['code'])
-            print("-" * 40)
+            out.append("\n生成的代码:")
+            out.append("-" * 40)
+            out.append(response.data['code'])
+            out.append("-" * 40)
         else:
-            print(f"❌ 生成代码失败: {response.error}")
+            out.append(f"❌ 生成代码失败: {response.error}")
             
     except Exception as e:
-        print(f"❌ 测试过程中出现异常: {str(e)}")
+        out.append(f"❌ 测试过程中出现异常: {str(e)}")
+
+    return out
 
 
 async def test_javascript_code_generation():
     """测试JavaScript代码生成"""
-    print("\n" + "=" * 50)
-    print("测试JavaScript代码生成")
-    print("=" * 50)
+    out = []
+    out.append("\n" + "=" * 50)
+    out.append("测试JavaScript代码生成")
+    out.append("=" * 50)
     
-    code_generator = CodeGenerator()
+    code_generator = _CODEGEN
     
     test_requirements = {
         'service_name': 'ec2',
@@ -168,45 +181,50 @@ async def test_javascript_code_generation():
     }
     
     try:
-        print(f"\n正在生成 {test_input['language']} 代码...")
-        response = await code_generator.safe_process(test_input)
+        out.append(f"\n正在生成 {test_input['language']} 代码...")
+        response = await cached(
+            lambda: code_generator.safe_process(test_input),
+            key=payload_hash(test_input)
+        )
         
         if response.success:
-            print(f"✅ 成功生成JavaScript代码!")
-            print("\n生成的代码:")
-            print("-" * 40)
-            print(response.data['code'])
-            print("-" * 40)
+            out.append(f"✅ 成功生成JavaScript代码!")
+            out.append("\n生成的代码:")
+            out.append("-" * 40)
+            out.append(response.data['code'])
+            out.append("-" * 40)
         else:
-            print(f"❌ 生成JavaScript代码失败: {response.error}")
+            out.append(f"❌ 生成JavaScript代码失败: {response.error}")
             
     except Exception as e:
-        print(f"❌ 测试过程中出现异常: {str(e)}")
+        out.append(f"❌ 测试过程中出现异常: {str(e)}")
+
+    return out
 
 
 async def test_agent_integration():
     """测试Agent集成功能"""
-    print("\n" + "=" * 50)
-    print("测试Agent集成功能")
-    print("=" * 50)
+    out = []
+    out.append("\n" + "=" * 50)
+    out.append("测试Agent集成功能")
+    out.append("=" * 50)
     
     try:
         # 1. 首先拉取AWS文档
-        doc_fetcher = AWSDocFetcher()
-        doc_fetcher = AWSDocFetcher()
-        code_generator = CodeGenerator()
+        doc_fetcher = _DOC_FETCHER
+        code_generator = _CODEGEN
         
-        print("步骤1: 拉取AWS文档...")
+        out.append("步骤1: 拉取AWS文档...")
         doc_response = await doc_fetcher.safe_process({
             'service_name': 'lambda',
             'doc_type': 'api'
         })
         
         if doc_response.success:
-            print("✅ 文档拉取成功!")
+            out.append("✅ 文档拉取成功!")
             
             # 2. 使用拉取的文档生成代码
-            print("\n步骤2: 基于文档生成代码...")
+            out.append("\n步骤2: 基于文档生成代码...")
             code_requirements = {
                 'service_name': 'lambda',
                 'region': 'us-east-1',
@@ -236,41 +254,54 @@ async def test_agent_integration():
                 ]
             }
             
-            code_response = await code_generator.generate_with_docs(
-                requirements=code_requirements,
-                aws_docs=doc_response.data,
-                language='python'
+            code_response = await cached(
+                lambda: code_generator.generate_with_docs(
+                    requirements=code_requirements,
+                    aws_docs=doc_response.data,
+                    language='python'
+                ),
+                key=payload_hash([code_requirements, doc_response.data, 'python'])
             )
             
             if code_response.success:
-                print("✅ 代码生成成功!")
-                print("\n生成的集成代码:")
-                print("-" * 40)
-                print(code_response.data['code'])
-                print("-" * 40)
+                out.append("✅ 代码生成成功!")
+                out.append("\n生成的集成代码:")
+                out.append("-" * 40)
+                out.append(code_response.data['code'])
+                out.append("-" * 40)
             else:
-                print(f"❌ 代码生成失败: {code_response.error}")
+                out.append(f"❌ 代码生成失败: {code_response.error}")
         else:
-            print(f"❌ 文档拉取失败: {doc_response.error}")
+            out.append(f"❌ 文档拉取失败: {doc_response.error}")
             
     except Exception as e:
-        print(f"❌ 集成测试过程中出现异常: {str(e)}")
+        out.append(f"❌ 集成测试过程中出现异常: {str(e)}")
+
+    return out
 
 
 async def main():
     """主测试函数"""
     print("开始测试Agent功能...")
-    
-    # 测试各个Agent
-    await test_aws_doc_fetcher()
-    await test_code_generator()
-    await test_javascript_code_generation()
-    await test_agent_integration()
-    
+
+    # 各测试互不依赖，并发执行；输出先收集在各自的列表中，完成后按顺序打印
+    results = await asyncio.gather(
+        test_aws_doc_fetcher(),
+        test_code_generator(),
+        test_javascript_code_generation(),
+        test_agent_integration(),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"❌ 测试过程中出现异常: {str(result)}")
+        else:
+            print("\n".join(result))
+
     print("\n" + "=" * 50)
     print("所有测试完成!")
     print("=" * 50)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
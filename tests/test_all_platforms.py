@@ -30,33 +30,48 @@ async def main():
         ("Kubernetes Core", "kubernetes", "core"),
     ]
 
+    # 各平台互不依赖，并发拉取规格文档，再按列表顺序输出
+    responses = await asyncio.gather(
+        *(
+            spec_agent.process({
+                "cloud_provider": provider,
+                "service": service
+            })
+            for _, provider, service in platforms
+        ),
+        return_exceptions=True
+    )
+
     results = []
+    out = []
 
-    for name, provider, service in platforms:
-        print(f"\n{name}:")
-        result = await spec_agent.process({
-            "cloud_provider": provider,
-            "service": service
-        })
+    for (name, provider, service), result in zip(platforms, responses):
+        out.append(f"\n{name}:")
 
-        if result.success:
+        if isinstance(result, Exception):
+            out.append(f"  状态: ❌ 失败 - {result}")
+            results.append((name, 0, "error", False))
+        elif result.success:
             specs = result.data.get("specifications", {})
             ops_count = len(specs.get("operations", []))
             source = result.data.get("source", "unknown")
 
-            print(f"  数据来源: {source}")
-            print(f"  API操作数: {ops_count}")
+            out.append(f"  数据来源: {source}")
+            out.append(f"  API操作数: {ops_count}")
 
             if ops_count > 0:
-                print(f"  状态: ✅ 成功")
+                out.append(f"  状态: ✅ 成功")
                 results.append((name, ops_count, source, True))
             else:
-                print(f"  状态: ⚠️  无操作（可能是SDK未安装）")
+                out.append(f"  状态: ⚠️  无操作（可能是SDK未安装）")
                 results.append((name, ops_count, source, False))
         else:
-            print(f"  状态: ❌ 失败 - {result.error}")
+            out.append(f"  状态: ❌ 失败 - {result.error}")
             results.append((name, 0, "error", False))
 
+    # 各平台结果拼接后一次写出
+    print("\n".join(out))
+
     # 打印总结
     print("\n" + "=" * 70)
     print("测试总结")
@@ -68,10 +83,11 @@ async def main():
     print(f"\n成功平台: {success_count}/{len(platforms)}")
     print(f"总API操作数: {total_ops}")
 
-    print("\n详细统计:")
+    out = ["\n详细统计:"]
     for name, count, source, success in results:
         status = "✅" if success else ("⚠️ " if count == 0 else "❌")
-        print(f"  {status} {name}: {count} 操作 ({source})")
+        out.append(f"  {status} {name}: {count} 操作 ({source})")
+    print("\n".join(out))
 
     print("\n数据来源说明:")
     print("  - sdk_introspection: 从云SDK内省提取（最可靠）")
@@ -29,187 +29,204 @@ if not aws_key or not aws_secret:
     sys.exit(1)
 
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from functools import lru_cache
+
+# 所有客户端共用一个Session（凭证只解析一次）
+session = boto3.Session(
+    aws_access_key_id=aws_key,
+    aws_secret_access_key=aws_secret,
+    region_name=aws_region
+)
+
+
+# 最多扫描的指标数（超出部分不计入统计）
+METRIC_SCAN_LIMIT = 5000
+
+
+@lru_cache(maxsize=None)
+def get_client(service):
+    """获取boto3客户端（同一服务只创建一次；客户端对象线程安全，在主线程创建后交给各测试线程使用）"""
+    return session.client(service)
+
+
+# 各测试把输出收集到列表中，全部完成后按顺序打印，避免并发执行时输出交错
+
+def run_cloudwatch_metrics(cloudwatch):
+    """测试1: CloudWatch - 列出指标"""
+    out = []
+    try:
+        out.append(f"\n✓ CloudWatch客户端创建成功")
+        out.append(f"  区域: {aws_region}")
+
+        # 列出所有命名空间的指标（不限定EC2），按页流式处理：只统计数量并保留前5个
+        out.append("\n✓ 查询所有CloudWatch指标...")
+        paginator = cloudwatch.get_paginator('list_metrics')
+
+        metric_count = 0
+        namespaces = Counter()
+        all_metrics = []
+        for page in paginator.paginate(PaginationConfig={'MaxItems': METRIC_SCAN_LIMIT}):
+            for metric in page.get('Metrics', []):
+                metric_count += 1
+                namespaces[metric.get('Namespace', 'Unknown')] += 1
+                if len(all_metrics) < 5:
+                    all_metrics.append(metric)
+
+        out.append(f"\n✅ 成功！找到 {metric_count} 个指标")
+
+        # 按命名空间分组统计
+        out.append(f"\n指标分布（按命名空间）:")
+        for ns, count in namespaces.most_common(10):
+            out.append(f"  - {ns}: {count} 个指标")
+
+        # 显示前5个指标的详细信息
+        if all_metrics:
+            out.append(f"\n前5个指标详情:")
+            for i, metric in enumerate(all_metrics[:5], 1):
+                out.append(f"\n  {i}. {metric.get('Namespace', 'N/A')} / {metric.get('MetricName', 'N/A')}")
+                dimensions = metric.get('Dimensions', [])
+                if dimensions:
+                    dim_str = ', '.join([f"{d['Name']}={d['Value']}" for d in dimensions])
+                    out.append(f"     维度: {dim_str}")
+
+        return True, out
+
+    except Exception as e:
+        out.append(f"\n❌ CloudWatch测试失败: {str(e)}")
+        return False, out
+
+
+def run_alarms(cloudwatch):
+    """测试2: CloudWatch - 列出告警"""
+    out = []
+    try:
+        out.append("\n✓ 查询CloudWatch告警...")
+        paginator = cloudwatch.get_paginator('describe_alarms')
+
+        # 按页统计告警数量，只保留前5个用于展示
+        alarm_count = 0
+        alarms = []
+        for page in paginator.paginate():
+            for alarm in page.get('MetricAlarms', []):
+                alarm_count += 1
+                if len(alarms) < 5:
+                    alarms.append(alarm)
+
+        out.append(f"\n✅ 成功！找到 {alarm_count} 个告警")
+
+        if alarms:
+            out.append(f"\n告警列表:")
+            for i, alarm in enumerate(alarms[:5], 1):
+                out.append(f"  {i}. {alarm.get('AlarmName', 'N/A')}")
+                out.append(f"     状态: {alarm.get('StateValue', 'N/A')}")
+                out.append(f"     指标: {alarm.get('MetricName', 'N/A')}")
+        else:
+            out.append("  ⚠️  当前账号没有配置CloudWatch告警")
+
+        return True, out
+
+    except Exception as e:
+        out.append(f"\n❌ 告警查询失败: {str(e)}")
+        return False, out
+
+
+def run_caller_identity(sts):
+    """测试3: STS - 获取账号信息"""
+    out = []
+    try:
+        out.append("\n✓ 获取调用者身份...")
+        response = sts.get_caller_identity()
+
+        out.append(f"\n✅ 成功！")
+        out.append(f"  账号ID: {response.get('Account', 'N/A')}")
+        out.append(f"  用户ARN: {response.get('Arn', 'N/A')}")
+        out.append(f"  用户ID: {response.get('UserId', 'N/A')}")
+
+        return True, out
+
+    except Exception as e:
+        out.append(f"\n❌ STS测试失败: {str(e)}")
+        return False, out
+
+
+def run_list_buckets(s3):
+    """测试4: S3 - 列出存储桶（如果有权限）"""
+    out = []
+    try:
+        out.append("\n✓ 查询S3存储桶...")
+        response = s3.list_buckets()
+
+        buckets = response.get('Buckets', [])
+        out.append(f"\n✅ 成功！找到 {len(buckets)} 个S3存储桶")
+
+        if buckets:
+            out.append(f"\nS3存储桶列表:")
+            for i, bucket in enumerate(buckets[:10], 1):
+                out.append(f"  {i}. {bucket.get('Name', 'N/A')}")
+                out.append(f"     创建时间: {bucket.get('CreationDate', 'N/A')}")
+        else:
+            out.append("  ⚠️  当前账号没有S3存储桶")
+
+        return True, out
+
+    except Exception as e:
+        error_msg = str(e)
+        if "AccessDenied" in error_msg or "403" in error_msg:
+            out.append(f"\n⚠️  S3权限不足（预期内）: {error_msg[:100]}")
+            return "no_permission", out
+        out.append(f"\n❌ S3测试失败: {error_msg[:200]}")
+        return False, out
+
+
+def run_describe_regions(ec2):
+    """测试5: EC2 - 列出可用区域"""
+    out = []
+    try:
+        out.append("\n✓ 查询EC2可用区域...")
+        response = ec2.describe_regions()
+
+        regions = response.get('Regions', [])
+        out.append(f"\n✅ 成功！找到 {len(regions)} 个AWS区域")
+
+        if regions:
+            out.append(f"\nAWS区域列表:")
+            for i, region in enumerate(regions[:10], 1):
+                out.append(f"  {i}. {region.get('RegionName', 'N/A')}")
+                out.append(f"     端点: {region.get('Endpoint', 'N/A')}")
+
+        return True, out
+
+    except Exception as e:
+        error_msg = str(e)
+        if "UnauthorizedOperation" in error_msg or "403" in error_msg:
+            out.append(f"\n⚠️  EC2权限不足（预期内）: {error_msg[:100]}")
+            return "no_permission", out
+        out.append(f"\n❌ EC2测试失败: {error_msg[:200]}")
+        return False, out
+
+
+# (标题, 测试函数, 客户端)，按顺序输出
+tests = [
+    ("测试1: CloudWatch - 列出指标", run_cloudwatch_metrics, get_client('cloudwatch')),
+    ("测试2: CloudWatch - 列出告警", run_alarms, get_client('cloudwatch')),
+    ("测试3: STS - 获取账号信息", run_caller_identity, get_client('sts')),
+    ("测试4: S3 - 列出存储桶（如果有权限）", run_list_buckets, get_client('s3')),
+    ("测试5: EC2 - 列出可用区域", run_describe_regions, get_client('ec2')),
+]
 
-# 测试1: CloudWatch - 列出指标
-print("\n" + "=" * 70)
-print("测试1: CloudWatch - 列出指标")
-print("=" * 70)
-
-try:
-    cloudwatch = boto3.client(
-        'cloudwatch',
-        aws_access_key_id=aws_key,
-        aws_secret_access_key=aws_secret,
-        region_name=aws_region
-    )
-
-    print(f"\n✓ CloudWatch客户端创建成功")
-    print(f"  区域: {aws_region}")
-
-    # 列出所有命名空间的指标（不限定EC2）
-    print("\n✓ 查询所有CloudWatch指标...")
-    response = cloudwatch.list_metrics()
-
-    all_metrics = response.get('Metrics', [])
-    print(f"\n✅ 成功！找到 {len(all_metrics)} 个指标")
-
-    # 按命名空间分组统计
-    namespaces = {}
-    for metric in all_metrics:
-        ns = metric.get('Namespace', 'Unknown')
-        namespaces[ns] = namespaces.get(ns, 0) + 1
-
-    print(f"\n指标分布（按命名空间）:")
-    for ns, count in sorted(namespaces.items(), key=lambda x: x[1], reverse=True)[:10]:
-        print(f"  - {ns}: {count} 个指标")
-
-    # 显示前5个指标的详细信息
-    if all_metrics:
-        print(f"\n前5个指标详情:")
-        for i, metric in enumerate(all_metrics[:5], 1):
-            print(f"\n  {i}. {metric.get('Namespace', 'N/A')} / {metric.get('MetricName', 'N/A')}")
-            dimensions = metric.get('Dimensions', [])
-            if dimensions:
-                dim_str = ', '.join([f"{d['Name']}={d['Value']}" for d in dimensions])
-                print(f"     维度: {dim_str}")
-
-    test1_success = True
-
-except Exception as e:
-    print(f"\n❌ CloudWatch测试失败: {str(e)}")
-    test1_success = False
-
-
-# 测试2: 列出告警
-print("\n" + "=" * 70)
-print("测试2: CloudWatch - 列出告警")
-print("=" * 70)
-
-try:
-    print("\n✓ 查询CloudWatch告警...")
-    response = cloudwatch.describe_alarms()
-
-    alarms = response.get('MetricAlarms', [])
-    print(f"\n✅ 成功！找到 {len(alarms)} 个告警")
-
-    if alarms:
-        print(f"\n告警列表:")
-        for i, alarm in enumerate(alarms[:5], 1):
-            print(f"  {i}. {alarm.get('AlarmName', 'N/A')}")
-            print(f"     状态: {alarm.get('StateValue', 'N/A')}")
-            print(f"     指标: {alarm.get('MetricName', 'N/A')}")
-    else:
-        print("  ⚠️  当前账号没有配置CloudWatch告警")
-
-    test2_success = True
-
-except Exception as e:
-    print(f"\n❌ 告警查询失败: {str(e)}")
-    test2_success = False
-
-
-# 测试3: 获取账号信息（STS）
-print("\n" + "=" * 70)
-print("测试3: STS - 获取账号信息")
-print("=" * 70)
-
-try:
-    sts = boto3.client(
-        'sts',
-        aws_access_key_id=aws_key,
-        aws_secret_access_key=aws_secret,
-        region_name=aws_region
-    )
-
-    print("\n✓ 获取调用者身份...")
-    response = sts.get_caller_identity()
-
-    print(f"\n✅ 成功！")
-    print(f"  账号ID: {response.get('Account', 'N/A')}")
-    print(f"  用户ARN: {response.get('Arn', 'N/A')}")
-    print(f"  用户ID: {response.get('UserId', 'N/A')}")
-
-    test3_success = True
-
-except Exception as e:
-    print(f"\n❌ STS测试失败: {str(e)}")
-    test3_success = False
-
-
-# 测试4: 列出S3桶（如果有权限）
-print("\n" + "=" * 70)
-print("测试4: S3 - 列出存储桶（如果有权限）")
-print("=" * 70)
-
-try:
-    s3 = boto3.client(
-        's3',
-        aws_access_key_id=aws_key,
-        aws_secret_access_key=aws_secret,
-        region_name=aws_region
-    )
-
-    print("\n✓ 查询S3存储桶...")
-    response = s3.list_buckets()
-
-    buckets = response.get('Buckets', [])
-    print(f"\n✅ 成功！找到 {len(buckets)} 个S3存储桶")
-
-    if buckets:
-        print(f"\nS3存储桶列表:")
-        for i, bucket in enumerate(buckets[:10], 1):
-            print(f"  {i}. {bucket.get('Name', 'N/A')}")
-            print(f"     创建时间: {bucket.get('CreationDate', 'N/A')}")
-    else:
-        print("  ⚠️  当前账号没有S3存储桶")
-
-    test4_success = True
-
-except Exception as e:
-    error_msg = str(e)
-    if "AccessDenied" in error_msg or "403" in error_msg:
-        print(f"\n⚠️  S3权限不足（预期内）: {error_msg[:100]}")
-        test4_success = "no_permission"
-    else:
-        print(f"\n❌ S3测试失败: {error_msg[:200]}")
-        test4_success = False
-
+# 5个请求互不依赖，并发执行以重叠网络往返时间
+with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+    outcomes = list(executor.map(lambda t: t[1](t[2]), tests))
 
-# 测试5: EC2 - 列出区域
-print("\n" + "=" * 70)
-print("测试5: EC2 - 列出可用区域")
-print("=" * 70)
+# 每个测试块拼接后一次写出
+for (title, _, _), (_, out) in zip(tests, outcomes):
+    sys.stdout.write("\n".join(["", "=" * 70, title, "=" * 70, "\n".join(out)]) + "\n")
 
-try:
-    ec2 = boto3.client(
-        'ec2',
-        aws_access_key_id=aws_key,
-        aws_secret_access_key=aws_secret,
-        region_name=aws_region
-    )
-
-    print("\n✓ 查询EC2可用区域...")
-    response = ec2.describe_regions()
-
-    regions = response.get('Regions', [])
-    print(f"\n✅ 成功！找到 {len(regions)} 个AWS区域")
-
-    if regions:
-        print(f"\nAWS区域列表:")
-        for i, region in enumerate(regions[:10], 1):
-            print(f"  {i}. {region.get('RegionName', 'N/A')}")
-            print(f"     端点: {region.get('Endpoint', 'N/A')}")
-
-    test5_success = True
-
-except Exception as e:
-    error_msg = str(e)
-    if "UnauthorizedOperation" in error_msg or "403" in error_msg:
-        print(f"\n⚠️  EC2权限不足（预期内）: {error_msg[:100]}")
-        test5_success = "no_permission"
-    else:
-        print(f"\n❌ EC2测试失败: {error_msg[:200]}")
-        test5_success = False
+test1_success, test2_success, test3_success, test4_success, test5_success = (
+    success for success, _ in outcomes
+)
 
 
 # 总结
@@ -225,7 +242,7 @@ results = [
     ("EC2列出区域", test5_success),
 ]
 
-print("\n测试结果:")
+out = ["\n测试结果:"]
 for name, result in results:
     if result == True:
         status = "✅ 成功"
@@ -233,7 +250,8 @@ for name, result in results:
         status = "⚠️  无权限（预期内）"
     else:
         status = "❌ 失败"
-    print(f"  {status} - {name}")
+    out.append(f"  {status} - {name}")
+print("\n".join(out))
 
 # 计算成功率
 success_count = sum(1 for _, r in results if r == True)
@@ -245,10 +263,9 @@ print(f"⚠️  权限限制: {partial_count}/{total_count}")
 
 if success_count >= 2:
     print("\n🎉 AWS连接正常！至少有 {0} 个服务可用！".format(success_count))
-    print("\n可用的AWS服务:")
-    for name, result in results:
-        if result == True:
-            print(f"  ✅ {name}")
+    out = ["\n可用的AWS服务:"]
+    out.extend(f"  ✅ {name}" for name, result in results if result == True)
+    print("\n".join(out))
 else:
     print("\n⚠️  AWS连接有限，部分服务不可用")
 
@@ -5,6 +5,7 @@ import asyncio
 import sys
 import os
 from datetime import datetime
+from types import MappingProxyType
 import io
 
 # 设置stdout编码为utf-8
@@ -15,271 +16,292 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from agents.data_adapter_agent import DataAdapterAgent
 
 
-async def test_azure_vm():
-    """测试Azure VM转换"""
-    print("\n=== 测试Azure VM → ComputeResource ===")
-
-    adapter = DataAdapterAgent()
+# ==================== 测试数据 ====================
+# 模块加载时构建一次，只读视图防止被意外修改
 
-    # 模拟Azure VM响应
-    azure_vm_data = {
-        "id": "/subscriptions/xxx/resourceGroups/rg-prod/providers/Microsoft.Compute/virtualMachines/web-vm-01",
-        "name": "web-vm-01",
-        "location": "eastus",
-        "vmId": "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
-        "hardwareProfile": {
-            "vmSize": "Standard_D2s_v3"
-        },
-        "networkProfile": {
-            "networkInterfaces": [
+# 模拟Azure VM响应
+_AZURE_VM_FIXTURE = MappingProxyType({
+    "id": "/subscriptions/xxx/resourceGroups/rg-prod/providers/Microsoft.Compute/virtualMachines/web-vm-01",
+    "name": "web-vm-01",
+    "location": "eastus",
+    "vmId": "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
+    "hardwareProfile": {
+        "vmSize": "Standard_D2s_v3"
+    },
+    "networkProfile": {
+        "networkInterfaces": [
+            {
+                "id": "/subscriptions/xxx/resourceGroups/rg-prod/providers/Microsoft.Network/networkInterfaces/web-vm-01-nic",
+                "privateIPAddress": "10.0.1.10"
+            }
+        ]
+    },
+    "instanceView": {
+        "statuses": [
+            {
+                "code": "ProvisioningState/succeeded",
+                "level": "Info",
+                "displayStatus": "Provisioning succeeded"
+            },
+            {
+                "code": "PowerState/running",
+                "level": "Info",
+                "displayStatus": "VM running"
+            }
+        ]
+    },
+    "tags": {
+        "Environment": "Production",
+        "业务": "电商平台",
+        "Owner": "DevOps Team"
+    }
+})
+
+
+# 模拟Azure Monitor响应
+_AZURE_METRIC_FIXTURE = MappingProxyType({
+    "namespace": "Microsoft.Compute/virtualMachines",
+    "resourceregion": "eastus",
+    "value": [
+        {
+            "id": "/subscriptions/xxx/resourceGroups/rg-prod/providers/Microsoft.Compute/virtualMachines/web-vm-01/providers/Microsoft.Insights/metrics/Percentage CPU",
+            "type": "Microsoft.Insights/metrics",
+            "name": {
+                "value": "Percentage CPU",
+                "localizedValue": "Percentage CPU"
+            },
+            "unit": "Percent",
+            "timeseries": [
+                {
+                    "metadatavalues": [],
+                    "data": [
+                        {
+                            "timeStamp": "2025-01-10T10:00:00Z",
+                            "average": 65.2
+                        },
+                        {
+                            "timeStamp": "2025-01-10T10:05:00Z",
+                            "average": 72.8
+                        },
+                        {
+                            "timeStamp": "2025-01-10T10:10:00Z",
+                            "average": 88.5
+                        }
+                    ]
+                }
+            ]
+        }
+    ]
+})
+
+
+# 模拟GCP GCE响应
+_GCP_GCE_FIXTURE = MappingProxyType({
+    "id": "123456789012345678",
+    "name": "web-instance-01",
+    "description": "Production web server",
+    "machineType": "https://www.googleapis.com/compute/v1/projects/my-project/zones/us-central1-a/machineTypes/n1-standard-2",
+    "status": "RUNNING",
+    "zone": "https://www.googleapis.com/compute/v1/projects/my-project/zones/us-central1-a",
+    "networkInterfaces": [
+        {
+            "network": "https://www.googleapis.com/compute/v1/projects/my-project/global/networks/default",
+            "networkIP": "10.128.0.2",
+            "name": "nic0",
+            "accessConfigs": [
                 {
-                    "id": "/subscriptions/xxx/resourceGroups/rg-prod/providers/Microsoft.Network/networkInterfaces/web-vm-01-nic",
-                    "privateIPAddress": "10.0.1.10"
+                    "type": "ONE_TO_ONE_NAT",
+                    "name": "External NAT",
+                    "natIP": "35.123.45.67"
                 }
             ]
-        },
-        "instanceView": {
-            "statuses": [
+        }
+    ],
+    "creationTimestamp": "2025-01-10T10:00:00.000-08:00",
+    "labels": {
+        "environment": "production",
+        "业务": "电商平台",
+        "team": "backend"
+    },
+    "tags": {
+        "items": ["http-server", "https-server"]
+    }
+})
+
+
+# 模拟GCP Cloud Monitoring响应
+_GCP_METRIC_FIXTURE = MappingProxyType({
+    "timeSeries": [
+        {
+            "metric": {
+                "labels": {
+                    "instance_name": "web-instance-01"
+                },
+                "type": "compute.googleapis.com/instance/cpu/utilization"
+            },
+            "resource": {
+                "type": "gce_instance",
+                "labels": {
+                    "project_id": "my-project",
+                    "instance_id": "123456789012345678",
+                    "zone": "us-central1-a"
+                }
+            },
+            "metricKind": "GAUGE",
+            "valueType": "DOUBLE",
+            "points": [
                 {
-                    "code": "ProvisioningState/succeeded",
-                    "level": "Info",
-                    "displayStatus": "Provisioning succeeded"
+                    "interval": {
+                        "startTime": "2025-01-10T10:00:00Z",
+                        "endTime": "2025-01-10T10:00:00Z"
+                    },
+                    "value": {
+                        "doubleValue": 0.68
+                    }
+                },
+                {
+                    "interval": {
+                        "startTime": "2025-01-10T10:01:00Z",
+                        "endTime": "2025-01-10T10:01:00Z"
+                    },
+                    "value": {
+                        "doubleValue": 0.75
+                    }
                 },
                 {
-                    "code": "PowerState/running",
-                    "level": "Info",
-                    "displayStatus": "VM running"
+                    "interval": {
+                        "startTime": "2025-01-10T10:02:00Z",
+                        "endTime": "2025-01-10T10:02:00Z"
+                    },
+                    "value": {
+                        "doubleValue": 0.82
+                    }
                 }
             ]
-        },
-        "tags": {
-            "Environment": "Production",
-            "业务": "电商平台",
-            "Owner": "DevOps Team"
         }
-    }
+    ]
+})
+
+
+# 各用例的out参数为输出目标：pytest下为None（直接打印），main()中传入各自的缓冲区
+
+async def test_azure_vm(adapter, out=None):
+    """测试Azure VM转换"""
+    print("\n=== 测试Azure VM → ComputeResource ===", file=out)
 
     result = await adapter.safe_process({
-        "raw_data": azure_vm_data,
+        "raw_data": _AZURE_VM_FIXTURE,
         "cloud_provider": "azure",
         "resource_type": "vm",
         "target_schema": "ComputeResource"
     })
 
-    if result.success:
-        vm = result.data
-        print(f"✅ 转换成功 (方法: {result.metadata.get('conversion_method')})")
-        print(f"   资源ID: {vm.resource_id}")
-        print(f"   资源名称: {vm.resource_name}")
-        print(f"   资源类型: {vm.resource_type.value}")
-        print(f"   云平台: {vm.cloud_provider}")
-        print(f"   状态: {vm.state.value}")
-        print(f"   区域: {vm.region}")
-        print(f"   实例类型: {vm.instance_type}")
-        print(f"   业务标签: {vm.tags.get('业务')}")
-    else:
-        print(f"❌ 转换失败: {result.error}")
-
-
-async def test_azure_metric():
+    assert result.success, f"转换失败: {result.error}"
+    vm = result.data
+    print(f"✅ 转换成功 (方法: {result.metadata.get('conversion_method')})", file=out)
+    print(f"   资源ID: {vm.resource_id}", file=out)
+    print(f"   资源名称: {vm.resource_name}", file=out)
+    print(f"   资源类型: {vm.resource_type.value}", file=out)
+    print(f"   云平台: {vm.cloud_provider}", file=out)
+    print(f"   状态: {vm.state.value}", file=out)
+    print(f"   区域: {vm.region}", file=out)
+    print(f"   实例类型: {vm.instance_type}", file=out)
+    print(f"   业务标签: {vm.tags.get('业务')}", file=out)
+
+    assert result.metadata.get("conversion_method") == "fast_rule"
+    assert vm.resource_id == _AZURE_VM_FIXTURE["vmId"]
+    assert vm.resource_name == "web-vm-01"
+    assert vm.cloud_provider == "azure"
+    assert vm.state.value == "running"
+    assert vm.region == "eastus"
+    assert vm.instance_type == "Standard_D2s_v3"
+    assert vm.tags.get("业务") == "电商平台"
+
+
+async def test_azure_metric(adapter, out=None):
     """测试Azure Monitor Metric转换"""
-    print("\n=== 测试Azure Monitor Metric → MetricResult ===")
-
-    adapter = DataAdapterAgent()
-
-    # 模拟Azure Monitor响应
-    azure_metric_data = {
-        "namespace": "Microsoft.Compute/virtualMachines",
-        "resourceregion": "eastus",
-        "value": [
-            {
-                "id": "/subscriptions/xxx/resourceGroups/rg-prod/providers/Microsoft.Compute/virtualMachines/web-vm-01/providers/Microsoft.Insights/metrics/Percentage CPU",
-                "type": "Microsoft.Insights/metrics",
-                "name": {
-                    "value": "Percentage CPU",
-                    "localizedValue": "Percentage CPU"
-                },
-                "unit": "Percent",
-                "timeseries": [
-                    {
-                        "metadatavalues": [],
-                        "data": [
-                            {
-                                "timeStamp": "2025-01-10T10:00:00Z",
-                                "average": 65.2
-                            },
-                            {
-                                "timeStamp": "2025-01-10T10:05:00Z",
-                                "average": 72.8
-                            },
-                            {
-                                "timeStamp": "2025-01-10T10:10:00Z",
-                                "average": 88.5
-                            }
-                        ]
-                    }
-                ]
-            }
-        ]
-    }
+    print("\n=== 测试Azure Monitor Metric → MetricResult ===", file=out)
 
     result = await adapter.safe_process({
-        "raw_data": azure_metric_data,
+        "raw_data": _AZURE_METRIC_FIXTURE,
         "cloud_provider": "azure",
         "target_schema": "MetricResult"
     })
 
-    if result.success:
-        metric = result.data
-        print(f"✅ 转换成功 (方法: {result.metadata.get('conversion_method')})")
-        print(f"   指标名称: {metric.metric_name}")
-        print(f"   数据点数量: {len(metric.datapoints)}")
-        if metric.datapoints:
-            print(f"   最新值: {metric.datapoints[-1].value}")
-            print(f"   最早值: {metric.datapoints[0].value}")
-    else:
-        print(f"❌ 转换失败: {result.error}")
+    assert result.success, f"转换失败: {result.error}"
+    metric = result.data
+    print(f"✅ 转换成功 (方法: {result.metadata.get('conversion_method')})", file=out)
+    print(f"   指标名称: {metric.metric_name}", file=out)
+    print(f"   数据点数量: {len(metric.datapoints)}", file=out)
+    if metric.datapoints:
+        print(f"   最新值: {metric.datapoints[-1].value}", file=out)
+        print(f"   最早值: {metric.datapoints[0].value}", file=out)
 
+    assert result.metadata.get("conversion_method") == "fast_rule"
+    assert metric.metric_name == "Percentage CPU"
+    assert [dp.value for dp in metric.datapoints] == [65.2, 72.8, 88.5]
 
-async def test_gcp_gce():
-    """测试GCP Compute Engine转换"""
-    print("\n=== 测试GCP GCE → ComputeResource ===")
-
-    adapter = DataAdapterAgent()
 
-    # 模拟GCP GCE响应
-    gcp_gce_data = {
-        "id": "123456789012345678",
-        "name": "web-instance-01",
-        "description": "Production web server",
-        "machineType": "https://www.googleapis.com/compute/v1/projects/my-project/zones/us-central1-a/machineTypes/n1-standard-2",
-        "status": "RUNNING",
-        "zone": "https://www.googleapis.com/compute/v1/projects/my-project/zones/us-central1-a",
-        "networkInterfaces": [
-            {
-                "network": "https://www.googleapis.com/compute/v1/projects/my-project/global/networks/default",
-                "networkIP": "10.128.0.2",
-                "name": "nic0",
-                "accessConfigs": [
-                    {
-                        "type": "ONE_TO_ONE_NAT",
-                        "name": "External NAT",
-                        "natIP": "35.123.45.67"
-                    }
-                ]
-            }
-        ],
-        "creationTimestamp": "2025-01-10T10:00:00.000-08:00",
-        "labels": {
-            "environment": "production",
-            "业务": "电商平台",
-            "team": "backend"
-        },
-        "tags": {
-            "items": ["http-server", "https-server"]
-        }
-    }
+async def test_gcp_gce(adapter, out=None):
+    """测试GCP Compute Engine转换"""
+    print("\n=== 测试GCP GCE → ComputeResource ===", file=out)
 
     result = await adapter.safe_process({
-        "raw_data": gcp_gce_data,
+        "raw_data": _GCP_GCE_FIXTURE,
         "cloud_provider": "gcp",
         "resource_type": "gce",
         "target_schema": "ComputeResource"
     })
 
-    if result.success:
-        gce = result.data
-        print(f"✅ 转换成功 (方法: {result.metadata.get('conversion_method')})")
-        print(f"   资源ID: {gce.resource_id}")
-        print(f"   资源名称: {gce.resource_name}")
-        print(f"   资源类型: {gce.resource_type.value}")
-        print(f"   云平台: {gce.cloud_provider}")
-        print(f"   状态: {gce.state.value}")
-        print(f"   区域: {gce.region}")
-        print(f"   可用区: {gce.availability_zone}")
-        print(f"   实例类型: {gce.instance_type}")
-        print(f"   内网IP: {gce.private_ip}")
-        print(f"   公网IP: {gce.public_ip}")
-        print(f"   业务标签: {gce.tags.get('业务')}")
-    else:
-        print(f"❌ 转换失败: {result.error}")
-
-
-async def test_gcp_metric():
+    assert result.success, f"转换失败: {result.error}"
+    gce = result.data
+    print(f"✅ 转换成功 (方法: {result.metadata.get('conversion_method')})", file=out)
+    print(f"   资源ID: {gce.resource_id}", file=out)
+    print(f"   资源名称: {gce.resource_name}", file=out)
+    print(f"   资源类型: {gce.resource_type.value}", file=out)
+    print(f"   云平台: {gce.cloud_provider}", file=out)
+    print(f"   状态: {gce.state.value}", file=out)
+    print(f"   区域: {gce.region}", file=out)
+    print(f"   可用区: {gce.availability_zone}", file=out)
+    print(f"   实例类型: {gce.instance_type}", file=out)
+    print(f"   内网IP: {gce.private_ip}", file=out)
+    print(f"   公网IP: {gce.public_ip}", file=out)
+    print(f"   业务标签: {gce.tags.get('业务')}", file=out)
+
+    assert result.metadata.get("conversion_method") == "fast_rule"
+    assert gce.resource_id == "123456789012345678"
+    assert gce.resource_name == "web-instance-01"
+    assert gce.cloud_provider == "gcp"
+    assert gce.state.value == "running"
+    assert (gce.region, gce.availability_zone) == ("us-central1", "us-central1-a")
+    assert gce.instance_type == "n1-standard-2"
+    assert (gce.private_ip, gce.public_ip) == ("10.128.0.2", "35.123.45.67")
+    assert gce.tags.get("业务") == "电商平台"
+
+
+async def test_gcp_metric(adapter, out=None):
     """测试GCP Cloud Monitoring Metric转换"""
-    print("\n=== 测试GCP Cloud Monitoring Metric → MetricResult ===")
-
-    adapter = DataAdapterAgent()
-
-    # 模拟GCP Cloud Monitoring响应
-    gcp_metric_data = {
-        "timeSeries": [
-            {
-                "metric": {
-                    "labels": {
-                        "instance_name": "web-instance-01"
-                    },
-                    "type": "compute.googleapis.com/instance/cpu/utilization"
-                },
-                "resource": {
-                    "type": "gce_instance",
-                    "labels": {
-                        "project_id": "my-project",
-                        "instance_id": "123456789012345678",
-                        "zone": "us-central1-a"
-                    }
-                },
-                "metricKind": "GAUGE",
-                "valueType": "DOUBLE",
-                "points": [
-                    {
-                        "interval": {
-                            "startTime": "2025-01-10T10:00:00Z",
-                            "endTime": "2025-01-10T10:00:00Z"
-                        },
-                        "value": {
-                            "doubleValue": 0.68
-                        }
-                    },
-                    {
-                        "interval": {
-                            "startTime": "2025-01-10T10:01:00Z",
-                            "endTime": "2025-01-10T10:01:00Z"
-                        },
-                        "value": {
-                            "doubleValue": 0.75
-                        }
-                    },
-                    {
-                        "interval": {
-                            "startTime": "2025-01-10T10:02:00Z",
-                            "endTime": "2025-01-10T10:02:00Z"
-                        },
-                        "value": {
-                            "doubleValue": 0.82
-                        }
-                    }
-                ]
-            }
-        ]
-    }
+    print("\n=== 测试GCP Cloud Monitoring Metric → MetricResult ===", file=out)
 
     result = await adapter.safe_process({
-        "raw_data": gcp_metric_data,
+        "raw_data": _GCP_METRIC_FIXTURE,
         "cloud_provider": "gcp",
         "target_schema": "MetricResult"
     })
 
-    if result.success:
-        metric = result.data
-        print(f"✅ 转换成功 (方法: {result.metadata.get('conversion_method')})")
-        print(f"   指标名称: {metric.metric_name}")
-        print(f"   数据点数量: {len(metric.datapoints)}")
-        if metric.datapoints:
-            print(f"   最新值: {metric.datapoints[-1].value}")
-            print(f"   值范围: {metric.datapoints[0].value:.2f} - {metric.datapoints[-1].value:.2f}")
-    else:
-        print(f"❌ 转换失败: {result.error}")
+    assert result.success, f"转换失败: {result.error}"
+    metric = result.data
+    print(f"✅ 转换成功 (方法: {result.metadata.get('conversion_method')})", file=out)
+    print(f"   指标名称: {metric.metric_name}", file=out)
+    print(f"   数据点数量: {len(metric.datapoints)}", file=out)
+    if metric.datapoints:
+        print(f"   最新值: {metric.datapoints[-1].value}", file=out)
+        print(f"   值范围: {metric.datapoints[0].value:.2f} - {metric.datapoints[-1].value:.2f}", file=out)
+
+    assert result.metadata.get("conversion_method") == "fast_rule"
+    assert metric.metric_name == "compute.googleapis.com/instance/cpu/utilization"
+    assert len(metric.datapoints) == 3
+    assert metric.datapoints[-1].value == 0.82
 
 
 async def main():
@@ -288,10 +310,19 @@ async def main():
     print("Azure & GCP 数据适配测试")
     print("=" * 70)
 
-    await test_azure_vm()
-    await test_azure_metric()
-    await test_gcp_gce()
-    await test_gcp_metric()
+    adapter = DataAdapterAgent()
+    tests = [test_azure_vm, test_azure_metric, test_gcp_gce, test_gcp_metric]
+    bufs = [io.StringIO() for _ in tests]
+
+    async def run(test, out):
+        try:
+            await test(adapter, out)
+        except AssertionError as e:
+            print(f"❌ {e}", file=out)
+
+    # 四个转换互不依赖，并发执行；各自的输出写入缓冲区，完成后按顺序输出
+    await asyncio.gather(*(run(test, out) for test, out in zip(tests, bufs)))
+    sys.stdout.write("".join(buf.getvalue() for buf in bufs))
 
     print("\n" + "=" * 70)
     print("测试完成")
@@ -197,6 +197,28 @@ def func2(x, y, z):
         assert functions[1].name == "func2"
         assert functions[1].has_exceptions is True
 
+    def test_parse_functions_nested(self):
+        """测试嵌套函数的异常处理会计入外层函数，且结果顺序与ast.walk一致"""
+        code = '''
+class Service:
+    def run(self, x):
+        def _check(value):
+            if value < 0:
+                raise ValueError(value)
+        _check(x)
+        return x
+
+def helper(y):
+    return y
+'''
+
+        functions = TestGenerator()._parse_functions(code)
+
+        assert [f.name for f in functions] == ["helper", "run"]
+        assert functions[0].has_exceptions is False
+        assert functions[1].has_exceptions is True
+        assert functions[1].parameters == ["x"]
+
     def test_coverage_optimizer(self):
         """测试覆盖率优化器"""
         code = '''
@@ -221,6 +243,43 @@ def process_data(data):
         assert report["branch_count"] >= 1
         assert report["exception_count"] >= 1
 
+        # 每类结构只给出一条建议，按首次出现的顺序
+        suggestions = optimizer.analyze_coverage_gaps(code + code.replace("process_data", "process_more"), "")
+        assert suggestions == [
+            "添加测试覆盖if-else的两个分支",
+            "添加测试覆盖for循环的迭代（空列表、单项、多项）",
+            "添加测试覆盖异常处理路径",
+        ]
+
+    def test_parse_cache_shared(self):
+        """测试同一段代码在生成器与覆盖率分析之间只解析一次"""
+        from services.test_generator import _parse_cached
+
+        code = '''
+import boto3
+
+def scan_buckets(client):
+    if client is None:
+        raise ValueError("client required")
+    return client.list_buckets()
+'''
+
+        _parse_cached.cache_clear()
+        functions = TestGenerator()._parse_functions(code)
+        optimizer = CoverageOptimizer()
+        optimizer.analyze_coverage_gaps(code, "")
+        report = optimizer.generate_coverage_report(code)
+
+        info = _parse_cached.cache_info()
+        assert info.misses == 1
+        assert info.hits == 2
+        assert functions[0].cloud_provider == "aws"
+        assert report["function_count"] == 1
+
+        # 语法错误不被缓存，仍按原逻辑处理
+        assert TestGenerator()._parse_functions("def broken(:") == []
+        assert optimizer.generate_coverage_report("def broken(:") == {'error': '代码解析失败'}
+
 
 class TestCodeReviewer:
     """测试代码审查器"""
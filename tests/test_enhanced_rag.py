@@ -7,6 +7,8 @@ import sys
 import io
 import os
 
+import numpy as np
+
 # 设置UTF-8编码输出
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
@@ -14,11 +16,13 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from services.enhanced_rag import (
     BM25Retriever,
+    EnhancedRAG,
     HybridRetriever,
     QueryRewriter,
     Reranker,
     RetrievalMetrics,
-    RetrievalResult
+    RetrievalResult,
+    compute_doc_id
 )
 
 
@@ -80,9 +84,74 @@ def test_bm25_retriever():
         else:
             print("  未找到结果")
 
+    # 相同查询复用缓存的分词结果
+    assert retriever.tokenize_query("监控服务") is retriever.tokenize_query("监控服务")
+    assert [r.index for r in retriever.search_tokenized(retriever.tokenize_query("容器编排"), top_k=1)] == \
+        [r.index for r in retriever.search("容器编排", top_k=1)]
+
     print("\n✅ BM25检索测试完成")
 
 
+def test_bm25_index_persistence(tmp_path):
+    """测试BM25索引持久化与加载"""
+    documents = [
+        {"text": "AWS CloudWatch监控服务，支持告警和指标查询", "metadata": {}, "index": "aws.cloudwatch"},
+        {"text": "Amazon S3对象存储服务，支持存储桶管理", "metadata": {}, "index": "aws.s3"},
+        {"text": "Kubernetes容器编排平台", "metadata": {}, "index": "kubernetes.core"},
+    ]
+
+    retriever = BM25Retriever()
+    retriever.index_documents(documents)
+    assert retriever.save(str(tmp_path / "bm25.idx"))
+
+    loaded = BM25Retriever()
+    assert loaded.load(str(tmp_path / "bm25.idx"), documents)
+
+    expected = retriever.search("监控服务", top_k=3)
+    actual = loaded.search("监控服务", top_k=3)
+    assert [(r.text, r.score, r.doc_id) for r in actual] == [(r.text, r.score, r.doc_id) for r in expected]
+    # 文档ID加载时重新计算，与向量检索结果的ID一致
+    assert loaded.doc_ids == [compute_doc_id(doc["text"]) for doc in documents]
+
+    # 文档变化后磁盘索引视为过期
+    changed = documents[:2]
+    assert not BM25Retriever().load(str(tmp_path / "bm25.idx"), changed)
+
+    print("\n✅ BM25索引持久化测试完成")
+
+
+async def test_index_reuses_operation_texts():
+    """测试增强索引复用向量索引阶段格式化好的操作文本"""
+
+    class FakeBaseRAG:
+        format_calls = 0
+
+        async def index_documents(self, spec_data, index_name=None):
+            return {
+                "success": True,
+                "documents_indexed": 2,
+                "operation_texts": ["Operation: ListMetrics 列出监控指标", "Operation: GetMetricData 获取指标数据"]
+            }
+
+        def _format_operation_text(self, op, cloud_provider, service):
+            FakeBaseRAG.format_calls += 1
+            return f"Operation: {op['name']}"
+
+    spec_data = {
+        "cloud_provider": "aws",
+        "service": "cloudwatch",
+        "specifications": {"operations": [{"name": "ListMetrics"}, {"name": "GetMetricData"}]}
+    }
+
+    rag = EnhancedRAG(FakeBaseRAG(), bm25_cache_dir=None)
+    result = await rag.index_documents(spec_data)
+
+    assert result["bm25_indexed"] == 2
+    assert FakeBaseRAG.format_calls == 0
+    assert rag.indexed_documents["aws.cloudwatch"][1]["text"] == "Operation: GetMetricData 获取指标数据"
+    assert rag.indexed_documents["aws.cloudwatch"][1]["metadata"]["operation_name"] == "GetMetricData"
+
+
 def test_hybrid_retriever():
     """测试混合检索"""
     print("\n" + "=" * 70)
@@ -152,6 +221,12 @@ def test_hybrid_retriever():
         print(f"  {i}. [{result.index}] RRF分数: {result.score:.4f}")
         print(f"     {result.text}")
 
+    # 两路都命中的文档排在前面，重复文档只保留一份
+    assert len(fused_results) == 4
+    assert [r.index for r in fused_results[:2]] == ["azure.monitor", "aws.cloudwatch"]
+    assert all(r.source == "hybrid" for r in fused_results)
+    assert fused_results[0].score > fused_results[-1].score
+
     print("\n✅ 混合检索测试完成")
 
 
@@ -198,6 +273,32 @@ async def test_query_rewriter():
         print(f"\n⚠️  Query改写测试跳过（需要LLM连接）: {e}")
 
 
+async def test_query_rewriter_parsing():
+    """测试Query改写结果解析（不依赖真实LLM）"""
+
+    class FakeResponse:
+        content = "改写1：创建虚拟机实例\n\n  改写2: EC2 RunInstances API  \n启动计算实例操作\n改写后的查询如下：\nEC2"
+
+    class FakeLLM:
+        async def ainvoke(self, prompt):
+            return FakeResponse()
+
+    rewrites = await QueryRewriter(FakeLLM()).rewrite("怎么创建云服务器")
+
+    assert rewrites == [
+        "怎么创建云服务器",
+        "创建虚拟机实例",
+        "EC2 RunInstances API",
+        "启动计算实例操作"
+    ]
+
+    # CRLF换行的模型输出不应留下行尾的\r
+    FakeResponse.content = "改写1：查询EC2实例状态\r\n\r\n改写2：列出所有EC2\r\n"
+    rewrites = await QueryRewriter(FakeLLM()).rewrite("EC2状态")
+
+    assert rewrites == ["EC2状态", "查询EC2实例状态", "列出所有EC2"]
+
+
 def test_retrieval_metrics():
     """测试检索评估指标"""
     print("\n" + "=" * 70)
@@ -247,9 +348,50 @@ def test_retrieval_metrics():
 
     print(f"\nMRR: {mrr:.4f}")
 
+    assert abs(mrr - (1 / 2 + 1 + 1 / 3) / 3) < 1e-9
+    assert abs(ndcg_at_3 - (1 / np.log2(3)) / (1 + 1 / np.log2(3) + 0.5)) < 1e-9
+
+    # 批量NDCG等于逐个查询NDCG的平均值
+    mean_ndcg = metrics.mean_ndcg_at_k(retrieved_lists, relevant_lists, k=3)
+    expected = np.mean([
+        metrics.ndcg_at_k(r, rel, k=3) for r, rel in zip(retrieved_lists, relevant_lists)
+    ])
+    assert abs(mean_ndcg - expected) < 1e-9
+
     print("\n✅ 检索评估指标测试完成")
 
 
+def test_reranker_batches_sorted_by_length():
+    """测试Reranker按长度分批推理后分数回填到原结果"""
+
+    class FakeCrossEncoder:
+        def __init__(self):
+            self.calls = []
+
+        def predict(self, pairs, batch_size=32):
+            self.calls.append(([text for _, text in pairs], batch_size))
+            # 文本越长分数越高
+            return [float(len(text)) for _, text in pairs]
+
+    texts = ["a" * n for n in (3, 10, 1, 7, 5)]
+    results = [
+        RetrievalResult(text=text, score=0.0, metadata={}, index="test", source="hybrid")
+        for text in texts
+    ]
+
+    reranker = Reranker(batch_size=2)
+    reranker._model = FakeCrossEncoder()
+    reranker._model_initialized = True
+
+    reranked = reranker.rerank("query", results, top_k=3)
+
+    # 只调用一次predict，输入按长度降序
+    assert len(reranker._model.calls) == 1
+    assert reranker._model.calls[0] == (sorted(texts, key=len, reverse=True), 2)
+    assert [len(r.text) for r in reranked] == [10, 7, 5]
+    assert all(r.score == float(len(r.text)) for r in results)
+
+
 def test_reranker():
     """测试Reranker重排序"""
     print("\n" + "=" * 70)
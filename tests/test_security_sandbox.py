@@ -237,6 +237,11 @@ def test_permission_manager():
     assert check['allowed'], "describe_instances应该被允许"
     print("✅ 通过")
 
+    # 测试用例1.1：不同命名风格的模糊匹配
+    check = manager.check_action("aws", "ec2", "DescribeInstances")
+    assert check['allowed'], "DescribeInstances应该模糊匹配到describe_instances"
+    assert check['matched_action'] == "describe_instances"
+
     # 测试用例2：危险操作
     print("\n【用例2】危险操作（terminate_instances）")
     check = manager.check_action("aws", "ec2", "terminate_instances")
@@ -255,6 +260,16 @@ def test_permission_manager():
     assert not check['allowed'], "未定义的服务应该被拒绝"
     print("✅ 通过")
 
+    # 测试用例3.1：新增权限后缓存的检查结果失效
+    manager.add_permission(
+        provider=CloudProvider.AWS,
+        service="unknown_service",
+        actions={"some_action"},
+        level=PermissionLevel.READ_ONLY
+    )
+    check = manager.check_action("aws", "unknown_service", "some_action")
+    assert check['allowed'], "新增权限后操作应该被允许"
+
     # 测试用例4：获取允许的操作列表
     print("\n【用例4】获取允许的操作列表")
     actions = manager.get_allowed_actions("aws", "ec2")
@@ -275,6 +290,21 @@ def test_permission_manager():
         print(f"  {provider}: {info['services']}个服务, {info['total_actions']}个操作")
 
     assert summary['total_permissions'] > 0, "应该有权限定义"
+    # 默认5个AWS服务 + 用例3.1新增的unknown_service
+    assert summary['by_provider']['aws']['services'] == 6
+    assert summary['by_level']['read_only'] == summary['total_permissions']
+
+    # 覆盖已有权限时统计不重复累加
+    manager.add_permission(
+        provider=CloudProvider.AWS,
+        service="unknown_service",
+        actions={"some_action", "other_action"},
+        level=PermissionLevel.READ_WRITE
+    )
+    updated = manager.get_permission_summary()
+    assert updated['by_provider']['aws']['services'] == 6
+    assert updated['by_provider']['aws']['total_actions'] == summary['by_provider']['aws']['total_actions'] + 1
+    assert updated['by_level']['read_write'] == 1
     print("✅ 通过")
 
     print("\n✅ 权限管理器测试完成")
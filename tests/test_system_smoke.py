@@ -0,0 +1,186 @@
+"""
+多云SRE Agent系统冒烟测试
+覆盖已完成的功能：Schema定义、DataAdapterAgent、健康判断、统一Schema多云支持
+"""
+import pytest
+from datetime import datetime, timezone
+
+from schemas.health_schema import (
+    HealthThreshold,
+    HealthIssue,
+    SeverityLevel,
+    MetricHealth,
+    LogHealth,
+    TraceHealth,
+)
+from schemas.resource_schema import (
+    ComputeResource,
+    ResourceType,
+    ResourceState,
+)
+
+
+# ==================== 测试1：Schema定义 ====================
+
+@pytest.mark.smoke
+def test_health_threshold_defaults():
+    """健康阈值的默认配置"""
+    threshold = HealthThreshold()
+
+    assert threshold.cpu_warning_threshold == 80.0
+    assert threshold.log_error_rate_warning == 0.01
+    assert threshold.trace_p95_latency_warning_ms == 1000.0
+
+    print(f"✅ 默认CPU警告阈值: {threshold.cpu_warning_threshold}%")
+
+
+@pytest.mark.smoke
+def test_health_issue_creation():
+    """创建健康问题"""
+    issue = HealthIssue(
+        severity=SeverityLevel.WARNING,
+        category="metric",
+        message="CPU使用率超过阈值",
+        metric_name="cpu_utilization",
+        current_value=85.5,
+        threshold=80.0,
+        recommendation="考虑扩容或优化应用性能",
+    )
+
+    assert issue.severity == SeverityLevel.WARNING
+    assert issue.current_value > issue.threshold
+
+    print(f"✅ 创建健康问题: {issue.severity.value} - {issue.message}")
+
+
+# ==================== 测试2：DataAdapterAgent ====================
+
+@pytest.mark.parametrize("cloud_provider,fixture_name,resource_type,target_schema", [
+    ("aws", "aws_ec2_data", "ec2", "ComputeResource"),
+    ("aws", "aws_cloudwatch_metric_data", "metric", "MetricResult"),
+    ("kubernetes", "k8s_pod_data", "pod", "ContainerResource"),
+])
+@pytest.mark.smoke
+async def test_data_adapter_fast_path(cloud_provider, fixture_name, resource_type, target_schema, request, adapter):
+    """规则引擎快速转换：AWS EC2 / CloudWatch Metric / Kubernetes Pod"""
+    raw_data = request.getfixturevalue(fixture_name)
+
+    result = await adapter.safe_process({
+        "raw_data": raw_data,
+        "cloud_provider": cloud_provider,
+        "resource_type": resource_type,
+        "target_schema": target_schema,
+    })
+
+    assert result.success, f"{fixture_name} → {target_schema} 转换失败: {result.error}"
+    assert result.metadata.get("conversion_method") == "fast_rule"
+    assert type(result.data).__name__ == target_schema
+
+    print(f"✅ {fixture_name} → {target_schema} 转换成功")
+
+
+# ==================== 测试3：健康判断逻辑 ====================
+
+@pytest.mark.parametrize("current_value,is_healthy", [
+    (65.5, True),
+    (92.3, False),
+])
+@pytest.mark.smoke
+def test_metric_health(current_value, is_healthy):
+    """CPU指标健康判断"""
+    cpu = MetricHealth(
+        metric_name="cpu_utilization",
+        current_value=current_value,
+        threshold=80.0,
+        threshold_type="greater_than",
+        is_healthy=is_healthy,
+        dimensions={"InstanceId": "i-test123"},
+        unit="Percent",
+        cloud_provider="aws",
+    )
+
+    assert cpu.is_healthy == (cpu.current_value < cpu.threshold)
+
+    print(f"✅ CPU {cpu.current_value}% (阈值 {cpu.threshold}%): {'健康' if cpu.is_healthy else '不健康'}")
+
+
+@pytest.mark.smoke
+def test_log_health():
+    """日志健康判断"""
+    now = datetime.now(timezone.utc)
+    log_health = LogHealth(
+        log_source="/aws/lambda/my-function",
+        time_range={"start": now, "end": now},
+        total_logs=1000,
+        error_count=8,
+        warning_count=25,
+        critical_count=0,
+        error_rate=0.008,  # 0.8%
+        is_healthy=True,
+        health_score=99.2,
+        cloud_provider="aws",
+    )
+
+    assert log_health.error_rate < HealthThreshold().log_error_rate_warning
+    assert log_health.is_healthy
+
+    print(f"✅ 日志健康分数: {log_health.health_score:.1f}/100")
+
+
+@pytest.mark.smoke
+def test_trace_health():
+    """Trace健康判断"""
+    now = datetime.now(timezone.utc)
+    trace_health = TraceHealth(
+        service_name="api-gateway",
+        time_range={"start": now, "end": now},
+        total_traces=5000,
+        error_traces=25,
+        error_rate=0.005,  # 0.5%
+        avg_duration_ms=245.6,
+        p50_duration_ms=180.2,
+        p95_duration_ms=850.3,
+        p99_duration_ms=1250.8,
+        is_healthy=True,
+        health_score=95.0,
+        cloud_provider="aws",
+    )
+
+    assert trace_health.p95_duration_ms < HealthThreshold().trace_p95_latency_warning_ms
+    assert trace_health.is_healthy
+
+    print(f"✅ Trace健康分数: {trace_health.health_score:.1f}/100")
+
+
+# ==================== 测试4：统一Schema多云支持 ====================
+
+@pytest.mark.smoke
+def test_unified_schema_across_clouds():
+    """相同业务在不同云平台使用统一的数据结构"""
+    aws_resource = ComputeResource(
+        resource_id="i-aws123",
+        resource_name="web-server-aws",
+        resource_type=ResourceType.EC2,
+        cloud_provider="aws",
+        state=ResourceState.RUNNING,
+        tags={"业务": "电商平台", "环境": "生产"},
+        instance_type="t3.medium",
+        region="us-east-1",
+    )
+
+    # 阿里云ECS实例（模拟）
+    aliyun_resource = ComputeResource(
+        resource_id="i-aliyun456",
+        resource_name="web-server-aliyun",
+        resource_type=ResourceType.ECS,
+        cloud_provider="aliyun",
+        state=ResourceState.RUNNING,
+        tags={"业务": "电商平台", "环境": "生产"},
+        instance_type="ecs.t5-lc1m2.small",
+        region="cn-hangzhou",
+    )
+
+    assert aws_resource.state == aliyun_resource.state
+    assert aws_resource.tags.get("业务") == aliyun_resource.tags.get("业务")
+
+    print("✅ 统一Schema验证成功：不同云平台使用相同数据结构")
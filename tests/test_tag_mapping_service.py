@@ -20,7 +20,7 @@ from services.tag_mapping_service import TagMappingService, TaggedResource
 class MockAWSTools:
     """Mock AWS工具类用于测试"""
 
-    async def _list_ec2_instances_impl(self, tags=None, **kwargs):
+    async def _list_ec2_instances_impl(self, tags=None, filters=None, **kwargs):
         """Mock EC2实例列表"""
         # 模拟返回的EC2实例数据
         mock_instances = [
@@ -55,6 +55,28 @@ class MockAWSTools:
             }
         ]
 
+        # 根据tag-key/tag-value过滤器过滤（与AWS一致：各过滤器为AND关系）
+        if filters:
+            filtered = []
+            for instance in mock_instances:
+                instance_tags = instance.get("Tags", [])
+                match = True
+                for f in filters:
+                    if f["Name"] == "tag-key":
+                        match = any(tag["Key"] in f["Values"] for tag in instance_tags)
+                    elif f["Name"] == "tag-value":
+                        match = any(tag["Value"] in f["Values"] for tag in instance_tags)
+                    if not match:
+                        break
+                if match:
+                    filtered.append(instance)
+
+            return {
+                "success": True,
+                "instances": filtered,
+                "count": len(filtered)
+            }
+
         # 根据tags过滤
         if tags:
             filtered = []
@@ -147,6 +169,74 @@ class MockK8sTools:
         }
 
 
+# ==================== Mock boto3 Client ====================
+
+class MockPaginator:
+    """Mock boto3分页器"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def paginate(self, **kwargs):
+        return iter(self.pages)
+
+
+class MockLogsClient:
+    """Mock CloudWatch Logs客户端"""
+
+    def __init__(self):
+        self.log_group_tags = {
+            "/aws/lambda/order": {"业务": "电商平台"},
+            "/aws/lambda/report": {"业务": "数据分析"},
+            "/aws/ecs/cart": {"Business": "电商平台"},
+            "/aws/broken": None,  # 获取标签失败
+        }
+        self.list_tags_calls = 0
+
+    def get_paginator(self, operation):
+        names = list(self.log_group_tags)
+        return MockPaginator([
+            {"logGroups": [{"logGroupName": name} for name in names[:2]]},
+            {"logGroups": [{"logGroupName": name} for name in names[2:]]},
+        ])
+
+    def list_tags_log_group(self, logGroupName):
+        self.list_tags_calls += 1
+        tags = self.log_group_tags[logGroupName]
+        if tags is None:
+            raise RuntimeError("AccessDenied")
+        return {"tags": tags}
+
+
+class MockELBv2Client:
+    """Mock ELBv2客户端（记录describe_tags调用）"""
+
+    def __init__(self, count):
+        self.load_balancers = [
+            {
+                "LoadBalancerName": f"alb-{i}",
+                "LoadBalancerArn": f"arn:aws:elasticloadbalancing:lb/alb-{i}",
+            }
+            for i in range(count)
+        ]
+        self.describe_tags_calls = []
+
+    def get_paginator(self, operation):
+        return MockPaginator([{"LoadBalancers": self.load_balancers}])
+
+    def describe_tags(self, ResourceArns):
+        self.describe_tags_calls.append(ResourceArns)
+        return {
+            "TagDescriptions": [
+                {
+                    "ResourceArn": arn,
+                    "Tags": [{"Key": "业务", "Value": "电商平台" if arn.endswith(("0", "5")) else "数据分析"}],
+                }
+                for arn in ResourceArns
+            ]
+        }
+
+
 # ==================== 测试函数 ====================
 
 async def test_tag_key_normalization():
@@ -168,6 +258,14 @@ async def test_tag_key_normalization():
     assert "环境" in keys
     assert "Environment" in keys
 
+    # "app"同时属于业务和k8s.app映射，以先定义的业务映射为准
+    keys = service._normalize_tag_key("app")
+    assert keys == service.tag_key_mapping["业务"]
+
+    # 未知标签键返回原始键和常见变体
+    keys = service._normalize_tag_key("Team-X")
+    assert keys == ["Team-X", "team-x", "Team-x"]
+
     print("✅ 标签键标准化测试通过")
 
 
@@ -190,10 +288,12 @@ async def test_get_ec2_by_tag():
     for resource in resources:
         print(f"  - {resource.resource_id} (标签: {resource.tags})")
 
-    # 验证结果
-    assert len(resources) >= 1
+    # 验证结果：中英文标签键的实例都能通过一次查询找到
+    assert {r.resource_id for r in resources} == {"i-test001", "i-test002"}
     for resource in resources:
         assert resource.resource_type == "ec2"
+        # 默认不保留原始数据
+        assert resource.resource_data is None
         assert resource.cloud_provider == "aws"
         # 至少有一个标签匹配
         assert any(
@@ -253,6 +353,8 @@ async def test_get_pods_by_business():
 
     # 验证结果
     assert len(pods) >= 1
+    # Pod列表保留原始数据（命名空间过滤等需要）
+    assert all(pod.resource_data is not None for pod in pods)
 
     print("✅ 业务Pod查询测试通过")
 
@@ -293,6 +395,160 @@ async def test_multi_cloud_query():
     print("✅ 多云统一查询测试通过")
 
 
+async def test_deduplicate_resources():
+    """测试合并结果去重"""
+    print("\n=== 测试6：合并结果去重 ===")
+
+    service = TagMappingService(aws_tools=MockAWSTools(), k8s_tools=MockK8sTools())
+
+    pod = TaggedResource(
+        resource_id="production/api-pod-1",
+        resource_type="pod",
+        cloud_provider="k8s",
+        tags={"业务": "电商平台", "app": "电商平台"},
+    )
+
+    async def duplicated_pods(label_keys, label_value, include_raw=False):
+        return [pod, pod]
+
+    service._get_k8s_pods_by_label = duplicated_pods
+
+    resources = await service.get_resources_by_tag(
+        tag_key="业务",
+        tag_value="电商平台",
+        resource_types=["ec2", "pod"]
+    )
+
+    print(f"去重后 {len(resources)} 个资源")
+
+    keys = [(r.cloud_provider, r.resource_type, r.resource_id) for r in resources]
+    assert len(keys) == len(set(keys))
+    assert keys.count(("k8s", "pod", "production/api-pod-1")) == 1
+
+    print("✅ 合并结果去重测试通过")
+
+
+async def test_concurrent_query():
+    """测试多资源类型并发查询"""
+    print("\n=== 测试7：多资源类型并发查询 ===")
+
+    # 每个查询开始后等待另一个查询也已开始：并发执行时两者互相放行，
+    # 串行执行时先开始的查询等不到另一个而超时（不依赖机器速度）
+    ec2_started = asyncio.Event()
+    pod_started = asyncio.Event()
+
+    async def rendezvous(mine: asyncio.Event, other: asyncio.Event):
+        mine.set()
+        await asyncio.wait_for(other.wait(), timeout=5)
+
+    class SlowAWSTools(MockAWSTools):
+        async def _list_ec2_instances_impl(self, tags=None, filters=None, **kwargs):
+            await rendezvous(ec2_started, pod_started)
+            return await super()._list_ec2_instances_impl(tags=tags, **kwargs)
+
+    class SlowK8sTools(MockK8sTools):
+        async def list_pods(self, label_selector=None, **kwargs):
+            await rendezvous(pod_started, ec2_started)
+            return await super().list_pods(label_selector=label_selector, **kwargs)
+
+    service = TagMappingService(aws_tools=SlowAWSTools(), k8s_tools=SlowK8sTools())
+
+    resources = await service.get_resources_by_tag(
+        tag_key="业务",
+        tag_value="电商平台",
+        resource_types=["ec2", "pod"]
+    )
+
+    print(f"找到 {len(resources)} 个资源")
+
+    # EC2和Pod查询的执行区间重叠（两者都已开始，且都找到了资源）
+    assert ec2_started.is_set() and pod_started.is_set()
+    assert {r.cloud_provider for r in resources} == {"aws", "k8s"}
+    # 结果按资源类型顺序合并：AWS在前，K8s在后
+    providers = [r.cloud_provider for r in resources]
+    assert providers == sorted(providers, key=["aws", "k8s"].index)
+
+    print("✅ 并发查询测试通过")
+
+
+async def test_get_log_groups_by_tag():
+    """测试通过标签查询LogGroup（boto3调用在线程池中执行）"""
+    print("\n=== 测试8：LogGroup标签查询 ===")
+
+    import boto3
+
+    mock_client = MockLogsClient()
+    created_clients = []
+    original_client = boto3.client
+    boto3.client = lambda *args, **kwargs: created_clients.append(args) or mock_client
+    try:
+        service = TagMappingService(aws_tools=MockAWSTools())
+        log_groups = await service.get_log_groups_by_business("电商平台")
+        calls_after_first = mock_client.list_tags_calls
+
+        # 缓存有效期内查询其他业务，不再重新拉取标签
+        other_log_groups = await service.get_log_groups_by_business("数据分析")
+        calls_after_second = mock_client.list_tags_calls
+        cached_resources = [
+            resource
+            for _, resources in service._resource_cache.values()
+            for resource in resources
+        ]
+
+        service.clear_cache()
+        await service.get_log_groups_by_business("电商平台")
+    finally:
+        boto3.client = original_client
+
+    print(f"找到 {len(log_groups)} 个LogGroup: {log_groups}")
+    print(f"标签请求次数: {calls_after_first} -> {calls_after_second} -> {mock_client.list_tags_calls}")
+
+    # 保持分页顺序，获取标签失败的LogGroup被跳过
+    assert log_groups == ["/aws/lambda/order", "/aws/ecs/cart"]
+    assert other_log_groups == ["/aws/lambda/report"]
+    assert calls_after_first == 4
+    assert calls_after_second == 4
+    # 缓存中只保存ID和标签，不保留boto3原始响应
+    assert len(cached_resources) == 3
+    assert all(resource.resource_data is None for resource in cached_resources)
+    assert mock_client.list_tags_calls == 8
+    # 缓存失效后重新加载时复用已创建的客户端
+    assert len(created_clients) == 1
+
+    print("✅ LogGroup标签查询测试通过")
+
+
+async def test_get_alb_by_tag_batched():
+    """测试ALB标签批量查询（每次describe_tags最多20个ARN）"""
+    print("\n=== 测试9：ALB标签批量查询 ===")
+
+    import boto3
+
+    mock_client = MockELBv2Client(count=45)
+    original_client = boto3.client
+    boto3.client = lambda *args, **kwargs: mock_client
+    try:
+        service = TagMappingService(aws_tools=MockAWSTools())
+        resources = await service.get_resources_by_tag(
+            tag_key="业务",
+            tag_value="电商平台",
+            resource_types=["alb"]
+        )
+    finally:
+        boto3.client = original_client
+
+    batch_sizes = [len(arns) for arns in mock_client.describe_tags_calls]
+    print(f"describe_tags调用 {len(batch_sizes)} 次，每批ARN数: {batch_sizes}")
+    print(f"找到 {len(resources)} 个ALB")
+
+    assert sorted(batch_sizes) == [5, 20, 20]
+    assert [r.resource_id for r in resources] == [
+        f"alb-{i}" for i in range(45) if i % 5 == 0
+    ]
+
+    print("✅ ALB标签批量查询测试通过")
+
+
 async def main():
     """运行所有测试"""
     print("=" * 70)
@@ -304,6 +560,10 @@ async def main():
     await test_get_pods_by_label()
     await test_get_pods_by_business()
     await test_multi_cloud_query()
+    await test_deduplicate_resources()
+    await test_concurrent_query()
+    await test_get_log_groups_by_tag()
+    await test_get_alb_by_tag_batched()
 
     print("\n" + "=" * 70)
     print("✅ 所有测试通过！")
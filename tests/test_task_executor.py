@@ -0,0 +1,260 @@
+"""
+任务执行引擎测试
+验证DAG调度、计划内调用共享、跨计划结果缓存、条件跳过和GetMetricData批量合并
+"""
+import asyncio
+import sys
+import io
+import os
+
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from task_executor import TaskExecutor
+
+T1 = "2024-01-01T00:00:00"
+T2 = "2024-01-01T00:05:00"
+
+
+class FakeToolRegistry:
+    """记录调用的工具注册表（替代真实的云API调用）"""
+
+    def __init__(self, instances=("i-1", "i-2"), batched=False):
+        self.instances = list(instances)
+        self.batched = batched  # 是否提供GetMetricData工具
+        self.calls = []  # (operation, parameters)
+
+    def has_tool(self, cloud_provider, service, operation):
+        return self.batched and operation == "get_metric_data"
+
+    def count(self, operation):
+        return sum(1 for op, _ in self.calls if op == operation)
+
+    async def call(self, cloud_provider, service, operation, parameters):
+        self.calls.append((operation, parameters))
+        await asyncio.sleep(0)
+
+        if operation == "describe_instances":
+            return {
+                "success": True,
+                "count": len(self.instances),
+                "instances": [{"InstanceId": instance_id} for instance_id in self.instances]
+            }
+
+        if operation == "get_metric_statistics":
+            return {"success": True, "datapoints": [{"Timestamp": T1, "Average": 50.0}]}
+
+        if operation == "get_metric_data":
+            # 与CloudWatch默认一致，时间戳按降序返回
+            results = {}
+            for query in parameters["queries"]:
+                base = 10.0 if query["MetricStat"]["Stat"] == "Average" else 20.0
+                results[query["Id"]] = {"timestamps": [T2, T1], "values": [base + 1, base]}
+            return {"success": True, "data": {"success": True, "results": results}}
+
+        return {"success": False, "error": f"Unsupported operation: {operation}"}
+
+
+def make_executor(registry: FakeToolRegistry) -> TaskExecutor:
+    executor = TaskExecutor()
+    executor.tool_registry = registry
+    return executor
+
+
+def list_step(step_id="list", **extra):
+    return {
+        "step_id": step_id,
+        "step_type": "list_resources",
+        "operation": "describe_instances",
+        "parameters": {"resource_type": "ec2", "tags": {"env": "prod"}},
+        "output_key": "resources",
+        **extra
+    }
+
+
+def metric_step(step_id, dependencies, **extra):
+    return {
+        "step_id": step_id,
+        "step_type": "query_metric",
+        "operation": "get_metric_statistics",
+        "parameters": {"metric_name": "CPUUtilization", "statistics": ["Average"]},
+        "dependencies": dependencies,
+        **extra
+    }
+
+
+async def test_diamond_dag_shares_readonly_steps():
+    """菱形DAG：两个相同的只读步骤只调用一次API，后一个标记为cache_hit"""
+    registry = FakeToolRegistry()
+    executor = make_executor(registry)
+
+    result = await executor.execute_plan({
+        "type": "multi_step",
+        "steps": [
+            list_step(),
+            metric_step("left", ["list"]),
+            metric_step("right", ["list"]),
+            {
+                "step_id": "join",
+                "step_type": "aggregate",
+                "operation": "summary",
+                "parameters": {},
+                "dependencies": ["left", "right"]
+            }
+        ]
+    })
+
+    assert result["success"], result.get("error")
+    by_id = {r.step_id: r for r in result["results"]}
+    assert [r.step_id for r in result["results"]][0] == "list"
+    assert [r.step_id for r in result["results"]][-1] == "join"
+
+    assert registry.count("describe_instances") == 1
+    assert registry.count("get_metric_statistics") == len(registry.instances), "相同调用只应执行一次"
+    assert not by_id["left"].cache_hit and by_id["right"].cache_hit
+    assert by_id["right"].api_calls == []
+    assert by_id["right"].data == by_id["left"].data
+    assert len(result["api_trace"]) == 1 + len(registry.instances)
+
+    print("✅ 菱形DAG调用共享测试通过")
+
+
+async def test_cycle_and_missing_dependency():
+    """循环依赖和依赖不存在的步骤都返回错误，不调用API"""
+    registry = FakeToolRegistry()
+    executor = make_executor(registry)
+
+    cycle = await executor.execute_plan({
+        "type": "multi_step",
+        "steps": [
+            list_step("a", dependencies=["b"]),
+            metric_step("b", ["a"])
+        ]
+    })
+    assert not cycle["success"]
+    assert cycle["error"] == "Circular dependency or no ready steps"
+    assert sorted(cycle["remaining"]) == ["a", "b"]
+
+    missing = await executor.execute_plan({
+        "type": "multi_step",
+        "steps": [
+            list_step(),
+            metric_step("metric", ["list", "ghost"])
+        ]
+    })
+    assert not missing["success"]
+    assert missing["completed"] == ["list"]
+    assert missing["remaining"] == ["metric"]
+    assert registry.count("get_metric_statistics") == 0
+
+    print("✅ 循环依赖/缺失依赖测试通过")
+
+
+async def test_failed_condition_skips_branch():
+    """条件不满足的步骤及其后继都被跳过，不调用API"""
+    registry = FakeToolRegistry()
+    executor = make_executor(registry)
+
+    result = await executor.execute_plan({
+        "type": "multi_step",
+        "steps": [
+            list_step(),
+            metric_step("metric", ["list"], condition={
+                "source_key": "resources", "field": "count", "operator": ">", "value": 5
+            }),
+            {
+                "step_id": "filter",
+                "step_type": "filter",
+                "operation": "threshold",
+                "parameters": {"source_key": "metric", "threshold": 80},
+                "dependencies": ["metric"]
+            }
+        ]
+    })
+
+    assert result["success"], result.get("error")
+    by_id = {r.step_id: r for r in result["results"]}
+    assert not by_id["list"].skipped
+    assert by_id["metric"].skipped and by_id["filter"].skipped
+    assert registry.count("get_metric_statistics") == 0
+    assert "metric" not in result["context"]
+
+    print("✅ 条件跳过测试通过")
+
+
+async def test_cross_plan_cache_hit():
+    """相同的只读步骤在缓存有效期内跨计划复用，不产生API调用"""
+    registry = FakeToolRegistry()
+    executor = make_executor(registry)
+    plan = {"type": "multi_step", "steps": [list_step()]}
+
+    first = await executor.execute_plan(plan)
+    second = await executor.execute_plan(plan)
+
+    assert first["success"] and second["success"]
+    assert len(first["api_trace"]) == 1
+    assert second["api_trace"] == []
+    assert second["results"][0].cache_hit
+    assert registry.count("describe_instances") == 1
+
+    # 清空缓存后重新调用
+    executor.clear_cache()
+    third = await executor.execute_plan(plan)
+    assert len(third["api_trace"]) == 1
+    assert registry.count("describe_instances") == 2
+
+    print("✅ 跨计划缓存测试通过")
+
+
+async def test_metric_data_batches_merge_by_timestamp():
+    """GetMetricData分批查询，同一实例不同统计类型按时间戳合并，数据点按时间升序"""
+    registry = FakeToolRegistry(batched=True)
+    executor = make_executor(registry)
+    # 2个实例 x 2种统计 = 4个查询，每批3个：i-2的Average和Maximum落在不同批次
+    executor.METRIC_DATA_MAX_QUERIES = 3
+
+    result = await executor.execute_plan({
+        "type": "multi_step",
+        "steps": [
+            list_step(),
+            {
+                **metric_step("metric", ["list"]),
+                "parameters": {"metric_name": "CPUUtilization", "statistics": ["Average", "Maximum"]},
+                "output_key": "metrics"
+            }
+        ]
+    })
+
+    assert result["success"], result.get("error")
+    assert registry.count("get_metric_data") == 2
+    assert registry.count("get_metric_statistics") == 0
+    assert len(result["api_trace"]) == 1 + 2
+
+    metrics = result["context"]["metrics"]["metrics"]
+    expected = [
+        {"Timestamp": T1, "Average": 10.0, "Maximum": 20.0},
+        {"Timestamp": T2, "Average": 11.0, "Maximum": 21.0},
+    ]
+    assert metrics["i-1"]["metric_data"] == expected
+    assert metrics["i-2"]["metric_data"] == expected
+
+    print("✅ GetMetricData批量合并测试通过")
+
+
+async def main():
+    """运行所有测试"""
+    print("=" * 70)
+    print("任务执行引擎测试")
+    print("=" * 70)
+
+    await test_diamond_dag_shares_readonly_steps()
+    await test_cycle_and_missing_dependency()
+    await test_failed_condition_skips_branch()
+    await test_cross_plan_cache_hit()
+    await test_metric_data_batches_merge_by_timestamp()
+
+    print("\n✅ 所有测试通过！")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,6 +7,7 @@ import io
 import os
 import shutil
 import tempfile
+from dataclasses import asdict, fields
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
@@ -128,6 +129,7 @@ def test_list_ec2_instances():
             tags=["ec2", "instances", "list"]
         )
 
+        id_before_upgrade = updated_tool.tool_id
         result3 = registry.register(updated_tool)
 
         print(f"注册成功: {result3['success']}")
@@ -137,8 +139,17 @@ def test_list_ec2_instances():
         assert result3['success'], "代码变化应该创建新版本"
         assert result3['version'] == "1.0.1", "版本号应该递增"
         assert result3.get('is_update') == True, "should be an update"
+        assert result3['tool_id'] != id_before_upgrade, "版本升级后工具ID应重新计算"
         print("✅ 通过 - 成功创建新版本")
 
+        # 哈希/评分缓存是普通实例属性，不属于dataclass字段
+        print("\n【用例4】缓存不出现在dataclass字段中")
+        tool_dict = asdict(updated_tool)
+        assert not [name for name in tool_dict if name.startswith("_")]
+        assert not [name for name in tool_dict["metrics"] if name.startswith("_")]
+        assert not [f.name for f in fields(GeneratedTool) + fields(ToolMetrics) if f.name.endswith("_cache")]
+        print("✅ 通过")
+
     print("\n✅ 工具注册测试完成")
 
 
@@ -252,6 +263,32 @@ def test_tool_search():
         assert len(pod_tools) == 1, "应该找到1个带'pods'标签的工具"
         print("✅ 通过")
 
+        # 测试5：更新工具的服务后，索引同步变化
+        print("\n【用例5】更新工具后按新属性搜索")
+        registry.register(GeneratedTool(
+            name="list_ec2_instances",
+            description="列出EC2实例（迁移到compute服务）",
+            code="# code v2",
+            test_code="# test",
+            parameters=[],
+            return_type="List",
+            cloud_provider="aws",
+            service="compute",
+            category="query",
+            tags=["instances"]
+        ))
+
+        assert registry.search_tools(service="ec2") == [], "旧服务下不应再找到该工具"
+        assert [t.name for t in registry.search_tools(service="compute")] == ["list_ec2_instances"]
+        assert [t.name for t in registry.search_tools(cloud_provider="aws", tags=["ec2", "s3"])] == ["list_s3_buckets"]
+        assert len(registry.search_tools(cloud_provider="aws", limit=2)) == 2
+
+        # 描述被修改后，文本搜索使用新描述
+        assert [t.name for t in registry.search_tools(query="COMPUTE")] == ["list_ec2_instances"]
+        registry.get_tool("list_ec2_instances").description = "列出虚拟机"
+        assert registry.search_tools(query="compute") == []
+        print("✅ 通过")
+
     print("\n✅ 工具搜索测试完成")
 
 
@@ -361,7 +398,9 @@ def test_persistence():
 
         assert loaded_tool is not None, "应该加载到工具"
         assert loaded_tool.name == "test_persistence"
+        assert not loaded_tool.code_loaded, "加载后代码应按需读取"
         assert loaded_tool.code == tool.code
+        assert loaded_tool.code_loaded and loaded_tool.test_code == tool.test_code
         print("✅ 通过 - 成功从磁盘加载")
 
         # 检查代码文件是否存在
@@ -378,6 +417,105 @@ def test_persistence():
 
         print("✅ 通过 - 代码文件正确保存")
 
+        # 强制更新（代码不变）：代码文件头部的版本号变化需要重写，测试文件内容未变则跳过
+        print("\n【用例4】强制更新时跳过未变化的文件")
+        test_file = os.path.join(tmpdir, "aws", "ec2", "test_test_persistence.py")
+        test_mtime = os.stat(test_file).st_mtime_ns
+
+        result = registry1.register(tool, force_update=True)
+        assert result['success'] and result['version'] == "1.0.1"
+        with open(code_file, 'r', encoding='utf-8') as f:
+            assert "版本: 1.0.1" in f.read()
+        assert os.stat(test_file).st_mtime_ns == test_mtime, "测试文件内容未变，不应重写"
+        assert not [name for name in os.listdir(os.path.dirname(code_file)) if name.endswith(".tmp")]
+
+        # 新的注册表实例（如重启后）同样不重写磁盘上内容相同的文件
+        registry3 = ToolRegistry(registry_dir=tmpdir)
+        registry3.register(registry3.get_tool("test_persistence"), force_update=True)
+        with open(code_file, 'r', encoding='utf-8') as f:
+            assert "版本: 1.0.2" in f.read()
+        assert os.stat(test_file).st_mtime_ns == test_mtime, "磁盘上已有相同内容，不应重写"
+        print("✅ 通过")
+
+        # 未加载代码的工具在索引重写后代码保持不变
+        print("\n【用例5】延迟加载的代码在索引重写后保留")
+        registry4 = ToolRegistry(registry_dir=tmpdir)
+        registry4.register(GeneratedTool(
+            name="another_tool",
+            description="另一个工具",
+            code="def another():\n    pass",
+            test_code="",
+            parameters=[],
+            return_type="None",
+            cloud_provider="aws",
+            service="s3",
+            category="query"
+        ))
+        assert not registry4.get_tool("test_persistence").code_loaded
+
+        registry5 = ToolRegistry(registry_dir=tmpdir)
+        assert registry5.get_tool("test_persistence").code == tool.code
+        assert registry5.get_tool("test_persistence").test_code == tool.test_code
+        assert registry5.get_tool("another_tool").code == "def another():\n    pass"
+        assert not [name for name in os.listdir(tmpdir) if name.endswith(".tmp")]
+        print("✅ 通过")
+
+        # 延迟加载失败时按属性不存在处理
+        print("\n【用例6】延迟加载失败时抛出AttributeError")
+        registry6 = ToolRegistry(registry_dir=tmpdir)
+        assert registry6.get_tool("test_persistence").code == tool.code
+        assert registry6.get_tool("another_tool").code == "def another():\n    pass"
+
+        registry7 = ToolRegistry(registry_dir=tmpdir)
+        os.remove(registry7.index_file)
+        broken = registry7.get_tool("test_persistence")
+        assert getattr(broken, "code", None) is None
+        assert not broken.code_loaded
+        print("✅ 通过")
+
+    # 读取一个工具的代码后，其他未加载工具的代码不驻留在注册表中
+    print("\n【用例7】延迟加载不保留其他工具的代码")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        registry = ToolRegistry(registry_dir=tmpdir)
+        codes = {f"lazy_tool_{i}": f"def lazy_{i}():\n    return {i}" for i in range(50)}
+        for name, code in codes.items():
+            registry.register(GeneratedTool(
+                name=name,
+                description=f"延迟加载工具{name}",
+                code=code,
+                test_code="",
+                parameters=[],
+                return_type="int",
+                cloud_provider="aws",
+                service="ec2",
+                category="query"
+            ))
+
+        def held_strings(value):
+            """递归收集注册表状态中（工具对象之外）的所有字符串"""
+            if isinstance(value, str):
+                yield value
+            elif isinstance(value, dict):
+                for item in value.items():
+                    yield from held_strings(item)
+            elif isinstance(value, (list, tuple, set, frozenset)):
+                for item in value:
+                    yield from held_strings(item)
+
+        loaded = ToolRegistry(registry_dir=tmpdir)
+        assert loaded.get_tool("lazy_tool_0").code == codes["lazy_tool_0"]
+        for check in ("读取后", "compact后"):
+            state = {key: value for key, value in vars(loaded).items() if key != "tools"}
+            held = set(held_strings(state))
+            others = [name for name in codes if name != "lazy_tool_0"]
+            assert not any(loaded.tools[name].code_loaded for name in others)
+            assert not any(codes[name] in held for name in others), f"{check}不应保留其他工具的代码"
+            loaded.compact()
+
+        # compact重写索引后，未加载的代码仍可读取
+        assert loaded.get_tool("lazy_tool_49").code == codes["lazy_tool_49"]
+        print("✅ 通过")
+
     print("\n✅ 持久化测试完成")
 
 
@@ -432,6 +570,63 @@ def test_statistics():
     print("\n✅ 统计信息测试完成")
 
 
+def test_metrics_journal():
+    """测试指标日志（追加写入、重放、合并）"""
+    print("\n" + "=" * 70)
+    print("测试6：指标日志")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        registry = ToolRegistry(registry_dir=tmpdir)
+        registry.register(GeneratedTool(
+            name="journal_tool",
+            description="日志测试工具",
+            code="# code",
+            test_code="# test",
+            parameters=[],
+            return_type="str",
+            cloud_provider="aws",
+            service="ec2",
+            category="query"
+        ))
+
+        print("\n【用例1】更新指标只追加日志，不重写索引")
+        registry.JOURNAL_FLUSH_INTERVAL = 60
+        index_before = open(registry.index_file, encoding='utf-8').read()
+        for _ in range(3):
+            registry.update_metrics("journal_tool", success=True, execution_time=0.5)
+        registry.update_metrics("journal_tool", success=False, execution_time=2.0)
+
+        assert open(registry.index_file, encoding='utf-8').read() == index_before
+        assert os.path.getsize(registry.journal_file) == 0, "记录应先缓冲，批量写入"
+        registry.flush()
+        with open(registry.journal_file, encoding='utf-8') as f:
+            assert len(f.readlines()) == 4
+        print("✅ 通过")
+
+        print("\n【用例2】重新加载时重放日志")
+        reloaded = ToolRegistry(registry_dir=tmpdir).get_tool("journal_tool")
+        original = registry.get_tool("journal_tool")
+        print(f"重放后调用次数: {reloaded.metrics.total_calls}")
+        assert reloaded.metrics.total_calls == 4
+        assert reloaded.metrics.failed_calls == 1
+        assert reloaded.metrics.average_execution_time == original.metrics.average_execution_time
+        assert reloaded.metrics.last_used == original.metrics.last_used
+        print("✅ 通过")
+
+        print("\n【用例3】达到阈值时合并到索引并清空日志")
+        registry.JOURNAL_COMPACT_THRESHOLD = 5
+        registry.update_metrics("journal_tool", success=True, execution_time=0.5)
+        registry.flush()
+        assert os.path.getsize(registry.journal_file) == 0
+
+        compacted = ToolRegistry(registry_dir=tmpdir).get_tool("journal_tool")
+        assert compacted.metrics.total_calls == 5
+        print("✅ 通过")
+
+    print("\n✅ 指标日志测试完成")
+
+
 def main():
     """运行所有测试"""
     print("=" * 70)
@@ -454,6 +649,9 @@ def main():
         # 5. 统计信息
         test_statistics()
 
+        # 6. 指标日志
+        test_metrics_journal()
+
         print("\n" + "=" * 70)
         print("测试总结")
         print("=" * 70)
@@ -465,6 +663,7 @@ def main():
         print("3. ✅ 指标更新（调用次数、成功率、质量评分）")
         print("4. ✅ 持久化（保存/加载工具、代码文件）")
         print("5. ✅ 统计信息（总览、分布、Top工具）")
+        print("6. ✅ 指标日志（追加写入、重放、合并）")
 
         print("\n工具注册表特性:")
         print("- 自动版本管理（代码变化时升级版本）")
@@ -11,10 +11,14 @@ AWS可观测性工具集（示例/参考实现）
 
 核心理念：工具应该由Agent根据用户需求动态生成，而不是硬编码。
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 from langchain_core.tools import tool
 from datetime import datetime, timedelta
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 import logging
 
@@ -34,6 +38,17 @@ class AWSMonitoringTools:
         self._xray_client = None
         self._ec2_client = None
         self._ce_client = None  # Cost Explorer
+        # 同步boto3调用放到专用线程池执行，线程数不随CPU核数变化
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.agent.aws_threads,
+            thread_name_prefix="aws-tools"
+        )
+        # 所有客户端共用的连接配置：连接池不小于并发上限与线程数，自适应重试应对限流
+        self._boto_config = BotoConfig(
+            max_pool_connections=max(64, self.config.agent.max_concurrency, self.config.agent.aws_threads),
+            retries={"max_attempts": 10, "mode": "adaptive"},
+            tcp_keepalive=True
+        )
         self.tool_registry = get_tool_registry()
         self._register_all_tools()
 
@@ -44,7 +59,8 @@ class AWSMonitoringTools:
                 'cloudwatch',
                 aws_access_key_id=self.config.cloud.aws_access_key,
                 aws_secret_access_key=self.config.cloud.aws_secret_key,
-                region_name=self.config.cloud.aws_region
+                region_name=self.config.cloud.aws_region,
+                config=self._boto_config
             )
         return self._cloudwatch_client
 
@@ -55,7 +71,8 @@ class AWSMonitoringTools:
                 'logs',
                 aws_access_key_id=self.config.cloud.aws_access_key,
                 aws_secret_access_key=self.config.cloud.aws_secret_key,
-                region_name=self.config.cloud.aws_region
+                region_name=self.config.cloud.aws_region,
+                config=self._boto_config
             )
         return self._logs_client
 
@@ -66,7 +83,8 @@ class AWSMonitoringTools:
                 'xray',
                 aws_access_key_id=self.config.cloud.aws_access_key,
                 aws_secret_access_key=self.config.cloud.aws_secret_key,
-                region_name=self.config.cloud.aws_region
+                region_name=self.config.cloud.aws_region,
+                config=self._boto_config
             )
         return self._xray_client
 
@@ -77,10 +95,16 @@ class AWSMonitoringTools:
                 'ec2',
                 aws_access_key_id=self.config.cloud.aws_access_key,
                 aws_secret_access_key=self.config.cloud.aws_secret_key,
-                region_name=self.config.cloud.aws_region
+                region_name=self.config.cloud.aws_region,
+                config=self._boto_config
             )
         return self._ec2_client
 
+    async def _run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        """在专用线程池中执行同步调用（boto3为同步SDK），避免阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
     def _register_all_tools(self):
         """注册所有工具"""
         # 注意：这些方法已经用@tool装饰器装饰了，需要获取实际的函数
@@ -91,6 +115,12 @@ class AWSMonitoringTools:
             metadata={"description": "获取CloudWatch指标统计数据"}
         )
 
+        self.tool_registry.register_tool(
+            "aws", "cloudwatch", "get_metric_data",
+            self._get_metric_data_batch_impl,
+            metadata={"description": "批量获取CloudWatch指标数据（GetMetricData）"}
+        )
+
         self.tool_registry.register_tool(
             "aws", "cloudwatch", "list_metrics",
             self._list_metrics_impl,
@@ -205,7 +235,7 @@ class AWSMonitoringTools:
             if dimensions:
                 params['Dimensions'] = dimensions
 
-            response = client.get_metric_statistics(**params)
+            response = await self._run_blocking(client.get_metric_statistics, **params)
 
             return {
                 "success": True,
@@ -232,6 +262,89 @@ class AWSMonitoringTools:
                 "error": str(e)
             }
 
+    async def _get_metric_data_batch_impl(
+        self,
+        queries: List[Dict[str, Any]],
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        批量获取CloudWatch指标数据（GetMetricData）
+
+        一次请求可携带最多500个MetricDataQuery，替代逐个维度调用get_metric_statistics。
+
+        Args:
+            queries: MetricDataQueries列表（每项含Id和MetricStat）
+            start_time: 开始时间 (ISO格式或相对时间如'1h')
+            end_time: 结束时间
+
+        Returns:
+            按查询Id组织的结果（时间戳升序）
+        """
+        try:
+            client = self._get_cloudwatch_client()
+
+            # 处理时间
+            if start_time is None:
+                start_dt = datetime.utcnow() - timedelta(hours=1)
+            else:
+                start_dt = self._parse_time(start_time)
+
+            if end_time is None:
+                end_dt = datetime.utcnow()
+            else:
+                end_dt = self._parse_time(end_time)
+
+            params = {
+                'MetricDataQueries': queries,
+                'StartTime': start_dt,
+                'EndTime': end_dt,
+                'ScanBy': 'TimestampAscending'
+            }
+
+            # 数据点较多时结果分页返回，按Id合并各页
+            results = {}
+            while True:
+                response = await self._run_blocking(client.get_metric_data, **params)
+
+                for item in response.get('MetricDataResults', []):
+                    entry = results.setdefault(item['Id'], {
+                        "label": item.get('Label'),
+                        "timestamps": [],
+                        "values": []
+                    })
+                    entry["timestamps"].extend(item.get('Timestamps', []))
+                    entry["values"].extend(item.get('Values', []))
+                    entry["status_code"] = item.get('StatusCode')
+
+                next_token = response.get('NextToken')
+                if not next_token:
+                    break
+                params['NextToken'] = next_token
+
+            return {
+                "success": True,
+                "results": results,
+                "metadata": {
+                    "query_count": len(queries),
+                    "start_time": start_dt.isoformat(),
+                    "end_time": end_dt.isoformat()
+                }
+            }
+
+        except ClientError as e:
+            logger.error(f"AWS ClientError: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        except Exception as e:
+            logger.error(f"Error getting metric data: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
     async def _list_metrics_impl(
         self,
         namespace: Optional[str] = None,
@@ -260,7 +373,7 @@ class AWSMonitoringTools:
             if dimensions:
                 params['Dimensions'] = dimensions
 
-            response = client.list_metrics(**params)
+            response = await self._run_blocking(client.list_metrics, **params)
 
             return {
                 "success": True,
@@ -332,7 +445,7 @@ class AWSMonitoringTools:
             if alarm_actions:
                 params['AlarmActions'] = alarm_actions
 
-            client.put_metric_alarm(**params)
+            await self._run_blocking(client.put_metric_alarm, **params)
 
             return {
                 "success": True,
@@ -373,7 +486,7 @@ class AWSMonitoringTools:
             if state_value:
                 params['StateValue'] = state_value
 
-            response = client.describe_alarms(**params)
+            response = await self._run_blocking(client.describe_alarms, **params)
 
             return {
                 "success": True,
@@ -428,7 +541,7 @@ class AWSMonitoringTools:
             if filter_pattern:
                 params['filterPattern'] = filter_pattern
 
-            response = client.filter_log_events(**params)
+            response = await self._run_blocking(client.filter_log_events, **params)
 
             return {
                 "success": True,
@@ -479,7 +592,7 @@ class AWSMonitoringTools:
             if end_time:
                 params['endTime'] = int(self._parse_time(end_time).timestamp() * 1000)
 
-            response = client.get_log_events(**params)
+            response = await self._run_blocking(client.get_log_events, **params)
 
             return {
                 "success": True,
@@ -518,7 +631,7 @@ class AWSMonitoringTools:
             if log_group_name_prefix:
                 params['logGroupNamePrefix'] = log_group_name_prefix
 
-            response = client.describe_log_groups(**params)
+            response = await self._run_blocking(client.describe_log_groups, **params)
 
             return {
                 "success": True,
@@ -571,7 +684,7 @@ class AWSMonitoringTools:
             if filter_expression:
                 params['FilterExpression'] = filter_expression
 
-            response = client.get_trace_summaries(**params)
+            response = await self._run_blocking(client.get_trace_summaries, **params)
 
             return {
                 "success": True,
@@ -614,7 +727,8 @@ class AWSMonitoringTools:
             else:
                 end_dt = self._parse_time(end_time)
 
-            response = client.get_service_graph(
+            response = await self._run_blocking(
+                client.get_service_graph,
                 StartTime=start_dt,
                 EndTime=end_dt
             )
@@ -675,7 +789,7 @@ class AWSMonitoringTools:
             if instance_ids:
                 params['InstanceIds'] = instance_ids
 
-            response = client.describe_instances(**params)
+            response = await self._run_blocking(client.describe_instances, **params)
 
             # 提取实例信息
             instances = []
@@ -732,7 +846,8 @@ class AWSMonitoringTools:
                 end_dt = self._parse_time(end_time)
 
             # 开始查询
-            start_query_response = client.start_query(
+            start_query_response = await self._run_blocking(
+                client.start_query,
                 logGroupName=log_group,
                 startTime=int(start_dt.timestamp()),
                 endTime=int(end_dt.timestamp()),
@@ -742,13 +857,12 @@ class AWSMonitoringTools:
 
             query_id = start_query_response['queryId']
 
-            # 轮询查询结果（最多等待30秒）
-            import time
+            # 轮询查询结果（最多等待30秒，等待期间不阻塞事件循环）
             max_attempts = 30
             for _ in range(max_attempts):
-                time.sleep(1)
+                await asyncio.sleep(1)
 
-                results_response = client.get_query_results(queryId=query_id)
+                results_response = await self._run_blocking(client.get_query_results, queryId=query_id)
                 status = results_response['status']
 
                 if status == 'Complete':
@@ -819,8 +933,6 @@ class AWSMonitoringTools:
             logger.info(f"Found {len(instances)} instances, querying CPU metrics...")
 
             # 2. 批量查询CPU指标（并行）
-            import asyncio
-
             async def get_instance_cpu(instance):
                 instance_id = instance["InstanceId"]
 